@@ -18,9 +18,11 @@ class Config:
         contract_address,
         network,
         private_key=None,
+        multicall_address=None,
     ):
         self.network = network
         self.contract_address = contract_address
+        self.multicall_address = multicall_address
         self._configuration_file_path = configuration_file_path
         self._coin_volatility = coin_volatility
         self._config = self._load_config()
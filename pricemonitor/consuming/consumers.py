@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from collections import defaultdict
-from typing import List
+from typing import Dict, List, Optional
 
 from pricemonitor.config import Config
 from pricemonitor.producing.data_producer import PairPrice
@@ -19,6 +19,16 @@ class DataConsumer(ABC):
     async def act(self, data: List[PairPrice], loop) -> None:
         pass
 
+    async def close(self) -> None:
+        pass
+
+    def warm_state(self) -> Dict:
+        """JSON serializable state that saves work when restored after a restart"""
+        return {}
+
+    def restore_warm_state(self, state: Dict) -> None:
+        pass
+
 
 class PrintValues(DataConsumer):
     async def act(self, data: List[PairPrice], loop) -> None:
@@ -60,15 +70,29 @@ class PrintValuesAndAverage(PrintValues):
 
 
 class ContractUpdater(DataConsumer):
-    def __init__(self, config: Config, force=False) -> None:
+    def __init__(
+        self,
+        config: Config,
+        force=False,
+        web3_interface: Optional[Web3Interface] = None,
+    ) -> None:
         super().__init__(config)
         self._print_monitor = PrintValues(config)
+        # Updaters sending from the same account must share its interface, so
+        # their nonces come from one nonce manager. A shared interface is closed
+        # and checkpointed by whoever created it.
+        self._owns_web3_interface = web3_interface is None
+        self._web3_interface = (
+            Web3Interface(config.network, multicall_address=config.multicall_address)
+            if self._owns_web3_interface
+            else web3_interface
+        )
         self._updater = SanityContractUpdater(
             Web3Connector(
                 private_key=config.private_key,
                 contract_abi=config.get_smart_contract_abi(),
                 contract_address=config.contract_address,
-                web3_interface=Web3Interface(config.network),
+                web3_interface=self._web3_interface,
             ),
             config=config,
         )
@@ -80,7 +104,27 @@ class ContractUpdater(DataConsumer):
             coin_price_data=data, force=self._force, loop=loop
         )
 
+    def warm_state(self) -> Dict:
+        state = {"updater": self._updater.warm_state()}
+        if self._owns_web3_interface:
+            state["web3_interface"] = self._web3_interface.warm_state()
+        return state
+
+    def restore_warm_state(self, state: Dict) -> None:
+        self._updater.restore_warm_state(state["updater"])
+        if self._owns_web3_interface and "web3_interface" in state:
+            self._web3_interface.restore_warm_state(state["web3_interface"])
+
+    async def close(self) -> None:
+        if self._owns_web3_interface:
+            await self._web3_interface.close()
+
 
 class ContractUpdaterForce(ContractUpdater):
-    def __init__(self, config: Config, force=True) -> None:
-        super().__init__(config=config, force=force)
+    def __init__(
+        self,
+        config: Config,
+        force=True,
+        web3_interface: Optional[Web3Interface] = None,
+    ) -> None:
+        super().__init__(config=config, force=force, web3_interface=web3_interface)
@@ -2,12 +2,13 @@ import asyncio
 import logging.config
 import time
 from asyncio import AbstractEventLoop
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from enum import Enum
 from functools import partial
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 from pricemonitor.coin_volatility import CoinVolatilityFile
-from pricemonitor.config import Config
+from pricemonitor.config import Coin, Config
 from pricemonitor.consuming.consumers import (
     PrintValues,
     PrintValuesAndAverage,
@@ -17,14 +18,20 @@ from pricemonitor.consuming.consumers import (
 )
 from pricemonitor.producing.all_token_prices import AllTokenPrices
 from pricemonitor.producing.data_producer import DataProducer
-from pricemonitor.producing.exchange_prices import (
-    ExchangePrices,
-    calculate_seconds_left_to_sleep,
-)
+from pricemonitor.producing.exchange_prices import ExchangePrices
 from pricemonitor.producing.feed_prices import FeedPrices
+from pricemonitor.producing.sharded_producer import ShardedProducer
+from pricemonitor.producing.shared_producer import SharedDataProducer
 
 from pricemonitor.producing.exchanges import Exchange
+from pricemonitor.scheduling import (
+    CycleScheduler,
+    LatestSnapshotPipeline,
+    run_until_first_failure,
+)
 from pricemonitor.storing.ethereum_nodes import Network
+from pricemonitor.storing.web3_interface import Web3Interface
+from pricemonitor.warm_state import WarmStateFile
 
 Task = namedtuple(
     "TASK",
@@ -36,6 +43,11 @@ CONTRACT_CONFIG_DEFAULT = CONTRACT_CONFIG_MAINNET
 
 COIN_VOLATILITY_PATH = "coin_volatility.json"
 
+WARM_STATE_PATH = "warm_state.json"
+WARM_STATE_CHECKPOINT_INTERVAL_IN_SECONDS = 10
+# Not a task name, task names are upper case
+_WEB3_INTERFACE_STATE_KEY = "web3_interface"
+
 log = logging.getLogger(__name__)
 
 
@@ -56,6 +68,20 @@ class Tasks(Enum):
         interval_in_millis=5 * 1000,
     )
 
+    PRINT_STREAM_AVERAGE_LAST_MINUTE = Task(
+        data_producer=AllTokenPrices,
+        data_producer_params={"use_trade_streams": True},
+        data_consumer=PrintValues,
+        interval_in_millis=5 * 1000,
+    )
+
+    PRINT_TICKERS_LAST_PRICE = Task(
+        data_producer=AllTokenPrices,
+        data_producer_params={"exchange_data_action": Exchange.get_ticker_last_price},
+        data_consumer=PrintValues,
+        interval_in_millis=5 * 1000,
+    )
+
     VOLATILITY_EVERY_THIRTY_SECONDS = Task(
         data_producer=ExchangePrices,
         data_producer_params={
@@ -74,6 +100,13 @@ class Tasks(Enum):
         interval_in_millis=1 * 60 * 1000,
     )
 
+    UPDATE_CONTRACT_STREAM_AVERAGE_LAST_MINUTE = Task(
+        data_producer=AllTokenPrices,
+        data_producer_params={"use_trade_streams": True},
+        data_consumer=ContractUpdater,
+        interval_in_millis=1 * 60 * 1000,
+    )
+
     UPDATE_CONTRACT_AVERAGE_LAST_SECOND_FORCE = Task(
         data_producer=AllTokenPrices,
         data_producer_params={
@@ -83,15 +116,25 @@ class Tasks(Enum):
         interval_in_millis=1 * 1000,
     )
 
+    UPDATE_CONTRACT_TICKERS_LAST_PRICE_FORCE = Task(
+        data_producer=AllTokenPrices,
+        data_producer_params={"exchange_data_action": Exchange.get_ticker_last_price},
+        data_consumer=ContractUpdaterForce,
+        interval_in_millis=1 * 1000,
+    )
+
 
 async def main(
-    task: Tasks,
+    tasks: List[Tasks],
     loop: AbstractEventLoop,
     configuration_file_path: str,
     contract_address: str,
     private_key: str,
     network: Network,
     coin_volatility_path: str = COIN_VOLATILITY_PATH,
+    multicall_address: str = None,
+    shards: int = 1,
+    warm_state_path: Optional[str] = WARM_STATE_PATH,
 ) -> None:
     config = Config(
         configuration_file_path=configuration_file_path,
@@ -99,18 +142,181 @@ async def main(
         network=network,
         contract_address=contract_address,
         private_key=private_key,
+        multicall_address=multicall_address,
     )
 
-    producer = task.value.data_producer(
-        coins=config.coins, market=config.market, **task.value.data_producer_params
+    producers = _make_shared_producers(
+        [task.value for task in tasks],
+        coins=config.coins,
+        market=config.market,
+        shards=shards,
     )
-    await producer.initialize()
-    await monitor_forever(
-        data_producer=producer,
-        data_consumer=task.value.data_consumer(config),
-        interval_in_milliseconds=task.value.interval_in_millis,
-        loop=loop,
+    # All the updaters send from the configured account, through one interface
+    web3_interface = (
+        Web3Interface(config.network, multicall_address=config.multicall_address)
+        if any(issubclass(task.value.data_consumer, ContractUpdater) for task in tasks)
+        else None
     )
+    consumers = [_make_consumer(task.value, config, web3_interface) for task in tasks]
+    warm_state_file = WarmStateFile(warm_state_path) if warm_state_path else None
+    if warm_state_file is not None:
+        _restore_warm_state(
+            warm_state_file.load(), tasks, producers, consumers, web3_interface
+        )
+
+    def get_warm_state():
+        return _warm_state(tasks, producers, consumers, web3_interface)
+
+    try:
+        await asyncio.gather(
+            *[producer.initialize() for producer in producers.values()]
+        )
+        checkpointing = (
+            [_checkpoint_forever(warm_state_file, get_warm_state)]
+            if warm_state_file is not None
+            else []
+        )
+        try:
+            await run_until_first_failure(
+                *[
+                    monitor_forever(
+                        data_producer=producers[_producer_key(task.value)],
+                        data_consumer=consumer,
+                        interval_in_milliseconds=task.value.interval_in_millis,
+                        loop=loop,
+                    )
+                    for task, consumer in zip(tasks, consumers)
+                ],
+                *checkpointing,
+            )
+        finally:
+            if warm_state_file is not None:
+                _save_warm_state(warm_state_file, get_warm_state())
+    finally:
+        for producer in producers.values():
+            await producer.close()
+        for consumer in consumers:
+            await consumer.close()
+        if web3_interface is not None:
+            await web3_interface.close()
+
+
+def _make_consumer(
+    task: Task, config: Config, web3_interface: Optional[Web3Interface]
+) -> DataConsumer:
+    if issubclass(task.data_consumer, ContractUpdater):
+        return task.data_consumer(config, web3_interface=web3_interface)
+    return task.data_consumer(config)
+
+
+def _warm_state(
+    tasks: List[Tasks],
+    producers: Dict[Tuple, DataProducer],
+    consumers: List[DataConsumer],
+    web3_interface: Optional[Web3Interface] = None,
+) -> Dict:
+    """Warm state by task name, a shared producer's is saved with its first task.
+
+    The shared web3 interface is saved once, under its own key.
+    """
+    state = {}
+    if web3_interface is not None:
+        state[_WEB3_INTERFACE_STATE_KEY] = web3_interface.warm_state()
+    saved_producers = set()
+    for task, consumer in zip(tasks, consumers):
+        task_state = {"consumer": consumer.warm_state()}
+        key = _producer_key(task.value)
+        if key not in saved_producers:
+            task_state["producer"] = producers[key].warm_state()
+            saved_producers.add(key)
+        state[task.name] = task_state
+    return state
+
+
+def _restore_warm_state(
+    state: Dict,
+    tasks: List[Tasks],
+    producers: Dict[Tuple, DataProducer],
+    consumers: List[DataConsumer],
+    web3_interface: Optional[Web3Interface] = None,
+) -> None:
+    restored_producers = set()
+    try:
+        if web3_interface is not None and _WEB3_INTERFACE_STATE_KEY in state:
+            web3_interface.restore_warm_state(state[_WEB3_INTERFACE_STATE_KEY])
+        for task, consumer in zip(tasks, consumers):
+            task_state = state.get(task.name)
+            if task_state is None:
+                continue
+            consumer.restore_warm_state(task_state["consumer"])
+            key = _producer_key(task.value)
+            if "producer" in task_state and key not in restored_producers:
+                producers[key].restore_warm_state(task_state["producer"])
+                restored_producers.add(key)
+    except (KeyError, TypeError, ValueError):
+        # Whatever was not restored yet starts cold
+        log.exception("Error restoring warm state")
+
+
+async def _checkpoint_forever(
+    warm_state_file: WarmStateFile, get_warm_state: Callable[[], Dict]
+) -> None:
+    while True:
+        await asyncio.sleep(WARM_STATE_CHECKPOINT_INTERVAL_IN_SECONDS)
+        _save_warm_state(warm_state_file, get_warm_state())
+
+
+def _save_warm_state(warm_state_file: WarmStateFile, state: Dict) -> None:
+    try:
+        warm_state_file.save(state)
+    except OSError:
+        log.exception("Error saving warm state")
+
+
+def _producer_key(task: Task) -> Tuple:
+    """Tasks with the same key produce the same data"""
+    return task.data_producer, tuple(sorted(task.data_producer_params.items()))
+
+
+# Producers that can split the exchanges' rate limits between shards
+_SHARDABLE_PRODUCERS = (AllTokenPrices, ExchangePrices)
+
+
+def _make_shared_producers(
+    tasks: List[Task], coins: List[Coin], market: Coin, shards: int
+) -> Dict[Tuple, SharedDataProducer]:
+    tasks_by_producer = defaultdict(list)  # type: Dict[Tuple, List[Task]]
+    for task in tasks:
+        tasks_by_producer[_producer_key(task)].append(task)
+
+    producers = {}
+    for key, producer_tasks in tasks_by_producer.items():
+        task = producer_tasks[0]
+        shortest_interval_in_millis = min(
+            producer_task.interval_in_millis for producer_task in producer_tasks
+        )
+        producer_params = dict(task.data_producer_params)
+        if issubclass(task.data_producer, AllTokenPrices):
+            # A slow source must not hold up a cycle past the next one's start
+            producer_params.setdefault(
+                "producer_timeout_in_seconds", shortest_interval_in_millis / 1000
+            )
+        if shards > 1 and issubclass(task.data_producer, _SHARDABLE_PRODUCERS):
+            producer = ShardedProducer(
+                coins=coins,
+                market=market,
+                shards=shards,
+                data_producer=task.data_producer,
+                data_producer_params=producer_params,
+            )  # type: DataProducer
+        else:
+            producer = task.data_producer(coins=coins, market=market, **producer_params)
+        # Tasks ticking together share a sample, no task gets the same one twice
+        producers[key] = SharedDataProducer(
+            producer,
+            max_age_in_seconds=shortest_interval_in_millis / 1000 / 2,
+        )
+    return producers
 
 
 async def monitor_forever(
@@ -119,28 +325,37 @@ async def monitor_forever(
     interval_in_milliseconds: int,
     loop: AbstractEventLoop,
 ) -> None:
-    while True:
+    pipeline = LatestSnapshotPipeline(
+        CycleScheduler(interval_in_seconds=interval_in_milliseconds / 1000)
+    )
+
+    async def produce():
         start_time = time.time()
         log.info("Starting new monitor cycle")
-
         coin_prices = await data_producer.get_data(loop=loop)
-        await data_consumer.act(data=coin_prices, loop=loop)
-
         log.info(
-            f"Finished monitor cycle (took {(time.time() - start_time):.1f} seconds), going to sleep."
-        )
-        await asyncio.sleep(
-            calculate_seconds_left_to_sleep(start_time, interval_in_milliseconds),
-            loop=loop,
+            f"Produced prices (took {(time.time() - start_time):.1f} seconds). "
+            + f"Pipeline stats: {pipeline.stats()}"
         )
+        return coin_prices
+
+    async def consume(coin_prices):
+        start_time = time.time()
+        await data_consumer.act(data=coin_prices, loop=loop)
+        log.info(f"Acted on prices (took {(time.time() - start_time):.1f} seconds)")
+
+    await pipeline.run_forever(produce, consume)
 
 
 def run_on_loop(
     private_key: str,
     contract_address: str,
     network_name: str,
-    task_name: str = "UPDATE_CONTRACT_AVERAGE_LAST_MINUTE",
+    task_name: Union[str, Sequence[str]] = "UPDATE_CONTRACT_AVERAGE_LAST_MINUTE",
     configuration_file_path: str = CONTRACT_CONFIG_DEFAULT,
+    multicall_address: str = None,
+    shards: int = 1,
+    warm_state_path: Optional[str] = WARM_STATE_PATH,
 ):
     log.debug("Starting event loop")
     loop = asyncio.get_event_loop()
@@ -153,11 +368,21 @@ def run_on_loop(
     #     loop.close()
     loop.run_until_complete(
         main(
-            task=Tasks[task_name],
+            tasks=[Tasks[name] for name in _task_names(task_name)],
             loop=loop,
             network=Network[network_name].value,
             private_key=private_key,
             contract_address=contract_address,
             configuration_file_path=configuration_file_path,
+            multicall_address=multicall_address,
+            shards=shards,
+            warm_state_path=warm_state_path,
         )
     )
+
+
+def _task_names(task_name: Union[str, Sequence[str]]) -> List[str]:
+    """Several tasks are given as a list or as comma separated names"""
+    if isinstance(task_name, str):
+        return [name.strip() for name in task_name.split(",")]
+    return list(task_name)
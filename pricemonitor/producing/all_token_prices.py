@@ -1,38 +1,76 @@
+import asyncio
 import itertools
 import logging
-from typing import List
+from typing import Dict, List
 
 from pricemonitor.config import Coin
 from pricemonitor.exceptions import PriceMonitorException
 from pricemonitor.producing.data_producer import DataProducer, PairPrice
 from pricemonitor.producing.exchange_prices import ExchangePrices
 from pricemonitor.producing.feed_prices import FeedPrices
+from pricemonitor.producing.trade_streams import TradeStreamPrices
 
 log = logging.getLogger(__name__)
 
 
 class AllTokenPrices(DataProducer):
+    _DEFAULT_PRODUCER_TIMEOUT_IN_SECONDS = 30
+
     def __init__(
-        self, coins: List[Coin], market: Coin, exchange_data_action=None
+        self,
+        coins: List[Coin],
+        market: Coin,
+        exchange_data_action=None,
+        network_access=None,
+        producer_timeout_in_seconds: float = _DEFAULT_PRODUCER_TIMEOUT_IN_SECONDS,
+        use_trade_streams: bool = False,
+        rate_limit_share: float = 1,
     ) -> None:
         super().__init__(coins=coins, market=market)
+        self._producer_timeout_in_seconds = producer_timeout_in_seconds
 
         self._expected_pairs = {
             f"{coin.symbol}/{self._market.symbol}" for coin in self._coins
         }
         # TODO: use data from JSON to call with cex coins and feed coins separately
-        self._exchange_prices = ExchangePrices(
-            coins=coins, market=market, exchange_data_action=exchange_data_action
+        if use_trade_streams:
+            self._exchange_prices = TradeStreamPrices(
+                coins=coins, market=market, network_access=network_access
+            )  # type: DataProducer
+        else:
+            self._exchange_prices = ExchangePrices(
+                coins=coins,
+                market=market,
+                exchange_data_action=exchange_data_action,
+                rate_limit_share=rate_limit_share,
+            )
+        self._feed_prices = FeedPrices(
+            coins=coins, market=market, network_access=network_access
         )
-        self._feed_prices = FeedPrices(coins=coins, market=market)
 
     async def initialize(self) -> None:
         await self._exchange_prices.initialize()
         await self._feed_prices.initialize()
 
+    async def close(self) -> None:
+        await self._exchange_prices.close()
+        await self._feed_prices.close()
+
+    def warm_state(self) -> Dict:
+        return {"exchange_prices": self._exchange_prices.warm_state()}
+
+    def restore_warm_state(self, state: Dict) -> None:
+        self._exchange_prices.restore_warm_state(state["exchange_prices"])
+
     async def get_data(self, loop) -> List[PairPrice]:
-        exchange_prices = await self._try_getting_prices(self._exchange_prices, loop)
-        feed_prices = await self._try_getting_prices(self._feed_prices, loop)
+        exchange_prices, feed_prices = await asyncio.gather(
+            self._try_getting_prices(
+                self._exchange_prices, loop, self._producer_timeout_in_seconds
+            ),
+            self._try_getting_prices(
+                self._feed_prices, loop, self._producer_timeout_in_seconds
+            ),
+        )
 
         # TODO: return an itertools instead of list
         pair_prices = list(itertools.chain(exchange_prices, feed_prices))
@@ -49,9 +87,19 @@ class AllTokenPrices(DataProducer):
             log.warning(f"Error getting prices for: {missing_names}")
 
     @staticmethod
-    async def _try_getting_prices(source: DataProducer, loop) -> List[PairPrice]:
+    async def _try_getting_prices(
+        source: DataProducer, loop, timeout_in_seconds: float
+    ) -> List[PairPrice]:
         try:
-            prices = await source.get_data(loop)
+            prices = await asyncio.wait_for(
+                source.get_data(loop), timeout=timeout_in_seconds
+            )
+        except asyncio.TimeoutError:
+            log.warning(
+                f"Timed out getting prices from source {source.__class__} "
+                + f"(after {timeout_in_seconds} seconds)"
+            )
+            prices = []
         except PriceMonitorException:
             log.exception(f"Error getting prices from source " + f"{source.__class__}")
             prices = []
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from collections import namedtuple
-from typing import List
+from typing import Dict, List
 
 from pricemonitor.config import Coin
 
@@ -19,3 +19,14 @@ class DataProducer(ABC):
     @abstractmethod
     async def get_data(self, loop) -> List[PairPrice]:
         pass
+
+    async def close(self) -> None:
+        pass
+
+    def warm_state(self) -> Dict:
+        """JSON serializable state that saves work when restored after a restart"""
+        return {}
+
+    def restore_warm_state(self, state: Dict) -> None:
+        """Restores a `warm_state()`, called before `initialize()`"""
+        pass
@@ -1,8 +1,8 @@
 import asyncio
 import logging
-import time
-from typing import List, Optional
+from typing import Dict, List, Optional
 
+from pricemonitor.config import Coin
 from pricemonitor.producing.data_producer import DataProducer, PairPrice
 from pricemonitor.producing.exchanges import Exchange, ExchangeName
 from util.calculations import calculate_average
@@ -10,19 +10,21 @@ from util.calculations import calculate_average
 log = logging.getLogger(__name__)
 
 
-def calculate_seconds_left_to_sleep(
-    start_time: float, interval_in_milliseconds: int
-) -> float:
-    time_now = time.time()
-    next_iteration_time = start_time + interval_in_milliseconds
-    return (next_iteration_time - time_now) / 1000
-
-
 class ExchangePrices(DataProducer):
     _DEFAULT_EXCHANGES = [ExchangeName.BINANCE, ExchangeName.HUOBI]
+    _DEFAULT_MARKETS_REFRESH_INTERVAL_IN_SECONDS = 60 * 60
+    _DEFAULT_REQUEST_TIMEOUT_IN_SECONDS = 10
 
     def __init__(
-        self, coins, market, exchanges=None, exchange_data_action=None
+        self,
+        coins,
+        market,
+        exchanges=None,
+        exchange_data_action=None,
+        markets_refresh_interval_in_seconds: float = _DEFAULT_MARKETS_REFRESH_INTERVAL_IN_SECONDS,
+        request_timeout_in_seconds: float = _DEFAULT_REQUEST_TIMEOUT_IN_SECONDS,
+        hedge_requests: bool = False,
+        rate_limit_share: float = 1,
     ) -> None:
         super().__init__(coins=coins, market=market)
 
@@ -32,14 +34,50 @@ class ExchangePrices(DataProducer):
         self._exchange_names = exchanges
         self._exchange_data_action = exchange_data_action
         self._exchanges = None  # type: Optional[List[Exchange]]
+        # Routing table of the exchanges that trade each coin
+        self._exchanges_per_coin = {}  # type: Dict[Coin, List[Exchange]]
+        self._routing_markets_versions = None  # type: Optional[List[int]]
+        self._markets_refresh_interval_in_seconds = markets_refresh_interval_in_seconds
+        self._request_timeout_in_seconds = request_timeout_in_seconds
+        self._hedge_requests = hedge_requests
+        self._rate_limit_share = rate_limit_share
+        self._restored_state = {}  # type: Dict
 
     async def initialize(self) -> None:
-        self._exchanges = [await Exchange.create(name) for name in self._exchange_names]
+        self._exchanges = [
+            await Exchange.create(
+                name,
+                markets_refresh_interval_in_seconds=self._markets_refresh_interval_in_seconds,
+                request_timeout_in_seconds=self._request_timeout_in_seconds,
+                hedge_requests=self._hedge_requests,
+                rate_limit_share=self._rate_limit_share,
+                warm_state=self._restored_state.get(name.name),
+            )
+            for name in self._exchange_names
+        ]
+        self._update_routing_table()
+
+    def warm_state(self) -> Dict:
+        return {
+            name.name: exchange.warm_state()
+            for name, exchange in zip(self._exchange_names, self._exchanges or [])
+        }
+
+    def restore_warm_state(self, state: Dict) -> None:
+        self._restored_state = state
+
+    async def close(self) -> None:
+        for exchange in self._exchanges or []:
+            exchange.stop_markets_refresh()
 
     async def get_data(self, loop) -> List[PairPrice]:
         log.debug("Preparing exchange data")
+        if self._routing_markets_versions != self._markets_versions():
+            self._update_routing_table()
         data = await self._get_data_for_multiple_coins(self._exchange_data_action, loop)
         log.debug("Finished preparing exchange data")
+        for exchange in self._exchanges:
+            log.debug(f"{exchange.name} rate limiter: {exchange.rate_limiter.stats()}")
         return data
 
     async def _get_data_for_multiple_coins(
@@ -57,13 +95,12 @@ class ExchangePrices(DataProducer):
         coin_prices = await asyncio.gather(*coin_prices_calculations, loop=loop)
         return coin_prices
 
-    # TODO: filter pairs that are not traded on the exchange
     async def _get_data_for_single_coin(
         self, coin, market, loop, exchange_data_action
     ) -> PairPrice:
         exchange_api_calls = (
             exchange_data_action(exchange, coin=coin, market=market)
-            for exchange in self._exchanges
+            for exchange in self._exchanges_per_coin.get(coin, [])
         )
         data_from_all_exchanges = [
             value
@@ -78,3 +115,24 @@ class ExchangePrices(DataProducer):
         return PairPrice(
             pair=(coin, market), price=calculate_average(data_from_all_exchanges)
         )
+
+    def _markets_versions(self) -> List[int]:
+        return [exchange.markets_version for exchange in self._exchanges]
+
+    def _update_routing_table(self) -> None:
+        self._routing_markets_versions = self._markets_versions()
+        self._exchanges_per_coin = {
+            coin: [
+                exchange
+                for exchange in self._exchanges
+                if exchange.supports(coin, self._market)
+            ]
+            for coin in self._coins
+        }
+        unsupported = [
+            coin.symbol
+            for coin, exchanges in self._exchanges_per_coin.items()
+            if not exchanges
+        ]
+        if unsupported:
+            log.info(f"Coins not traded on any exchange: {unsupported}")
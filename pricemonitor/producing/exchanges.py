@@ -1,56 +1,175 @@
 import asyncio
 import logging
+import time
 from collections import namedtuple
 from enum import Enum
-from typing import Optional, Set, Tuple
+from functools import partial
+from typing import Dict, Optional, Set, Tuple
 
 import ccxt.async as ccxt
 
 from pricemonitor.config import Coin
-from util.time import minutes_ago_in_millis_since_epoch
+from pricemonitor.producing.hedging import hedged_request
+from pricemonitor.producing.rate_limiter import RateLimit, RateLimiter, share_of
+from pricemonitor.producing.trade_window import TradeWindow
+from util.latency import LatencyTracker
+from util.time import minutes_ago_in_millis_since_epoch, millis_since_epoch
 
 log = logging.getLogger(__name__)
 
-ExchangeData = namedtuple("ExchangeData", ["name", "config"])
+ExchangeData = namedtuple("ExchangeData", ["name", "config", "rate_limit"])
 
 
 class ExchangeName(Enum):
-    BINANCE = ExchangeData(name=ccxt.binance, config={})
-    BITTREX = ExchangeData(name=ccxt.bittrex, config={})
-    HUOBI = ExchangeData(name=ccxt.huobipro, config={"enableRateLimit": True})
+    # https://github.com/binance-exchange/binance-official-api-docs/blob/master/rest-api.md#limits
+    BINANCE = ExchangeData(
+        name=ccxt.binance,
+        config={},
+        rate_limit=RateLimit(
+            weight_per_second=20,
+            burst=40,
+            max_in_flight=10,
+            weights={"fetch_tickers": 40},
+        ),
+    )
+    BITTREX = ExchangeData(
+        name=ccxt.bittrex,
+        config={},
+        rate_limit=RateLimit(weight_per_second=1, burst=5, max_in_flight=5, weights={}),
+    )
+    HUOBI = ExchangeData(
+        name=ccxt.huobipro,
+        config={"enableRateLimit": True},
+        rate_limit=RateLimit(
+            weight_per_second=10, burst=10, max_in_flight=5, weights={}
+        ),
+    )
 
 
 class Exchange:
-    def __init__(self, exchange_name: ExchangeName) -> None:
+    _LAST_MINUTE = 1
+    # All calls for tickers within this period share a single bulk request
+    _TICKERS_MAX_AGE_IN_SECONDS = 1
+    _DEFAULT_REQUEST_TIMEOUT_IN_SECONDS = 10
+    # Hedged requests send a duplicate after this percentile of recent latencies
+    _HEDGE_AFTER_LATENCY_PERCENTILE = 95
+
+    def __init__(
+        self,
+        exchange_name: ExchangeName,
+        request_timeout_in_seconds: float = _DEFAULT_REQUEST_TIMEOUT_IN_SECONDS,
+        hedge_requests: bool = False,
+        rate_limit_share: float = 1,
+    ) -> None:
         self._exchange = exchange_name.value.name(exchange_name.value.config)
+        # Shared by all calls to the exchange. Processes calling the exchange
+        # at the same time split its rate limit, each using its share.
+        self.rate_limiter = RateLimiter(
+            share_of(exchange_name.value.rate_limit, rate_limit_share)
+        )
+        self._request_timeout_in_seconds = request_timeout_in_seconds
+        self._hedge_requests = hedge_requests
+        self._latency = LatencyTracker()
         self._supported_markets = None  # type: Optional[Set[Tuple[str, str]]]
+        # Trades of recent calls, per symbol and time period in minutes
+        self._trade_windows = {}  # type: Dict[Tuple[str, float], TradeWindow]
+        self._tickers = None  # type: Optional[asyncio.Future]
+        self._tickers_request_time = None  # type: Optional[float]
+        # Incremented on every markets update, lets users detect changes cheaply
+        self.markets_version = 0
+        self.last_markets_update_duration_in_seconds = None  # type: Optional[float]
+        self._markets_refresh_task = None  # type: Optional[asyncio.Future]
+
+    @property
+    def name(self) -> str:
+        return self._exchange.name
 
     @classmethod
-    async def create(cls, exchange_name):
-        exchange = cls(exchange_name)
-        await exchange.update_supported_markets()
+    async def create(
+        cls,
+        exchange_name,
+        markets_refresh_interval_in_seconds=None,
+        request_timeout_in_seconds=_DEFAULT_REQUEST_TIMEOUT_IN_SECONDS,
+        hedge_requests=False,
+        warm_state=None,
+        rate_limit_share=1,
+    ):
+        exchange = cls(
+            exchange_name,
+            request_timeout_in_seconds=request_timeout_in_seconds,
+            hedge_requests=hedge_requests,
+            rate_limit_share=rate_limit_share,
+        )
+        if warm_state:
+            exchange.restore_warm_state(warm_state)
+        else:
+            await exchange.update_supported_markets()
+        if markets_refresh_interval_in_seconds is not None:
+            exchange.start_markets_refresh(markets_refresh_interval_in_seconds)
         return exchange
 
+    def warm_state(self) -> Dict:
+        if self._supported_markets is None:
+            return {}
+        return {
+            "markets": sorted("/".join(market) for market in self._supported_markets),
+            "trade_windows": [
+                # symbol, time period in minutes, trades
+                [*key, window.trades()]
+                for key, window in self._trade_windows.items()
+            ],
+        }
+
+    def restore_warm_state(self, state: Dict) -> None:
+        self._supported_markets = {
+            tuple(market.split("/")) for market in state["markets"]
+        }
+        self.markets_version += 1
+        for symbol, time_period_in_minutes, trades in state["trade_windows"]:
+            window = TradeWindow(window_in_millis=time_period_in_minutes * 60_000)
+            for timestamp, price, trade_id in trades:
+                window.add(timestamp=timestamp, price=price, trade_id=trade_id)
+            self._trade_windows[(symbol, time_period_in_minutes)] = window
+        log.info(
+            f"Restored {len(self._supported_markets)} markets and "
+            + f"{len(self._trade_windows)} trade windows of {self._exchange.name}"
+        )
+
+    def start_markets_refresh(self, interval_in_seconds: float) -> None:
+        self.stop_markets_refresh()
+        self._markets_refresh_task = asyncio.ensure_future(
+            self._refresh_markets_forever(interval_in_seconds)
+        )
+
+    def stop_markets_refresh(self) -> None:
+        if self._markets_refresh_task is not None:
+            self._markets_refresh_task.cancel()
+            self._markets_refresh_task = None
+
     async def get_last_trade_price(self, coin: Coin, market: Coin) -> Optional[float]:
         if not self._verify_supported(coin, market):
             # TODO: raise exception instead of returning None
             return None
 
-        try:
-            trades = await self._exchange.fetch_trades(
-                symbol=_prepare_symbol(coin, market), limit=1
-            )
-            return trades[0]["price"]
-        except Exception as e:
-            log.debug(e)
-            # TODO: raise exception instead of returning None
-            return None
+        # A trade older than the window is not current, the exchange is asked again
+        window = self._trade_windows.get(
+            (_prepare_symbol(coin, market), self._LAST_MINUTE)
+        )
+        if (
+            window is not None
+            and window.last_timestamp is not None
+            and millis_since_epoch() - window.last_timestamp
+            <= self._LAST_MINUTE * 60_000
+        ):
+            return window.last_price
+
+        return await self._fetch_last_trade_price(coin, market)
 
     async def get_average_of_trades_last_minute(
         self, coin: Coin, market: Coin
     ) -> Optional[float]:
         return await self._get_trades_average(
-            coin=coin, market=market, since=minutes_ago_in_millis_since_epoch(1)
+            coin=coin, market=market, time_period_in_minutes=self._LAST_MINUTE
         )
 
     async def get_last_minute_trades_average_or_last_trade(
@@ -65,7 +184,42 @@ class Exchange:
             f"Could not get last minute trades, fetching last trade"
             + f"({self._exchange.name}: {coin.symbol}/{market.symbol})"
         )
-        return await self.get_last_trade_price(coin, market)
+        # Not the window's last price: either updating the window just failed,
+        # or its last trade is older than a minute
+        if not self._verify_supported(coin, market):
+            return None
+        return await self._fetch_last_trade_price(coin, market)
+
+    async def _fetch_last_trade_price(
+        self, coin: Coin, market: Coin
+    ) -> Optional[float]:
+        try:
+            trades = await self._request(
+                "fetch_trades", symbol=_prepare_symbol(coin, market), limit=1
+            )
+            return trades[0]["price"]
+        except Exception as e:
+            log.debug(e)
+            # TODO: raise exception instead of returning None
+            return None
+
+    async def get_ticker_last_price(self, coin: Coin, market: Coin) -> Optional[float]:
+        """ Last price of the pair, sliced from a single bulk request for all tickers """
+        if not self._verify_supported(coin, market):
+            # TODO: raise exception instead of returning None
+            return None
+
+        symbol = _prepare_symbol(coin, market)
+        try:
+            if self._exchange.has.get("fetchTickers"):
+                ticker = (await self._get_all_tickers())[symbol]
+            else:
+                ticker = await self._request("fetch_ticker", symbol)
+            return ticker["last"] if ticker["last"] is not None else ticker["close"]
+        except Exception as e:
+            log.debug(e)
+            # TODO: raise exception instead of returning None
+            return None
 
     async def get_volatility(
         self, coin: Coin, market: Coin, time_period_in_minutes: float
@@ -76,58 +230,150 @@ class Exchange:
             return None
 
         try:
-            trades = await self._exchange.fetch_trades(
-                symbol=_prepare_symbol(coin, market),
-                since=minutes_ago_in_millis_since_epoch(time_period_in_minutes),
+            window = await self._update_trade_window(
+                coin=coin, market=market, time_period_in_minutes=time_period_in_minutes
             )
         except Exception as e:
             log.warning(e)
             # TODO: raise exception instead of returning None
             return None
 
-        if not trades:
+        now = millis_since_epoch()
+        max_price = window.max_price(now)
+        min_price = window.min_price(now)
+        if max_price is None:
             log.info(
                 f"No trades for {coin}/{market} in {self._exchange.name} during past {time_period_in_minutes} minutes"
             )
             return 0
 
-        trade_prices = [trade["price"] for trade in trades]
-
-        max_price = max(trade_prices)
-        min_price = min(trade_prices)
         return abs((max_price - min_price) / max_price) * 100
 
     async def _get_trades_average(
-        self, coin: Coin, market: Coin, limit: int = None, since: float = None
+        self, coin: Coin, market: Coin, time_period_in_minutes: float
     ) -> Optional[float]:
         if not self._verify_supported(coin, market):
             # TODO: raise exception instead of returning None
             return None
 
         try:
-            trades = await self._exchange.fetch_trades(
-                symbol=_prepare_symbol(coin, market), limit=limit, since=since
+            window = await self._update_trade_window(
+                coin=coin, market=market, time_period_in_minutes=time_period_in_minutes
             )
         except Exception as e:
             log.debug(e)
             # TODO: raise exception instead of returning None
             return None
 
-        prices = [trade["price"] for trade in trades]
         # TODO: raise exception instead of returning None
-        return sum(prices) / len(prices) if prices else None
+        return window.average(millis_since_epoch())
+
+    async def _update_trade_window(
+        self, coin: Coin, market: Coin, time_period_in_minutes: float
+    ) -> TradeWindow:
+        """Fetches only trades newer than the ones already in the window"""
+        symbol = _prepare_symbol(coin, market)
+        key = (symbol, time_period_in_minutes)
+        window = self._trade_windows.get(key)
+        if window is None:
+            window = TradeWindow(window_in_millis=time_period_in_minutes * 60_000)
+            self._trade_windows[key] = window
+
+        since = minutes_ago_in_millis_since_epoch(time_period_in_minutes)
+        if window.last_timestamp is not None:
+            # Trades sharing the last timestamp are fetched again and deduplicated
+            since = max(since, window.last_timestamp)
+
+        trades = await self._request("fetch_trades", symbol=symbol, since=since)
+        for trade in sorted(trades, key=lambda trade: trade["timestamp"]):
+            window.add(
+                timestamp=trade["timestamp"], price=trade["price"], trade_id=trade["id"]
+            )
+        return window
+
+    async def _request(self, method_name: str, *args, **kwargs):
+        """Calls a ccxt exchange method within the exchange's rate limits and timeout"""
+        return await asyncio.wait_for(
+            self._hedged_request(method_name, *args, **kwargs),
+            timeout=self._request_timeout_in_seconds,
+        )
+
+    async def _hedged_request(self, method_name: str, *args, **kwargs):
+        async with self.rate_limiter.limit(self.rate_limiter.weight_of(method_name)):
+            # Hedged only once let through by the rate limiter, so waiting for
+            # it is not taken for a slow reply. The duplicate waits for its own
+            # turn, it never goes over the exchange's rate limit.
+            hedge_after = (
+                self._latency.percentile(self._HEDGE_AFTER_LATENCY_PERCENTILE)
+                if self._hedge_requests
+                else None
+            )
+            return await hedged_request(
+                partial(self._timed_request, method_name, *args, **kwargs),
+                hedge_after_in_seconds=hedge_after,
+                hedge_factory=partial(
+                    self._rate_limited_request, method_name, *args, **kwargs
+                ),
+            )
+
+    async def _rate_limited_request(self, method_name: str, *args, **kwargs):
+        async with self.rate_limiter.limit(self.rate_limiter.weight_of(method_name)):
+            return await self._timed_request(method_name, *args, **kwargs)
+
+    async def _timed_request(self, method_name: str, *args, **kwargs):
+        start_time = time.time()
+        response = await getattr(self._exchange, method_name)(*args, **kwargs)
+        self._latency.record(time.time() - start_time)
+        return response
+
+    async def _get_all_tickers(self) -> Dict[str, Dict]:
+        now = asyncio.get_event_loop().time()
+        if (
+            self._tickers is None
+            or now - self._tickers_request_time > self._TICKERS_MAX_AGE_IN_SECONDS
+        ):
+            log.debug(f"Fetching all tickers from {self._exchange.name}")
+            self._tickers_request_time = now
+            self._tickers = asyncio.ensure_future(self._request("fetch_tickers"))
+        # Shielded, so a caller timing out does not cancel the request shared by others
+        return await asyncio.shield(self._tickers)
+
+    def supports(self, coin: Coin, market: Coin) -> bool:
+        return self._verify_supported(coin, market)
 
     def _verify_supported(self, coin: Coin, market: Coin) -> bool:
         return (coin.symbol, market.symbol) in self._supported_markets
 
     async def _get_supported_markets(self) -> Set[Tuple[str, str]]:
-        markets = await self._exchange.load_markets()
+        # ccxt caches loaded markets, so they have to be reloaded explicitly
+        markets = await self._request("load_markets", reload=True)
         market_set = {tuple(coins.split("/")) for coins in markets.keys()}
         return market_set
 
     async def update_supported_markets(self) -> None:
         log.info(f"Updating supported markets for {self._exchange.name}")
-        self._supported_markets = await self._get_supported_markets()
+        start_time = time.time()
+        supported_markets = await self._get_supported_markets()
+        # The new set replaces the old one at once, readers never see a partial set
+        self._supported_markets = supported_markets
+        self.markets_version += 1
+        self.last_markets_update_duration_in_seconds = time.time() - start_time
+        log.info(
+            f"Updated supported markets for {self._exchange.name} "
+            + f"({len(supported_markets)} markets, "
+            + f"took {self.last_markets_update_duration_in_seconds:.2f} seconds)"
+        )
+
+    async def _refresh_markets_forever(self, interval_in_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_in_seconds)
+            try:
+                await self.update_supported_markets()
+            except Exception:
+                log.exception(
+                    f"Error updating supported markets for {self._exchange.name}, "
+                    + f"keeping previous markets"
+                )
 
 
 def _prepare_symbol(coin: Coin, market: Coin) -> str:
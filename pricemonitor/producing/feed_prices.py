@@ -1,13 +1,13 @@
+import asyncio
 import logging
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from pricemonitor.config import Coin
 from pricemonitor.exceptions import PriceMonitorException
 from pricemonitor.producing.data_producer import DataProducer, PairPrice
-from util import network
 from util.functional import first
-from util.network import DataFormat, NetworkError
+from util.network import DataFormat, NetworkError, NetworkClient
 
 log = logging.getLogger(__name__)
 
@@ -96,24 +96,61 @@ class BtcFeed(Feed):
 
 
 class FeedPrices(DataProducer):
-    def __init__(self, coins: List[Coin], market: Coin) -> None:
+    _DEFAULT_FEED_TIMEOUT_IN_SECONDS = 5
+    _FEEDS_BY_SYMBOL = {"DGX": DigixFeed, "WBTC": BtcFeed}
+
+    def __init__(
+        self,
+        coins: List[Coin],
+        market: Coin,
+        network_access=None,
+        feed_timeout_in_seconds: float = _DEFAULT_FEED_TIMEOUT_IN_SECONDS,
+    ) -> None:
         super().__init__(coins=coins, market=market)
-        self._digix_feed = DigixFeed(coins=coins, market=market, network_access=network)
-        self._btc_feed = BtcFeed(coins=coins, market=market, network_access=network)
+        # A client created here is owned (and closed) by this producer
+        self._owns_network = network_access is None
+        self._network = NetworkClient() if self._owns_network else network_access
+        self._feed_timeout_in_seconds = feed_timeout_in_seconds
+        # TODO: generalize to handle other feed based tokens
+        # Feeds of coins that are not given (e.g. handled by another shard) are skipped
+        configured_symbols = {coin.symbol for coin in coins}
+        self._feeds = [
+            feed(coins=coins, market=market, network_access=self._network)
+            for symbol, feed in self._FEEDS_BY_SYMBOL.items()
+            if symbol in configured_symbols
+        ]  # type: List[Feed]
 
     async def initialize(self) -> None:
         pass
 
     async def get_data(self, loop) -> List[PairPrice]:
         log.debug("Preparing feed data")
-        data = [
-            # TODO: generalize to handle other feed based tokens
-            await self._digix_feed.get_price(),
-            await self._btc_feed.get_price(),
-        ]
+        feed_prices = await asyncio.gather(
+            *(self._try_getting_price(feed) for feed in self._feeds)
+        )
+        data = [pair_price for pair_price in feed_prices if pair_price is not None]
         log.debug("Finished preparing feed data")
         return data
 
+    async def _try_getting_price(self, feed: Feed) -> Optional[PairPrice]:
+        """Returns the feed price, or None if the feed failed or timed out"""
+        try:
+            return await asyncio.wait_for(
+                feed.get_price(), timeout=self._feed_timeout_in_seconds
+            )
+        except asyncio.TimeoutError:
+            log.warning(
+                f"Timed out getting price from {feed.__class__.__name__} "
+                + f"(after {self._feed_timeout_in_seconds} seconds)"
+            )
+        except PriceMonitorException:
+            log.exception(f"Error getting price from {feed.__class__.__name__}")
+        return None
+
+    async def close(self) -> None:
+        if self._owns_network:
+            await self._network.close()
+
 
 class DigixFeedError(Exception, PriceMonitorException):
     pass
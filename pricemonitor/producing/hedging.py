@@ -0,0 +1,41 @@
+import asyncio
+from typing import Callable, Optional
+
+
+async def hedged_request(
+    request_factory: Callable,
+    hedge_after_in_seconds: Optional[float] = None,
+    hedge_factory: Optional[Callable] = None,
+):
+    """Awaits a request, firing a duplicate if it is not answered in time.
+
+    The first successful reply is returned and the other request is cancelled.
+    If both fail, the last error is raised. No duplicate is sent when
+    `hedge_after_in_seconds` is None. The duplicate is made by `hedge_factory`,
+    if given, e.g. to have it wait for a rate limit the first request passed.
+    """
+    requests = []  # type: list
+    try:
+        requests.append(asyncio.ensure_future(request_factory()))
+        if hedge_after_in_seconds is not None:
+            done, _ = await asyncio.wait(requests, timeout=hedge_after_in_seconds)
+            if not done:
+                requests.append(
+                    asyncio.ensure_future((hedge_factory or request_factory)())
+                )
+
+        pending = set(requests)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for request in done:
+                if request.exception() is None:
+                    return request.result()
+                error = request.exception()
+        raise error
+    finally:
+        for request in requests:
+            if not request.done():
+                request.cancel()
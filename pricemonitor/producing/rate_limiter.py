@@ -0,0 +1,102 @@
+import asyncio
+import time
+from collections import namedtuple
+
+# weight_per_second: budget refilled every second
+# burst: max budget that can accumulate while idle
+# max_in_flight: max requests waiting for a response at the same time
+# weights: weight of each exchange method, methods not listed weigh 1
+RateLimit = namedtuple(
+    "RateLimit", ["weight_per_second", "burst", "max_in_flight", "weights"]
+)
+
+
+def share_of(rate_limit: RateLimit, share: float) -> RateLimit:
+    """The part of a rate limit given to one of several limiters sharing it"""
+    return rate_limit._replace(
+        weight_per_second=rate_limit.weight_per_second * share,
+        burst=rate_limit.burst * share,
+        max_in_flight=max(1, int(rate_limit.max_in_flight * share)),
+    )
+
+
+class RateLimiter:
+    """Token bucket rate limiter with a cap on concurrent requests.
+
+    Requests wait (in FIFO order) until enough weight is available in the
+    bucket and a request slot is free. Counters of the time spent waiting and
+    of calls that had to wait for budget are kept for monitoring.
+    """
+
+    def __init__(self, rate_limit: RateLimit, clock=time.monotonic) -> None:
+        self._rate_limit = rate_limit
+        self._clock = clock
+        self._tokens = float(rate_limit.burst)
+        self._last_refill_time = clock()
+        self._budget_lock = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(rate_limit.max_in_flight)
+
+        self.calls = 0
+        self.throttled_calls = 0
+        self.total_queued_time_in_seconds = 0.0
+
+    def weight_of(self, method_name: str) -> float:
+        return self._rate_limit.weights.get(method_name, 1)
+
+    def limit(self, weight: float = 1) -> "_LimitedCall":
+        """Usage: `async with rate_limiter.limit(weight): ...`"""
+        return _LimitedCall(self, weight)
+
+    def stats(self) -> str:
+        average_queued_time = (
+            self.total_queued_time_in_seconds / self.calls if self.calls else 0
+        )
+        return (
+            f"calls={self.calls} throttled={self.throttled_calls} "
+            + f"average_queued_time={average_queued_time:.3f}s"
+        )
+
+    async def _acquire(self, weight: float) -> None:
+        start_time = self._clock()
+        await self._in_flight.acquire()
+        try:
+            async with self._budget_lock:
+                self._refill()
+                if self._tokens < weight:
+                    self.throttled_calls += 1
+                    await asyncio.sleep(
+                        (weight - self._tokens) / self._rate_limit.weight_per_second
+                    )
+                    self._refill()
+                # Weights above the burst size leave the bucket in debt
+                self._tokens -= weight
+        except BaseException:
+            self._in_flight.release()
+            raise
+
+        self.calls += 1
+        self.total_queued_time_in_seconds += self._clock() - start_time
+
+    def _release(self) -> None:
+        self._in_flight.release()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self._rate_limit.burst,
+            self._tokens
+            + (now - self._last_refill_time) * self._rate_limit.weight_per_second,
+        )
+        self._last_refill_time = now
+
+
+class _LimitedCall:
+    def __init__(self, rate_limiter: RateLimiter, weight: float) -> None:
+        self._rate_limiter = rate_limiter
+        self._weight = weight
+
+    async def __aenter__(self) -> None:
+        await self._rate_limiter._acquire(self._weight)
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._rate_limiter._release()
@@ -0,0 +1,166 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+from typing import Dict, List, Type
+
+from pricemonitor.config import Coin
+from pricemonitor.exceptions import PriceMonitorException
+from pricemonitor.producing.data_producer import DataProducer, PairPrice
+
+log = logging.getLogger(__name__)
+
+
+class ShardedProducer(DataProducer):
+    """Splits the coins across worker processes, each running its own producer.
+
+    Every worker builds `data_producer(coins=<its shard>, market, **params)` and
+    samples it on request, so parsing the exchange responses of different
+    coins runs on different cores. The data of all the shards is merged here.
+    Workers are only given their coins and the producer params, the signing key
+    stays in this (the aggregator) process.
+
+    All the workers call the same exchanges, so `data_producer` has to take a
+    `rate_limit_share` param, and each worker gets an equal share of every
+    exchange's rate limit.
+    """
+
+    _STOP_REQUEST = None
+    _WORKER_STOP_TIMEOUT_IN_SECONDS = 5
+
+    def __init__(
+        self,
+        coins: List[Coin],
+        market: Coin,
+        shards: int,
+        data_producer: Type[DataProducer],
+        data_producer_params: Dict = None,
+    ) -> None:
+        super().__init__(coins=coins, market=market)
+        self._shard_coins = [
+            shard_coins
+            for shard_coins in (coins[shard::shards] for shard in range(shards))
+            if shard_coins
+        ]
+        self._data_producer = data_producer
+        self._data_producer_params = data_producer_params or {}
+        self._connections = []  # type: List[multiprocessing.connection.Connection]
+        self._workers = []  # type: List[multiprocessing.Process]
+        self._receiving = []  # type: List[asyncio.Future]
+        self._request_ids = itertools.count()
+
+    async def initialize(self) -> None:
+        # Workers are spawned, not forked, as forking a running event loop and
+        # its open connections is unsafe
+        context = multiprocessing.get_context("spawn")
+        for shard_coins in self._shard_coins:
+            connection, worker_connection = context.Pipe()
+            worker = context.Process(
+                target=_serve_shard,
+                args=(
+                    worker_connection,
+                    self._data_producer,
+                    dict(
+                        self._data_producer_params,
+                        rate_limit_share=1 / len(self._shard_coins),
+                    ),
+                    shard_coins,
+                    self._market,
+                ),
+                daemon=True,
+            )
+            worker.start()
+            # Only the worker holds its end, so its exit is seen as EOF here
+            worker_connection.close()
+            self._connections.append(connection)
+            self._workers.append(worker)
+            self._receiving.append(None)
+        log.info(f"Started {len(self._workers)} producer shards")
+
+    async def get_data(self, loop) -> List[PairPrice]:
+        request_id = next(self._request_ids)
+        for connection in self._connections:
+            connection.send(request_id)
+        shards_data = await asyncio.gather(
+            *(
+                self._receive_response(shard, request_id)
+                for shard in range(len(self._connections))
+            )
+        )
+        return list(itertools.chain.from_iterable(shards_data))
+
+    async def close(self) -> None:
+        for connection in self._connections:
+            try:
+                connection.send(self._STOP_REQUEST)
+            except (BrokenPipeError, OSError):
+                pass
+        # Joined in threads, so waiting for the workers does not block the loop
+        loop = asyncio.get_event_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    None, worker.join, self._WORKER_STOP_TIMEOUT_IN_SECONDS
+                )
+                for worker in self._workers
+            )
+        )
+        for connection, worker in zip(self._connections, self._workers):
+            if worker.is_alive():
+                worker.terminate()
+            connection.close()
+
+    async def _receive_response(self, shard: int, request_id: int) -> List[PairPrice]:
+        # Responses to earlier requests, whose sampling was cancelled, are dropped
+        while True:
+            receiving = self._receiving[shard]
+            if receiving is None:
+                receiving = asyncio.get_event_loop().run_in_executor(
+                    None, self._connections[shard].recv
+                )
+                self._receiving[shard] = receiving
+            try:
+                response_id, data = await asyncio.shield(receiving)
+            except EOFError as e:
+                raise ShardError(f"Producer shard {shard} stopped") from e
+            self._receiving[shard] = None
+            if response_id == request_id:
+                return data
+
+
+class ShardError(Exception, PriceMonitorException):
+    pass
+
+
+def _serve_shard(
+    connection,
+    data_producer: Type[DataProducer],
+    data_producer_params: Dict,
+    coins: List[Coin],
+    market: Coin,
+) -> None:
+    """Entry point of a worker process"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    producer = data_producer(coins=coins, market=market, **data_producer_params)
+    try:
+        loop.run_until_complete(_serve_shard_requests(connection, producer, loop))
+    finally:
+        loop.close()
+
+
+async def _serve_shard_requests(connection, producer: DataProducer, loop) -> None:
+    await producer.initialize()
+    try:
+        while True:
+            request_id = await loop.run_in_executor(None, connection.recv)
+            if request_id is ShardedProducer._STOP_REQUEST:
+                return
+            try:
+                data = await producer.get_data(loop=loop)
+            except Exception:
+                log.exception("Error producing shard data")
+                data = []
+            connection.send((request_id, data))
+    finally:
+        await producer.close()
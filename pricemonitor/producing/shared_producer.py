@@ -0,0 +1,57 @@
+import asyncio
+import time
+from typing import Dict, List
+
+from pricemonitor.producing.data_producer import DataProducer, PairPrice
+
+
+class SharedDataProducer(DataProducer):
+    """Serves the data of one producer to several consumers.
+
+    A sample is reused by every consumer asking for data within
+    `max_age_in_seconds` of it being taken, and consumers asking while a
+    sample is being taken wait for it instead of taking their own.
+    """
+
+    def __init__(
+        self,
+        data_producer: DataProducer,
+        max_age_in_seconds: float,
+        clock=time.monotonic,
+    ) -> None:
+        super().__init__(coins=data_producer._coins, market=data_producer._market)
+        self._data_producer = data_producer
+        self._max_age_in_seconds = max_age_in_seconds
+        self._clock = clock
+        self._sampling = None  # type: asyncio.Future
+        self._sample_time = None  # type: float
+
+    async def initialize(self) -> None:
+        await self._data_producer.initialize()
+
+    async def get_data(self, loop) -> List[PairPrice]:
+        if self._sampling is None or self._is_stale():
+            self._sample_time = self._clock()
+            self._sampling = asyncio.ensure_future(self._data_producer.get_data(loop))
+        # A consumer giving up on the sample must not cancel it for the others
+        return await asyncio.shield(self._sampling)
+
+    def warm_state(self) -> Dict:
+        return self._data_producer.warm_state()
+
+    def restore_warm_state(self, state: Dict) -> None:
+        self._data_producer.restore_warm_state(state)
+
+    async def close(self) -> None:
+        if self._sampling is not None:
+            self._sampling.cancel()
+        await self._data_producer.close()
+
+    def _is_stale(self) -> bool:
+        if not self._sampling.done():
+            return False
+        return (
+            self._sampling.cancelled()
+            or self._sampling.exception() is not None
+            or self._clock() - self._sample_time > self._max_age_in_seconds
+        )
@@ -0,0 +1,258 @@
+import asyncio
+import gzip
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from pricemonitor.config import Coin
+from pricemonitor.producing.data_producer import DataProducer, PairPrice
+from pricemonitor.producing.trade_window import TradeWindow
+from util.calculations import calculate_average
+from util.network import NetworkClient
+from util.time import millis_since_epoch
+
+log = logging.getLogger(__name__)
+
+StreamTrade = namedtuple("StreamTrade", ["coin_symbol", "timestamp", "price"])
+
+
+class TradeStream(ABC):
+    """Protocol of a single exchange's public trade stream.
+
+    Handles only the exchange specific parts - where to connect, how to
+    subscribe and how to parse incoming messages. Connection handling is done
+    by TradeStreamPrices.
+    """
+
+    name = None  # type: str
+
+    def __init__(self, coins: List[Coin], market: Coin, url: str = None) -> None:
+        self._market = market
+        self._coin_by_stream_symbol = {
+            self._stream_symbol(coin, market): coin for coin in coins
+        }
+        self._url = url
+
+    @property
+    def url(self) -> str:
+        return self._url if self._url is not None else self._default_url()
+
+    @abstractmethod
+    def _default_url(self) -> str:
+        pass
+
+    def subscription_messages(self) -> List[Dict]:
+        return []
+
+    @abstractmethod
+    def parse_message(
+        self, message: aiohttp.WSMessage
+    ) -> Tuple[List[StreamTrade], Optional[Dict]]:
+        """Returns the trades in the message and an optional reply to send back"""
+        pass
+
+    @staticmethod
+    def _stream_symbol(coin: Coin, market: Coin) -> str:
+        return f"{coin.symbol}{market.symbol}".lower()
+
+    def _coin_symbol(self, stream_symbol: str) -> Optional[str]:
+        coin = self._coin_by_stream_symbol.get(stream_symbol.lower())
+        return coin.symbol if coin is not None else None
+
+
+class BinanceTradeStream(TradeStream):
+    """See https://github.com/binance-exchange/binance-official-api-docs/blob/master/web-socket-streams.md"""
+
+    name = "binance"
+    _BASE_URL = "wss://stream.binance.com:9443/stream?streams="
+
+    def _default_url(self) -> str:
+        streams = "/".join(
+            f"{stream_symbol}@trade" for stream_symbol in self._coin_by_stream_symbol
+        )
+        return f"{self._BASE_URL}{streams}"
+
+    def parse_message(self, message):
+        data = json.loads(message.data)["data"]
+        coin_symbol = self._coin_symbol(data["s"])
+        if coin_symbol is None:
+            return [], None
+        return (
+            [
+                StreamTrade(
+                    coin_symbol=coin_symbol, timestamp=data["T"], price=float(data["p"])
+                )
+            ],
+            None,
+        )
+
+
+class HuobiTradeStream(TradeStream):
+    """See https://huobiapi.github.io/docs/spot/v1/en/#trade-detail
+
+    Huobi gzips every message and drops connections not answering its pings.
+    """
+
+    name = "huobipro"
+    _DEFAULT_URL = "wss://api.huobi.pro/ws"
+
+    def _default_url(self) -> str:
+        return self._DEFAULT_URL
+
+    def subscription_messages(self):
+        return [
+            {"sub": f"market.{stream_symbol}.trade.detail", "id": stream_symbol}
+            for stream_symbol in self._coin_by_stream_symbol
+        ]
+
+    def parse_message(self, message):
+        data = json.loads(gzip.decompress(message.data))
+        if "ping" in data:
+            return [], {"pong": data["ping"]}
+        if "ch" not in data:
+            return [], None
+
+        coin_symbol = self._coin_symbol(data["ch"].split(".")[1])
+        if coin_symbol is None:
+            return [], None
+        trades = [
+            StreamTrade(
+                coin_symbol=coin_symbol,
+                timestamp=trade["ts"],
+                price=float(trade["price"]),
+            )
+            for trade in data["tick"]["data"]
+        ]
+        return sorted(trades, key=lambda trade: trade.timestamp), None
+
+
+class TradeStreamPrices(DataProducer):
+    """Keeps a trade stream open per exchange and serves prices from memory.
+
+    Each value is the average of the last minute trades per exchange (or the
+    last trade, if there were none), averaged over all exchanges - the same as
+    ExchangePrices with Exchange.get_last_minute_trades_average_or_last_trade.
+    """
+
+    _DEFAULT_STREAMS = [BinanceTradeStream, HuobiTradeStream]
+    _WINDOW_IN_MILLIS = 60 * 1_000
+    _INITIAL_RECONNECT_DELAY_IN_SECONDS = 1
+    _MAX_RECONNECT_DELAY_IN_SECONDS = 30
+
+    def __init__(
+        self, coins: List[Coin], market: Coin, streams=None, network_access=None
+    ) -> None:
+        super().__init__(coins=coins, market=market)
+        if streams is None:
+            streams = [
+                stream_class(coins=coins, market=market)
+                for stream_class in self._DEFAULT_STREAMS
+            ]
+        self._streams = streams
+        self._owns_network = network_access is None
+        self._network = NetworkClient() if self._owns_network else network_access
+        self._windows = {
+            (stream.name, coin.symbol): TradeWindow(self._WINDOW_IN_MILLIS)
+            for stream in streams
+            for coin in coins
+        }  # type: Dict[Tuple[str, str], TradeWindow]
+        self._stream_tasks = []  # type: List[asyncio.Future]
+
+    async def initialize(self) -> None:
+        self._stream_tasks = [
+            asyncio.ensure_future(self._follow_stream_forever(stream))
+            for stream in self._streams
+        ]
+
+    def warm_state(self) -> Dict:
+        return {
+            "trade_windows": [
+                [stream_name, coin_symbol, window.trades()]
+                for (stream_name, coin_symbol), window in self._windows.items()
+            ]
+        }
+
+    def restore_warm_state(self, state: Dict) -> None:
+        for stream_name, coin_symbol, trades in state["trade_windows"]:
+            window = self._windows.get((stream_name, coin_symbol))
+            if window is None:
+                continue
+            for timestamp, price, trade_id in trades:
+                window.add(timestamp=timestamp, price=price, trade_id=trade_id)
+
+    async def get_data(self, loop) -> List[PairPrice]:
+        now = millis_since_epoch()
+        return [
+            PairPrice(pair=(coin, self._market), price=self._get_price(coin, now))
+            for coin in self._coins
+        ]
+
+    async def close(self) -> None:
+        for task in self._stream_tasks:
+            task.cancel()
+        await asyncio.gather(*self._stream_tasks, return_exceptions=True)
+        self._stream_tasks = []
+        if self._owns_network:
+            await self._network.close()
+
+    def _get_price(self, coin: Coin, now_in_millis: float) -> Optional[float]:
+        prices_from_all_streams = [
+            price
+            for price in (
+                self._windows[(stream.name, coin.symbol)].average_or_last_price(
+                    now_in_millis
+                )
+                for stream in self._streams
+            )
+            if price is not None
+        ]
+        return calculate_average(prices_from_all_streams)
+
+    async def _follow_stream_forever(self, stream: TradeStream) -> None:
+        reconnect_delay = self._INITIAL_RECONNECT_DELAY_IN_SECONDS
+        while True:
+            try:
+                if await self._follow_stream(stream):
+                    reconnect_delay = self._INITIAL_RECONNECT_DELAY_IN_SECONDS
+                log.info(f"Trade stream {stream.name} closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Whatever went wrong, the stream is followed again after a delay
+                log.exception(f"Error following trade stream {stream.name}")
+
+            log.info(
+                f"Reconnecting to trade stream {stream.name} in {reconnect_delay} seconds"
+            )
+            await asyncio.sleep(reconnect_delay)
+            reconnect_delay = min(
+                reconnect_delay * 2, self._MAX_RECONNECT_DELAY_IN_SECONDS
+            )
+
+    async def _follow_stream(self, stream: TradeStream) -> bool:
+        """Follows the stream until it closes, returns whether any message arrived"""
+        log.info(f"Connecting to trade stream {stream.name} at {stream.url}")
+        received_messages = False
+        async with self._network.session.ws_connect(stream.url, heartbeat=30) as ws:
+            for subscription in stream.subscription_messages():
+                await ws.send_json(subscription)
+
+            async for message in ws:
+                if message.type not in (
+                    aiohttp.WSMsgType.TEXT,
+                    aiohttp.WSMsgType.BINARY,
+                ):
+                    break
+                received_messages = True
+                trades, reply = stream.parse_message(message)
+                if reply is not None:
+                    await ws.send_json(reply)
+                for trade in trades:
+                    self._windows[(stream.name, trade.coin_symbol)].add(
+                        timestamp=trade.timestamp, price=trade.price
+                    )
+        return received_messages
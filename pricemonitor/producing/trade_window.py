@@ -0,0 +1,86 @@
+from collections import deque
+from typing import List, Optional, Tuple
+
+
+class TradeWindow:
+    """Rolling window of trade prices over the last `window_in_millis`.
+
+    Trades are expected to arrive roughly in timestamp order, as they do from
+    exchange trade streams and incremental `fetch_trades` calls, so eviction
+    only looks at the oldest trades. Trades carrying an id are deduplicated,
+    which allows overlapping fetches.
+
+    The running sum and the monotonic max/min queues keep adding, averaging
+    and getting the max/min price O(1) amortized.
+    """
+
+    def __init__(self, window_in_millis: float) -> None:
+        self._window_in_millis = window_in_millis
+        self._trades = deque()  # type: deque
+        self._trade_ids = set()  # type: set
+        self._prices_sum = 0.0
+        # Candidates for max/min price, prices decreasing/increasing respectively
+        self._max_candidates = deque()  # type: deque
+        self._min_candidates = deque()  # type: deque
+        self.last_price = None  # type: Optional[float]
+        self.last_timestamp = None  # type: Optional[float]
+
+    def __len__(self) -> int:
+        return len(self._trades)
+
+    def add(self, timestamp: float, price: float, trade_id=None) -> bool:
+        """Adds a trade, returns False if a trade with the same id was already added"""
+        if trade_id is not None:
+            if trade_id in self._trade_ids:
+                return False
+            self._trade_ids.add(trade_id)
+
+        self._trades.append((timestamp, price, trade_id))
+        self._prices_sum += price
+
+        while self._max_candidates and self._max_candidates[-1][1] <= price:
+            self._max_candidates.pop()
+        self._max_candidates.append((timestamp, price))
+        while self._min_candidates and self._min_candidates[-1][1] >= price:
+            self._min_candidates.pop()
+        self._min_candidates.append((timestamp, price))
+
+        if self.last_timestamp is None or timestamp >= self.last_timestamp:
+            self.last_timestamp = timestamp
+            self.last_price = price
+        return True
+
+    def trades(self) -> List[Tuple]:
+        """The (timestamp, price, trade_id) of the trades in the window, oldest first"""
+        return list(self._trades)
+
+    def evict(self, now_in_millis: float) -> None:
+        oldest_allowed = now_in_millis - self._window_in_millis
+        while self._trades and self._trades[0][0] < oldest_allowed:
+            _, price, trade_id = self._trades.popleft()
+            self._prices_sum -= price
+            self._trade_ids.discard(trade_id)
+        for candidates in (self._max_candidates, self._min_candidates):
+            while candidates and candidates[0][0] < oldest_allowed:
+                candidates.popleft()
+        if not self._trades:
+            # Avoid accumulating floating point drift across empty periods
+            self._prices_sum = 0.0
+
+    def average(self, now_in_millis: float) -> Optional[float]:
+        self.evict(now_in_millis)
+        if not self._trades:
+            return None
+        return self._prices_sum / len(self._trades)
+
+    def average_or_last_price(self, now_in_millis: float) -> Optional[float]:
+        average = self.average(now_in_millis)
+        return average if average is not None else self.last_price
+
+    def max_price(self, now_in_millis: float) -> Optional[float]:
+        self.evict(now_in_millis)
+        return self._max_candidates[0][1] if self._max_candidates else None
+
+    def min_price(self, now_in_millis: float) -> Optional[float]:
+        self.evict(now_in_millis)
+        return self._min_candidates[0][1] if self._min_candidates else None
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import math
+import time
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional
+
+log = logging.getLogger(__name__)
+
+
+class CycleScheduler:
+    """Runs a cycle on fixed ticks of the wall clock, every `interval_in_seconds`.
+
+    The first cycle runs as soon as started, the next ones on the ticks after
+    it. Ticks are multiples of the interval since the epoch, so the cycle times
+    do not drift with the time the cycles take. A cycle that runs past the next
+    tick makes the ticks it overran be skipped rather than run back to back.
+    When a deadline is given, a cycle still running after it is cancelled.
+
+    Lateness (how long after its tick a cycle started), skipped ticks and
+    cancelled cycles are counted for monitoring.
+    """
+
+    def __init__(
+        self,
+        interval_in_seconds: float,
+        deadline_in_seconds: Optional[float] = None,
+        clock=time.time,
+        sleep=asyncio.sleep,
+    ) -> None:
+        self._interval_in_seconds = interval_in_seconds
+        self._deadline_in_seconds = deadline_in_seconds
+        self._clock = clock
+        self._sleep = sleep
+
+        self.cycles = 0
+        self.skipped_cycles = 0
+        self.cancelled_cycles = 0
+        self.last_lateness_in_seconds = 0.0
+        self.max_lateness_in_seconds = 0.0
+
+    async def run_forever(self, cycle: Callable[[], Awaitable]) -> None:
+        tick = self._clock()
+        next_tick = self._first_tick_after(tick)
+        while True:
+            await self._sleep(max(0.0, tick - self._clock()))
+            self._record_lateness(self._clock() - tick)
+
+            try:
+                await asyncio.wait_for(cycle(), self._deadline_in_seconds)
+            except asyncio.TimeoutError:
+                self.cancelled_cycles += 1
+                log.warning(
+                    f"Cycle cancelled, it did not end within {self._deadline_in_seconds} seconds"
+                )
+            self.cycles += 1
+
+            tick = self._skip_missed_ticks(next_tick, self._clock())
+            next_tick = tick + self._interval_in_seconds
+
+    def stats(self) -> str:
+        return (
+            f"cycles={self.cycles} skipped={self.skipped_cycles} "
+            + f"cancelled={self.cancelled_cycles} "
+            + f"last_lateness={self.last_lateness_in_seconds:.3f}s "
+            + f"max_lateness={self.max_lateness_in_seconds:.3f}s"
+        )
+
+    def _first_tick_after(self, now: float) -> float:
+        return (
+            math.floor(now / self._interval_in_seconds) + 1
+        ) * self._interval_in_seconds
+
+    def _skip_missed_ticks(self, tick: float, now: float) -> float:
+        if now > tick:
+            missed_ticks = math.ceil((now - tick) / self._interval_in_seconds)
+            self.skipped_cycles += missed_ticks
+            log.warning(f"Cycle overran, skipping {missed_ticks} cycles")
+            tick += missed_ticks * self._interval_in_seconds
+        return tick
+
+    def _record_lateness(self, lateness_in_seconds: float) -> None:
+        self.last_lateness_in_seconds = lateness_in_seconds
+        self.max_lateness_in_seconds = max(
+            self.max_lateness_in_seconds, lateness_in_seconds
+        )
+
+
+class LatestSnapshotPipeline:
+    """Produces snapshots on the scheduler's ticks and consumes them concurrently.
+
+    The two stages are joined by a queue holding a single snapshot, so a slow
+    consumer never delays producing. When a snapshot is produced while the
+    previous one is still waiting, the waiting one is stale and is dropped, so
+    the consumer always acts on the freshest snapshot.
+    """
+
+    def __init__(self, scheduler: CycleScheduler) -> None:
+        self._scheduler = scheduler
+        self._snapshots = asyncio.Queue(maxsize=1)  # type: asyncio.Queue
+        self.dropped_snapshots = 0
+
+    async def run_forever(
+        self,
+        produce: Callable[[], Awaitable[Any]],
+        consume: Callable[[Any], Awaitable],
+    ) -> None:
+        await run_until_first_failure(
+            self._scheduler.run_forever(partial(self._produce, produce)),
+            self._consume_forever(consume),
+        )
+
+    def stats(self) -> str:
+        return f"{self._scheduler.stats()} dropped={self.dropped_snapshots}"
+
+    async def _produce(self, produce: Callable[[], Awaitable[Any]]) -> None:
+        snapshot = await produce()
+        if self._snapshots.full():
+            self._snapshots.get_nowait()
+            self.dropped_snapshots += 1
+            log.debug("Dropped stale snapshot, the consumer is still busy")
+        self._snapshots.put_nowait(snapshot)
+
+    async def _consume_forever(self, consume: Callable[[Any], Awaitable]) -> None:
+        while True:
+            snapshot = await self._snapshots.get()
+            await consume(snapshot)
+
+
+async def run_until_first_failure(*coroutines: Awaitable) -> None:
+    """Runs the coroutines concurrently, cancelling the others when one fails"""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
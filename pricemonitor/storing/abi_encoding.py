@@ -0,0 +1,65 @@
+"""Minimal encoding of the ABI types that ContractTranslator does not handle.
+
+See https://solidity.readthedocs.io/en/latest/abi-spec.html
+"""
+
+from typing import List
+
+WORD_SIZE = 32
+
+
+def encode_uint(value: int) -> bytes:
+    return value.to_bytes(WORD_SIZE, byteorder="big")
+
+
+def encode_bool(value: bool) -> bytes:
+    return encode_uint(1 if value else 0)
+
+
+def encode_address(address: str) -> bytes:
+    address = address[2:] if address.startswith("0x") else address
+    return bytes.fromhex(address).rjust(WORD_SIZE, b"\0")
+
+
+def encode_bytes(data: bytes) -> bytes:
+    padding = -len(data) % WORD_SIZE
+    return encode_uint(len(data)) + data + b"\0" * padding
+
+
+def encode_static_array(encoded_items: List[bytes]) -> bytes:
+    """Encodes an array of static items, given the encoding of each item"""
+    return encode_uint(len(encoded_items)) + b"".join(encoded_items)
+
+
+def encode_dynamic_array(encoded_items: List[bytes]) -> bytes:
+    """Encodes an array of dynamic items, given the encoding of each item"""
+    offsets = []
+    offset = WORD_SIZE * len(encoded_items)
+    for encoded_item in encoded_items:
+        offsets.append(encode_uint(offset))
+        offset += len(encoded_item)
+    return encode_uint(len(encoded_items)) + b"".join(offsets + encoded_items)
+
+
+def decode_uint(data: bytes, position: int = 0) -> int:
+    return int.from_bytes(data[position : position + WORD_SIZE], byteorder="big")
+
+
+def decode_bool(data: bytes, position: int = 0) -> bool:
+    return decode_uint(data, position) != 0
+
+
+def decode_bytes(data: bytes, position: int) -> bytes:
+    length = decode_uint(data, position)
+    start = position + WORD_SIZE
+    return data[start : start + length]
+
+
+def decode_dynamic_array_positions(data: bytes, position: int) -> List[int]:
+    """Returns the position in `data` of each item of the array at `position`"""
+    length = decode_uint(data, position)
+    items_start = position + WORD_SIZE
+    return [
+        items_start + decode_uint(data, items_start + i * WORD_SIZE)
+        for i in range(length)
+    ]
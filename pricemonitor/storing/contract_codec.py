@@ -0,0 +1,114 @@
+"""Cached encoding of contract function calls and decoding of their results.
+
+Building a ContractTranslator parses the whole ABI, so a codec is built once
+per ABI. The sanity contract functions called every cycle are encoded by
+precomputed selectors and static encoders, without going through the
+translator at all.
+"""
+
+import json
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, List
+
+from ethereum.abi import ContractTranslator
+
+from pricemonitor.storing.abi_encoding import (
+    decode_uint,
+    encode_address,
+    encode_static_array,
+    encode_uint,
+    WORD_SIZE,
+)
+
+# input_types, output_types: how the function has to be declared in the ABI to
+# use the fast path
+FastFunction = namedtuple(
+    "FastFunction",
+    ["selector", "input_types", "output_types", "encode_args", "decode_result"],
+)
+
+
+def _encode_token_rate_args(args: List) -> bytes:
+    (token,) = args
+    return encode_address(token)
+
+
+def _encode_set_sanity_rates_args(args: List) -> bytes:
+    sources, rates = args
+    sources_array = encode_static_array([encode_address(src) for src in sources])
+    rates_array = encode_static_array([encode_uint(rate) for rate in rates])
+    return (
+        encode_uint(2 * WORD_SIZE)
+        + encode_uint(2 * WORD_SIZE + len(sources_array))
+        + sources_array
+        + rates_array
+    )
+
+
+def _decode_uint_result(data: bytes) -> List:
+    return [decode_uint(data)]
+
+
+def _decode_no_result(data: bytes) -> List:
+    return []
+
+
+FAST_FUNCTIONS = {
+    # keccak("tokenRate(address)")[:4]
+    "tokenRate": FastFunction(
+        selector=bytes.fromhex("c57fbf90"),
+        input_types=["address"],
+        output_types=["uint256"],
+        encode_args=_encode_token_rate_args,
+        decode_result=_decode_uint_result,
+    ),
+    # keccak("setSanityRates(address[],uint256[])")[:4]
+    "setSanityRates": FastFunction(
+        selector=bytes.fromhex("f5db370f"),
+        input_types=["address[]", "uint256[]"],
+        output_types=[],
+        encode_args=_encode_set_sanity_rates_args,
+        decode_result=_decode_no_result,
+    ),
+}  # type: Dict[str, FastFunction]
+
+
+class ContractCodec:
+    def __init__(self, contract_abi: str) -> None:
+        abi = json.loads(contract_abi)
+        self._translator = ContractTranslator(abi)
+        self._fast_functions = {
+            item["name"]: FAST_FUNCTIONS[item["name"]]
+            for item in abi
+            if item.get("type") == "function"
+            and item.get("name") in FAST_FUNCTIONS
+            and self._declared_as(FAST_FUNCTIONS[item["name"]], item)
+        }  # type: Dict[str, FastFunction]
+
+    def encode_function_call(self, function_name: str, args: List) -> bytes:
+        fast_function = self._fast_functions.get(function_name)
+        if fast_function is None:
+            return self._translator.encode_function_call(function_name, args)
+        return fast_function.selector + fast_function.encode_args(args)
+
+    def decode_function_result(self, function_name: str, data: bytes) -> List:
+        fast_function = self._fast_functions.get(function_name)
+        if fast_function is None:
+            return self._translator.decode_function_result(function_name, data)
+        return fast_function.decode_result(data)
+
+    @staticmethod
+    def _declared_as(fast_function: FastFunction, abi_item: Dict) -> bool:
+        input_types = [arg["type"] for arg in abi_item["inputs"]]
+        output_types = [arg["type"] for arg in abi_item.get("outputs", [])]
+        return (
+            input_types == fast_function.input_types
+            and output_types == fast_function.output_types
+        )
+
+
+@lru_cache(maxsize=None)
+def get_codec(contract_abi: str) -> ContractCodec:
+    """Returns the codec of an ABI, built once per distinct ABI JSON"""
+    return ContractCodec(contract_abi)
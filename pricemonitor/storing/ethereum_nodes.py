@@ -1,23 +1,120 @@
-import itertools
+from collections import deque
 from enum import Enum
+from statistics import median
+from typing import Dict, List, Optional
+
+
+class NodeHealth:
+    """Rolling latency, error rate and block height of a node."""
+
+    # Assumed latency of nodes without successful requests, so they get tried
+    UNKNOWN_LATENCY_IN_SECONDS = 1.0
+    # Each unit of error rate adds this multiple of the latency to the score
+    ERROR_RATE_PENALTY = 10
+    # Each block behind the most advanced node adds this to the score
+    BLOCK_LAG_PENALTY_IN_SECONDS = 1.0
+
+    def __init__(self, max_samples: int = 50) -> None:
+        self._latencies = deque(maxlen=max_samples)  # type: deque
+        # 1 for each failed request, 0 for each successful one
+        self._errors = deque(maxlen=max_samples)  # type: deque
+        self.block_number = None  # type: Optional[int]
+
+    def record_success(self, latency_in_seconds: float) -> None:
+        self._latencies.append(latency_in_seconds)
+        self._errors.append(0)
+
+    def record_error(self) -> None:
+        self._errors.append(1)
+
+    def score(self, highest_block_number: Optional[int]) -> float:
+        """Expected cost of a request in seconds, lower is healthier"""
+        latency = (
+            median(self._latencies)
+            if self._latencies
+            else self.UNKNOWN_LATENCY_IN_SECONDS
+        )
+        error_rate = sum(self._errors) / len(self._errors) if self._errors else 0
+        block_lag = (
+            highest_block_number - self.block_number
+            if highest_block_number is not None and self.block_number is not None
+            else 0
+        )
+        return (
+            latency * (1 + error_rate * self.ERROR_RATE_PENALTY)
+            + block_lag * self.BLOCK_LAG_PENALTY_IN_SECONDS
+        )
 
 
 class EthereumNetwork:
+    """Pool of the nodes of a network, serving requests from the healthiest one.
+
+    Request results are recorded per node, and the current node is switched
+    when another node is clearly healthier. `next_node()` moves away from the
+    current node (e.g. after it failed) to the healthiest of the others,
+    taking them in turn while there is no data to tell them apart.
+    """
+
+    # Another node has to score this much better to become the current one
+    SWITCH_SCORE_RATIO = 0.8
+
     def __init__(self, nodes, etherscan_prefix):
-        self._nodes = itertools.cycle(nodes)
-        self._current_node = next(self._nodes)
+        self._nodes = list(nodes)  # type: List[str]
+        self._health = {node: NodeHealth() for node in nodes}  # type: Dict
+        self._current_index = 0
         self._etherscan_prefix = etherscan_prefix
 
+    @property
+    def nodes(self) -> List[str]:
+        return self._nodes
+
     def current_node(self):
-        return self._current_node
+        return self._nodes[self._current_index]
 
     def next_node(self):
-        self._current_node = next(self._nodes)
-        return self._current_node
+        others = [
+            (self._current_index + offset) % len(self._nodes)
+            for offset in range(1, len(self._nodes))
+        ]
+        if others:
+            scores = self._scores()
+            # min() keeps the first of equally scored nodes, in cyclic order
+            self._current_index = min(others, key=lambda index: scores[index])
+        return self.current_node()
+
+    def record_success(self, node, latency_in_seconds):
+        self._health[node].record_success(latency_in_seconds)
+        self._switch_to_healthiest()
+
+    def record_error(self, node):
+        self._health[node].record_error()
+        self._switch_to_healthiest()
+
+    def record_block_number(self, node, block_number):
+        self._health[node].block_number = block_number
+        self._switch_to_healthiest()
 
     def etherscan(self, tx):
         return self._etherscan_prefix + tx
 
+    def _scores(self) -> List[float]:
+        block_numbers = [
+            health.block_number
+            for health in self._health.values()
+            if health.block_number is not None
+        ]
+        highest_block_number = max(block_numbers) if block_numbers else None
+        return [self._health[node].score(highest_block_number) for node in self._nodes]
+
+    def _switch_to_healthiest(self):
+        scores = self._scores()
+        healthiest_index = min(range(len(self._nodes)), key=lambda i: scores[i])
+        if (
+            scores[healthiest_index]
+            < scores[self._current_index] * self.SWITCH_SCORE_RATIO
+        ):
+            self._current_index = healthiest_index
+
 
 class Network(Enum):
     MAINNET = EthereumNetwork(
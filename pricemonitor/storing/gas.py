@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+from collections import namedtuple
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# bump_after_in_seconds: time a transaction may stay pending before it is
+#   replaced (same nonce) with a higher gas price
+# bump_factor: minimal gas price increase of a replacement, nodes reject
+#   replacements below 10% (geth) or 12.5% (parity)
+# max_gas_price_in_wei: replacements never bid above it, None for no limit
+ReplacementPolicy = namedtuple(
+    "ReplacementPolicy",
+    ["bump_after_in_seconds", "bump_factor", "max_gas_price_in_wei"],
+)
+
+DEFAULT_REPLACEMENT_POLICY = ReplacementPolicy(
+    bump_after_in_seconds=60, bump_factor=1.125, max_gas_price_in_wei=100 * 10**9
+)
+
+
+class GasPriceOracle:
+    """Serves the node's gas price from memory, refreshing it in the background.
+
+    The first request reads the gas price and starts the refresh task. A failed
+    refresh keeps serving the last known gas price.
+    """
+
+    DEFAULT_REFRESH_INTERVAL_IN_SECONDS = 15
+
+    def __init__(
+        self,
+        read_gas_price: Callable[[], Awaitable[int]],
+        refresh_interval_in_seconds: float = DEFAULT_REFRESH_INTERVAL_IN_SECONDS,
+    ) -> None:
+        self._read_gas_price = read_gas_price
+        self._refresh_interval_in_seconds = refresh_interval_in_seconds
+        self._gas_price = None  # type: Optional[int]
+        self._refresh_task = None  # type: Optional[asyncio.Future]
+
+    async def get_gas_price(self) -> int:
+        if self._gas_price is None:
+            self._gas_price = await self._read_gas_price()
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.ensure_future(self._refresh_forever())
+        return self._gas_price
+
+    async def close(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval_in_seconds)
+            try:
+                self._gas_price = await self._read_gas_price()
+                log.debug(f"Gas price is {self._gas_price}")
+            except Exception:
+                log.exception("Could not refresh gas price, keeping the last one")
+
+
+class GasEstimateCache:
+    """Remembers the gas estimates of calls, by destination and call data length.
+
+    The gas used by a call such as setSanityRates depends mostly on the number
+    of arguments, which is reflected in the call data length. The cost also
+    depends on the stored values (setting a zero rate costs more than changing
+    one), so the highest estimate seen for a length is kept.
+    """
+
+    DEFAULT_MAX_AGE_IN_SECONDS = 10 * 60
+
+    def __init__(
+        self,
+        max_age_in_seconds: float = DEFAULT_MAX_AGE_IN_SECONDS,
+        clock=time.monotonic,
+    ) -> None:
+        self._max_age_in_seconds = max_age_in_seconds
+        self._clock = clock
+        # (dst address, data length) -> (estimate, estimate time)
+        self._estimates = {}  # type: Dict[Tuple[str, int], Tuple[int, float]]
+
+    def get(self, dst_address: str, data: bytes) -> Optional[int]:
+        """Returns the estimate of a similar call, or None if there is no fresh one"""
+        cached = self._estimates.get((dst_address, len(data)))
+        if cached is None:
+            return None
+        estimate, estimate_time = cached
+        if self._clock() - estimate_time >= self._max_age_in_seconds:
+            return None
+        return estimate
+
+    def add(self, dst_address: str, data: bytes, estimate: int) -> None:
+        key = (dst_address, len(data))
+        now = self._clock()
+        cached = self._estimates.get(key)
+        if cached is not None and now - cached[1] < self._max_age_in_seconds:
+            estimate = max(estimate, cached[0])
+        self._estimates[key] = (estimate, now)
@@ -0,0 +1,56 @@
+"""Aggregation of many const calls into a single call to a Multicall2 contract.
+
+See https://github.com/makerdao/multicall/blob/master/src/Multicall2.sol
+"""
+
+from typing import List, Optional, Tuple
+
+from pricemonitor.storing.abi_encoding import (
+    WORD_SIZE,
+    decode_bool,
+    decode_bytes,
+    decode_dynamic_array_positions,
+    decode_uint,
+    encode_address,
+    encode_bool,
+    encode_bytes,
+    encode_dynamic_array,
+    encode_uint,
+)
+
+# keccak("tryAggregate(bool,(address,bytes)[])")[:4]
+TRY_AGGREGATE_SELECTOR = bytes.fromhex("bce38bd7")
+
+
+def encode_try_aggregate(calls: List[Tuple[str, bytes]]) -> bytes:
+    """Encodes tryAggregate(false, calls) for (target address, call data) calls.
+
+    Failing calls do not revert the aggregated call, they are reported as
+    unsuccessful in its result.
+    """
+    encoded_calls = [
+        # (address, bytes) tuples are dynamic, the bytes follow the static head
+        encode_address(target) + encode_uint(2 * WORD_SIZE) + encode_bytes(call_data)
+        for target, call_data in calls
+    ]
+    return (
+        TRY_AGGREGATE_SELECTOR
+        + encode_bool(False)
+        + encode_uint(2 * WORD_SIZE)
+        + encode_dynamic_array(encoded_calls)
+    )
+
+
+def decode_try_aggregate(data: bytes) -> List[Optional[bytes]]:
+    """Decodes the (bool success, bytes returnData)[] result of tryAggregate.
+
+    Returns the data returned by each call, or None for failed calls.
+    """
+    results = []
+    for position in decode_dynamic_array_positions(data, decode_uint(data)):
+        if decode_bool(data, position):
+            return_data_position = position + decode_uint(data, position + WORD_SIZE)
+            results.append(decode_bytes(data, return_data_position))
+        else:
+            results.append(None)
+    return results
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+log = logging.getLogger(__name__)
+
+
+class NonceManager:
+    """Hands out consecutive nonces of an account without asking the node each time.
+
+    The account's next nonce is read once (counting pending transactions) and
+    then incremented locally, so several transactions can be sent without
+    waiting for each other to be mined. After an error the nonce might not
+    have been used or might have been used elsewhere, so `resync()` makes the
+    next transaction read it from the node again.
+
+    A nonce handed out but used by no transaction (one that was dropped, or a
+    nonce restored from an outdated state) keeps all the later transactions
+    from being mined. `check_mined_nonce()` resyncs when the chain waits on
+    such a nonce for longer than `gap_timeout_in_seconds`.
+    """
+
+    _DEFAULT_GAP_TIMEOUT_IN_SECONDS = 60
+
+    def __init__(
+        self,
+        read_nonce: Callable[[], Awaitable[int]],
+        next_nonce: Optional[int] = None,
+        gap_timeout_in_seconds: float = _DEFAULT_GAP_TIMEOUT_IN_SECONDS,
+        clock=time.monotonic,
+    ) -> None:
+        self._read_nonce = read_nonce
+        # Known without reading, e.g. restored after a restart
+        self._next_nonce = next_nonce
+        self._lock = asyncio.Lock()
+        self._gap_timeout_in_seconds = gap_timeout_in_seconds
+        self._clock = clock
+        self._gap_since = None  # type: Optional[float]
+
+    @property
+    def known_next_nonce(self) -> Optional[int]:
+        """The next nonce, or None if it has to be read from the node"""
+        return self._next_nonce
+
+    async def next_nonce(self) -> int:
+        async with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = await self._read_nonce()
+                log.debug(f"Read nonce {self._next_nonce} from node")
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    def resync(self) -> None:
+        self._next_nonce = None
+        self._gap_since = None
+
+    def check_mined_nonce(self, mined_nonce: int, is_nonce_sent: bool) -> None:
+        """Resyncs if the chain waits too long on a nonce no transaction of ours uses.
+
+        `mined_nonce` is the account's next nonce in the latest block and
+        `is_nonce_sent` tells whether one of our pending transactions uses it.
+        """
+        if self._next_nonce is None or mined_nonce >= self._next_nonce or is_nonce_sent:
+            self._gap_since = None
+            return
+        if self._gap_since is None:
+            self._gap_since = self._clock()
+        elif self._clock() - self._gap_since >= self._gap_timeout_in_seconds:
+            log.warning(
+                f"No transaction with nonce {mined_nonce} is pending, "
+                + f"reading the nonce from node again instead of {self._next_nonce}"
+            )
+            self.resync()
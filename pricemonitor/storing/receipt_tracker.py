@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from util.latency import LatencyTracker
+
+log = logging.getLogger(__name__)
+
+
+class ReceiptTracker:
+    """Waits for the receipts of sent transactions, without blocking the loop.
+
+    The receipts of all outstanding transactions are polled together, with a
+    single batch request per poll. Each tracked transaction gets a future that
+    resolves with its receipt once it is mined. Cancel the future to stop
+    tracking the transaction.
+    """
+
+    DEFAULT_POLL_INTERVAL_IN_SECONDS = 2
+
+    def __init__(
+        self,
+        get_receipts: Callable[[List[str]], Awaitable[List[Optional[Dict]]]],
+        poll_interval_in_seconds: float = DEFAULT_POLL_INTERVAL_IN_SECONDS,
+        clock=time.monotonic,
+    ) -> None:
+        self._get_receipts = get_receipts
+        self._poll_interval_in_seconds = poll_interval_in_seconds
+        self._clock = clock
+        # tx hash -> (receipt future, time the transaction was sent)
+        self._outstanding = {}  # type: Dict[str, tuple]
+        self._poll_task = None  # type: Optional[asyncio.Future]
+        self.time_to_inclusion = LatencyTracker(min_samples=1)
+
+    def track(self, tx_hash: str, sent_time: Optional[float] = None) -> asyncio.Future:
+        """Time to inclusion is measured from `sent_time` (on the tracker's
+        clock), or from now if it is not known
+        """
+        if tx_hash in self._outstanding:
+            return self._outstanding[tx_hash][0]
+
+        receipt = asyncio.Future()  # type: asyncio.Future
+        self._outstanding[tx_hash] = (
+            receipt,
+            sent_time if sent_time is not None else self._clock(),
+        )
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.ensure_future(self._poll_until_all_mined())
+        return receipt
+
+    async def close(self) -> None:
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            await asyncio.gather(self._poll_task, return_exceptions=True)
+            self._poll_task = None
+        for receipt, _ in self._outstanding.values():
+            receipt.cancel()
+        self._outstanding = {}
+
+    async def _poll_until_all_mined(self) -> None:
+        while True:
+            await asyncio.sleep(self._poll_interval_in_seconds)
+            self._forget_cancelled()
+            if not self._outstanding:
+                return
+
+            tx_hashes = list(self._outstanding)
+            try:
+                receipts = await self._get_receipts(tx_hashes)
+            except Exception:
+                log.exception("Error polling transaction receipts")
+                continue
+
+            for tx_hash, tx_receipt in zip(tx_hashes, receipts):
+                if tx_receipt is not None and tx_hash in self._outstanding:
+                    self._resolve(tx_hash, tx_receipt)
+
+    def _resolve(self, tx_hash: str, tx_receipt: Dict) -> None:
+        receipt, sent_time = self._outstanding.pop(tx_hash)
+        time_to_inclusion = self._clock() - sent_time
+        self.time_to_inclusion.record(time_to_inclusion)
+        log.info(
+            f"Transaction {tx_hash} mined after {time_to_inclusion:.1f} seconds "
+            + f"(p95: {self.time_to_inclusion.percentile(95):.1f} seconds)"
+        )
+        if not receipt.done():
+            receipt.set_result(tx_receipt)
+
+    def _forget_cancelled(self) -> None:
+        self._outstanding = {
+            tx_hash: tracked
+            for tx_hash, tracked in self._outstanding.items()
+            if not tracked[0].done()
+        }
@@ -1,5 +1,6 @@
-import asyncio
 import logging
+import time
+from collections import namedtuple
 from typing import List, Tuple, Dict, Optional
 
 from pricemonitor.config import Coin, Config
@@ -9,29 +10,80 @@ from pricemonitor.storing.web3_connector import Web3ConnectionError, Web3Connect
 
 log = logging.getLogger(__name__)
 
+# A rates update sent by us, not yet known to be mined
+PendingUpdate = namedtuple("PendingUpdate", ["tx", "rates", "sent_time", "receipt"])
+
 
 class SanityContractUpdater:
+    """Updates the sanity contract rates that drifted too far from the prices.
+
+    This process is the only writer of the contract rates, so they are kept in
+    a local shadow instead of being read every cycle. The shadow is read from
+    the contract once, updated as our own transactions get mined, and read
+    again every `_RECONCILIATION_INTERVAL_IN_SECONDS` or after errors.
+    """
+
     SET_RATES_FUNCTION_NAME = "setSanityRates"
     GET_RATE_FUNCTION_NAME = "tokenRate"
 
-    def __init__(self, web3_connector: Web3Connector, config: Config) -> None:
+    _RECONCILIATION_INTERVAL_IN_SECONDS = 10 * 60
+    _PENDING_UPDATE_TIMEOUT_IN_SECONDS = 10 * 60
+
+    def __init__(
+        self, web3_connector: Web3Connector, config: Config, clock=time.monotonic
+    ) -> None:
         self._web3 = web3_connector
         self._config = config
         self._rates_converter = ContractRateArgumentsConverter(self._config.market)
         self._updates_requested = 0
+        self._clock = clock
+
+        # Rates as stored in the contract, None for rates that could not be read
+        self._shadow_rates = None  # type: Optional[Dict]
+        self._last_reconciliation_time = None  # type: Optional[float]
+        self._reconciliation_needed = False
+        self._pending_updates = []  # type: List[PendingUpdate]
+
+    def warm_state(self) -> Dict:
+        """The shadow rates by coin address, and how long ago they were read"""
+        if self._shadow_rates is None or self._reconciliation_needed:
+            return {}
+        return {
+            "rates": {
+                coin.address: rate for (coin, _), rate in self._shadow_rates.items()
+            },
+            "rates_age_in_seconds": self._clock() - self._last_reconciliation_time,
+        }
+
+    def restore_warm_state(self, state: Dict) -> None:
+        """Uses restored shadow rates until they are due for reconciliation.
+
+        Updates still pending when the state was saved are not known, so their
+        rates may be sent again.
+        """
+        if not state or self._shadow_rates is not None:
+            return
+        rates = state["rates"]
+        if any(coin.address not in rates for coin in self._config.coins):
+            log.info("Coins changed since the rates were saved, not restoring them")
+            return
+        self._shadow_rates = {
+            (coin, self._config.market): rates[coin.address]
+            for coin in self._config.coins
+        }
+        self._last_reconciliation_time = self._clock() - state["rates_age_in_seconds"]
+        log.info(f"Restored {len(self._shadow_rates)} rates")
 
     async def update_prices(
         self, coin_price_data: List[PairPrice], loop, force: bool = False
     ) -> Optional[int]:
-        previous_rates = await self._get_previous_rates(
-            loop
-        )  # type: Dict[Tuple[Coin, Coin], float]
-
         if force:
             rates_for_update = coin_price_data
         else:
+            self._apply_mined_updates()
+            await self._reconcile_if_needed(loop)
             rates_for_update = self._prepare_rates_for_update(
-                previous_rates=previous_rates, new_rates=coin_price_data
+                previous_rates=self._expected_rates(), new_rates=coin_price_data
             )
 
         if rates_for_update:
@@ -43,6 +95,17 @@ class SanityContractUpdater:
                 # send request again with same nonce and a higher gas price
                 rs = None
 
+            if rs is None:
+                self._reconciliation_needed = True
+            elif not force:
+                self._pending_updates.append(
+                    PendingUpdate(
+                        tx=rs,
+                        rates=rates_for_update,
+                        sent_time=self._clock(),
+                        receipt=self._web3.track_transaction(rs),
+                    )
+                )
             return rs
 
         log.info("No updates required.\n")
@@ -76,33 +139,129 @@ class SanityContractUpdater:
             rate_from_contract
         )
 
-    async def _get_pair_price_future(self, coin: Coin, loop) -> PairPrice:
-        return PairPrice(
-            pair=(coin, self._config.market), price=await self.get_rate(coin, loop)
-        )
+    async def _reconcile_if_needed(self, loop) -> None:
+        if (
+            self._shadow_rates is None
+            or self._reconciliation_needed
+            or self._clock() - self._last_reconciliation_time
+            >= self._RECONCILIATION_INTERVAL_IN_SECONDS
+        ):
+            log.info("Reading rates from the contract")
+            self._shadow_rates = await self._get_previous_rates(
+                self._config.coins, loop
+            )
+            self._last_reconciliation_time = self._clock()
+            self._reconciliation_needed = False
+            return
 
-    async def _get_previous_rates(self, loop) -> Dict[Tuple[Coin, Coin], float]:
-        previous_rate_futures = [
-            asyncio.ensure_future(self._get_pair_price_future(coin, loop))
-            for coin in self._config.coins
+        # Coins are not updated while their rate is unknown, so the rates that
+        # could not be read are retried on every cycle
+        missing_coins = [
+            coin for (coin, _), rate in self._shadow_rates.items() if rate is None
         ]
-        previous_rates = await asyncio.gather(*previous_rate_futures, loop=loop)
+        if missing_coins:
+            log.info(f"Reading the missing rates of {len(missing_coins)} coins")
+            self._shadow_rates.update(
+                await self._get_previous_rates(missing_coins, loop)
+            )
 
-        return {pair_price.pair: pair_price.price for pair_price in previous_rates}
+    def _apply_mined_updates(self) -> None:
+        """Copies the rates of our mined transactions into the shadow"""
+        still_pending = []
+        for update in self._pending_updates:
+            if not update.receipt.done():
+                if (
+                    self._clock() - update.sent_time
+                    < self._PENDING_UPDATE_TIMEOUT_IN_SECONDS
+                ):
+                    still_pending.append(update)
+                else:
+                    log.warning(f"Update {update.tx} not mined in time, dropping it")
+                    update.receipt.cancel()
+                    self._reconciliation_needed = True
+                    # Its nonce might have been dropped, which holds up the
+                    # later transactions
+                    self._web3.resync_nonce()
+                continue
+
+            receipt = update.receipt.result()
+            if receipt.get("status", "0x1") != "0x1":
+                log.warning(f"Update {update.tx} failed: {receipt}")
+                self._reconciliation_needed = True
+            elif self._shadow_rates is not None:
+                for pair_price in update.rates:
+                    if pair_price.price:
+                        self._shadow_rates[pair_price.pair] = self._as_stored(
+                            pair_price.price
+                        )
+        self._pending_updates = still_pending
+
+    def _expected_rates(self) -> Dict[Tuple[Coin, Coin], Optional[float]]:
+        """The shadow rates, with the rates of pending updates applied
+
+        Comparing against the rates about to be stored avoids sending the same
+        update again while the previous one is waiting to be mined.
+        """
+        rates = dict(self._shadow_rates)
+        for update in self._pending_updates:
+            for pair_price in update.rates:
+                if pair_price.price and rates.get(pair_price.pair) is not None:
+                    rates[pair_price.pair] = self._as_stored(pair_price.price)
+        return rates
+
+    def _as_stored(self, price: float) -> float:
+        """The rate read back from the contract after storing `price`"""
+        return self._rates_converter.convert_rate_from_contract_units(
+            self._rates_converter.convert_price_to_contract_units(price)
+        )
+
+    async def _get_previous_rates(
+        self, coins: List[Coin], loop
+    ) -> Dict[Tuple[Coin, Coin], Optional[float]]:
+        """Reads the rates of the coins from a single block, in one request.
+
+        Coins whose rate could not be read are mapped to None.
+        """
+        responses = await self._web3.call_local_functions(
+            function_name=SanityContractUpdater.GET_RATE_FUNCTION_NAME,
+            eth_args_list=[
+                self._rates_converter.format_coin_for_getter(coin) for coin in coins
+            ],
+            loop=loop,
+        )
+        if responses is None:
+            log.warning("Could not get current rates of any coin.")
+            responses = [None] * len(coins)
+
+        previous_rates = {}
+        for coin, response in zip(coins, responses):
+            if response is None:
+                log.warning(f"Could not get current rate of {coin}.")
+                rate = None
+            else:
+                # A single value is returned
+                rate = self._rates_converter.convert_rate_from_contract_units(
+                    response[0]
+                )
+            previous_rates[(coin, self._config.market)] = rate
+
+        return previous_rates
 
     def _prepare_rates_for_update(
         self, previous_rates: Dict[Tuple[Coin, Coin], float], new_rates: List[PairPrice]
     ) -> List[PairPrice]:
         updates = []
         for pair_price in new_rates:
+            previous_rate = self._get_previous_rate(
+                coin=pair_price.pair[0], market=pair_price.pair[1], rates=previous_rates
+            )
+            if previous_rate is None:
+                # Unknown, rather than unset (0), rates are left alone until read
+                continue
             if pair_price.price and self._should_update_price(
                 coin=pair_price.pair[0],
                 market=pair_price.pair[1],
-                previous_rate=self._get_previous_rate(
-                    coin=pair_price.pair[0],
-                    market=pair_price.pair[1],
-                    rates=previous_rates,
-                ),
+                previous_rate=previous_rate,
                 current_rate=pair_price.price,
             ):
                 updates.append(pair_price)
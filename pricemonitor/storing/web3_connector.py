@@ -1,5 +1,7 @@
+import asyncio
 import logging
-from functools import partial
+
+import aiohttp
 
 from pricemonitor.exceptions import PriceMonitorException
 from pricemonitor.storing import node_errors
@@ -27,7 +29,7 @@ class Web3Connector:
     async def call_local_function(self, function_name, eth_args, loop):
         for attempt in range(NUMBER_OF_ATTEMPTS_ON_FAILURE):
             try:
-                rs = await self._wrap_sync_function(
+                rs = await self._call_web3_function(
                     call_function=self._web3_interface.call_const_function,
                     function_name=function_name,
                     eth_args=eth_args,
@@ -46,11 +48,38 @@ class Web3Connector:
         log.debug(f"{function_name}({eth_args})\n\t-> {rs}")
         return rs
 
+    async def call_local_functions(self, function_name, eth_args_list, loop):
+        """Calls a local function with each of the given arguments in one batch.
+
+        Returns a result per arguments item (None for items that failed), or
+        None if the node could not be accessed.
+        """
+        for attempt in range(NUMBER_OF_ATTEMPTS_ON_FAILURE):
+            try:
+                rs = await self._call_web3_function(
+                    call_function=self._web3_interface.call_const_functions,
+                    function_name=function_name,
+                    eth_args=eth_args_list,
+                    loop=loop,
+                )
+                break
+
+            except Web3ConnectionError as e:
+                log.warning(f"Error accessing Ethereum node: {e}")
+                self._web3_interface.use_next_node()
+
+        else:
+            log.error("Tried multiple times to access Ethereum nodes. Giving up.")
+            return None
+
+        log.debug(f"{function_name}({eth_args_list})\n\t-> {rs}")
+        return rs
+
     async def call_remote_function(self, function_name, eth_args, loop):
         use_increased_gas_price = False
         for attempt in range(NUMBER_OF_ATTEMPTS_ON_FAILURE):
             try:
-                rs = await self._wrap_sync_function(
+                rs = await self._call_web3_function(
                     call_function=self._web3_interface.call_function,
                     function_name=function_name,
                     eth_args=eth_args,
@@ -84,29 +113,39 @@ class Web3Connector:
         )
         return rs
 
-    async def _wrap_sync_function(
+    def track_transaction(self, tx_hash):
+        """Returns a future of the transaction's receipt, set once it is mined"""
+        return self._web3_interface.track_transaction(tx_hash)
+
+    def resync_nonce(self):
+        """Makes the next transaction read its nonce from the node"""
+        self._web3_interface.resync_nonce(self._private_key)
+
+    async def _call_web3_function(
         self, call_function, function_name, eth_args, loop, *args, **kwargs
     ):
         log.debug(
             f"{call_function.__name__} calls {call_function}: eth_args:{eth_args}, args: {args}, kwargs: {kwargs}"
         )
-        web3call = partial(
-            call_function,
-            priv_key=self._private_key,
-            value=0,
-            contract_hash=self._contract_address,
-            contract_abi=self._contract_abi,
-            function_name=function_name,
-            eth_args=eth_args,
-            *args,
-            **kwargs,
-        )
-
         try:
-            rs = await loop.run_in_executor(executor=None, func=web3call)
+            rs = await call_function(
+                priv_key=self._private_key,
+                value=0,
+                contract_hash=self._contract_address,
+                contract_abi=self._contract_abi,
+                function_name=function_name,
+                eth_args=eth_args,
+                *args,
+                **kwargs,
+            )
             return rs
 
-        except (IOError, EthereumNodeCallError) as e:
+        except (
+            IOError,
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+            EthereumNodeCallError,
+        ) as e:
             msg = "Error accessing Ethereum node"
             log.exception(msg)
             raise Web3ConnectionError(
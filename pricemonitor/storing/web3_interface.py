@@ -1,18 +1,50 @@
+import asyncio
 import json
 import logging
 import time
+from collections import OrderedDict, namedtuple
+from typing import Dict, Optional, Tuple
 
-import requests
+import aiohttp
+import async_timeout
 import rlp
 from ethereum import utils, transactions
-from ethereum.abi import ContractTranslator
 from pycoin.serialize import b2h, h2b
 
+from pricemonitor.storing import contract_codec, multicall, node_errors
+from pricemonitor.storing.gas import (
+    DEFAULT_REPLACEMENT_POLICY,
+    GasEstimateCache,
+    GasPriceOracle,
+)
+from pricemonitor.storing.nonce_manager import NonceManager
+from pricemonitor.storing.receipt_tracker import ReceiptTracker
+from util.network import NetworkClient
+
 ADDITIONAL_START_GAS_TO_BE_ON_THE_SAFE_SIDE = 50000
 INCREASED_GAS_PRICE_FACTOR = 1.1
 
 log = logging.getLogger(__name__)
 
+# A sent transaction, not yet known to be mined. `sent_time` is of its latest
+# replacement, `first_sent_time` of the original transaction.
+PendingTransaction = namedtuple(
+    "PendingTransaction",
+    [
+        "original_tx_hash",
+        "src_priv_key",
+        "src_address",
+        "dst_address",
+        "value",
+        "data",
+        "nonce",
+        "gas_price",
+        "start_gas",
+        "sent_time",
+        "first_sent_time",
+    ],
+)
+
 
 class EthereumNodeCallError(Exception):
     def __init__(
@@ -77,10 +109,70 @@ class Web3Interface:
     DEFAULT_BLOCK_LATEST = "latest"
     DEFAULT_BLOCK_PENDING = "pending"
 
-    def __init__(self, network):
+    _JSON_RPC_TIMEOUT_IN_SECONDS = 5
+    _JSON_RPC_HEADERS = {"content-type": "application/json"}
+    _REPLACEMENT_CHECK_INTERVAL_IN_SECONDS = 5
+    _MAX_REPLACED_TRANSACTIONS_KEPT = 100
+    _NODES_PROBE_INTERVAL_IN_SECONDS = 30
+
+    def __init__(
+        self,
+        network,
+        network_access=None,
+        multicall_address=None,
+        replacement_policy=DEFAULT_REPLACEMENT_POLICY,
+    ):
         self._network = network
+        # When set, const calls are aggregated into one call to this contract
+        self._multicall_address = multicall_address
+        self._nonce_managers = {}  # type: Dict[str, NonceManager]
+        self._gas_estimates = GasEstimateCache()
+        self._gas_price_oracle = GasPriceOracle(self._read_gas_price_in_wei)
+
+        # Transactions still pending after `bump_after_in_seconds` are sent
+        # again with the same nonce and a higher gas price, in the background
+        self._replacement_policy = replacement_policy
+        # (src address, nonce) -> transaction
+        self._pending_transactions = {}  # type: Dict[Tuple, PendingTransaction]
+        # Original tx hash -> hashes of the original and all its replacements
+        self._replaced_tx_hashes = OrderedDict()  # type: OrderedDict
+        self._replacement_task = None  # type: Optional[asyncio.Future]
+        self._receipt_tracker = ReceiptTracker(self.get_tx_receipts)
+        self._probe_task = None  # type: Optional[asyncio.Future]
+
+        # Keeps a pool of keep-alive connections to each node
+        self._owns_network = network_access is None
+        self._network_client = NetworkClient() if self._owns_network else network_access
+
+    def warm_state(self) -> Dict:
+        return {
+            "nonces": {
+                address: nonce_manager.known_next_nonce
+                for address, nonce_manager in self._nonce_managers.items()
+                if nonce_manager.known_next_nonce is not None
+            }
+        }
 
-    def call_function(
+    def restore_warm_state(self, state: Dict) -> None:
+        # A wrong nonce fails the transaction, which makes it be read again
+        for address, nonce in state["nonces"].items():
+            self._get_nonce_manager(address, next_nonce=nonce)
+
+    async def close(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+        if self._replacement_task is not None:
+            self._replacement_task.cancel()
+            await asyncio.gather(self._replacement_task, return_exceptions=True)
+            self._replacement_task = None
+        await self._gas_price_oracle.close()
+        await self._receipt_tracker.close()
+        if self._owns_network:
+            await self._network_client.close()
+
+    async def call_function(
         self,
         priv_key,
         value,
@@ -90,9 +182,9 @@ class Web3Interface:
         eth_args,
         use_increased_gas_price=False,
     ):
-        translator = ContractTranslator(json.loads(contract_abi))
-        call = translator.encode_function_call(function_name, eth_args)
-        return self._make_transaction(
+        codec = contract_codec.get_codec(contract_abi)
+        call = codec.encode_function_call(function_name, eth_args)
+        return await self._make_transaction(
             src_priv_key=priv_key,
             dst_address=contract_hash,
             value=value,
@@ -100,12 +192,12 @@ class Web3Interface:
             use_increased_gas_price=use_increased_gas_price,
         )
 
-    def call_const_function(
+    async def call_const_function(
         self, priv_key, value, contract_hash, contract_abi, function_name, eth_args
     ):
         # src_address = b2h(utils.privtoaddr(priv_key))
-        translator = ContractTranslator(json.loads(contract_abi))
-        call = translator.encode_function_call(function_name, eth_args)
+        codec = contract_codec.get_codec(contract_abi)
+        call = codec.encode_function_call(function_name, eth_args)
         # nonce = get_num_transactions(src_address)
         # gas_price = get_gas_price_in_wei()
 
@@ -125,29 +217,131 @@ class Web3Interface:
             "data": "0x" + b2h(call),
         }
 
-        return_value = self._json_call("eth_call", [params, "latest"])
+        return_value = await self._json_call("eth_call", [params, "latest"])
         # print return_value
         return_value = h2b(return_value[2:])  # remove 0x
-        return translator.decode_function_result(function_name, return_value)
+        return codec.decode_function_result(function_name, return_value)
 
-    def is_tx_confirmed(self, tx_hash):
-        if str(tx_hash).startswith("0x"):
-            params = str(tx_hash)
-        else:
-            params = "0x" + tx_hash
-        result = self._json_call("eth_getTransactionReceipt", [params])
+    async def call_const_functions(
+        self, priv_key, value, contract_hash, contract_abi, function_name, eth_args
+    ):
+        """Calls a const function once per item of `eth_args`, in a single request.
+
+        All calls are made against the same block, so together they are a
+        consistent snapshot of the contract. Returns the decoded result of each
+        call, or None for calls that failed.
+        """
+        codec = contract_codec.get_codec(contract_abi)
+        if self._multicall_address is not None:
+            return await self._call_const_functions_aggregated(
+                codec, contract_hash, function_name, eth_args
+            )
+
+        # Both requests go to the same node, another node may not have the block
+        url = self._network.current_node()
+        block_number = await self._json_call("eth_blockNumber", [], url=url)
+        params_list = [
+            [
+                {
+                    "to": "0x" + contract_hash,
+                    "data": "0x" + b2h(codec.encode_function_call(function_name, args)),
+                },
+                block_number,
+            ]
+            for args in eth_args
+        ]
+
+        return_values = await self._json_batch_call("eth_call", params_list, url=url)
+        return [
+            (
+                codec.decode_function_result(function_name, h2b(return_value[2:]))
+                if return_value is not None and return_value != "0x"
+                else None
+            )
+            for return_value in return_values
+        ]
+
+    async def get_block_number(self):
+        """Returns the latest block number, hex encoded"""
+        return await self._json_call("eth_blockNumber", [])
+
+    async def is_tx_confirmed(self, tx_hash):
+        result = await self.get_tx_receipt(tx_hash)
         if result is None:
             return False
         return not (result["blockHash"] is None)
 
-    def wait_for_tx_confirmation(self, tx_hash):
-        i = 0
-        while not self.is_tx_confirmed(tx_hash):
-            i += 1
-            time.sleep(1)
-            print("wait")
-            if i > 100:
-                return False
+    async def get_tx_receipt(self, tx_hash):
+        """Returns the receipt of a mined transaction, or None while it is pending
+
+        For transactions we replaced, returns the receipt of whichever of the
+        original and its replacements was mined.
+        """
+        tx_hashes = self._replaced_tx_hashes.get(tx_hash, [tx_hash])
+        receipts = await asyncio.gather(
+            *[self._get_tx_receipt(tx_hash) for tx_hash in tx_hashes]
+        )
+        return next((receipt for receipt in receipts if receipt is not None), None)
+
+    async def _get_tx_receipt(self, tx_hash):
+        params = self._prefixed_tx_hash(tx_hash)
+        try:
+            return await self._json_call("eth_getTransactionReceipt", [params])
+        except EthereumNodeCallNoResultError as e:
+            # Nodes answer with a null result for unknown and pending transactions
+            if "error" in e.response_json:
+                raise
+            return None
+
+    async def get_tx_receipts(self, tx_hashes):
+        """Like get_tx_receipt, for many transactions in a single request"""
+        all_tx_hashes = [
+            self._replaced_tx_hashes.get(tx_hash, [tx_hash]) for tx_hash in tx_hashes
+        ]
+        receipts = iter(
+            await self._json_batch_call(
+                "eth_getTransactionReceipt",
+                [
+                    [self._prefixed_tx_hash(tx_hash)]
+                    for tx_hashes_of_tx in all_tx_hashes
+                    for tx_hash in tx_hashes_of_tx
+                ],
+            )
+        )
+        results = []
+        for tx_hashes_of_tx in all_tx_hashes:
+            receipts_of_tx = [next(receipts) for _ in tx_hashes_of_tx]
+            results.append(
+                next(
+                    (receipt for receipt in receipts_of_tx if receipt is not None), None
+                )
+            )
+        return results
+
+    def track_transaction(self, tx_hash):
+        """Returns a future of the transaction's receipt, set once it is mined"""
+        sent_time = next(
+            (
+                tx.first_sent_time
+                for tx in self._pending_transactions.values()
+                if tx.original_tx_hash == tx_hash
+            ),
+            None,
+        )
+        return self._receipt_tracker.track(tx_hash, sent_time=sent_time)
+
+    def resync_nonce(self, src_priv_key):
+        """Makes the account's next transaction read its nonce from the node"""
+        self._get_nonce_manager(b2h(utils.privtoaddr(src_priv_key))).resync()
+
+    async def wait_for_tx_confirmation(self, tx_hash, timeout_in_seconds=100):
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(self.track_transaction(tx_hash)), timeout_in_seconds
+            )
+            return True
+        except asyncio.TimeoutError:
+            return False
 
     def use_next_node(self):
         self._network.next_node()
@@ -156,100 +350,353 @@ class Web3Interface:
     def prepare_etherscan_url(self, tx):
         return self._network.etherscan(tx)
 
-    def _json_call(self, method_name, params):
-        headers = {"content-type": "application/json"}
+    @staticmethod
+    def _prefixed_tx_hash(tx_hash):
+        if str(tx_hash).startswith("0x"):
+            return str(tx_hash)
+        return "0x" + tx_hash
+
+    async def _json_call(self, method_name, params, url=None):
         # Example echo method
         payload = {"method": method_name, "params": params, "jsonrpc": "2.0", "id": 1}
-
-        log.debug(f"Calling blockchain with payload: {payload}")
-        r = requests.post(
-            url=self._network.current_node(),
-            data=json.dumps(payload),
-            headers=headers,
-            timeout=5,
+        url, request_headers, request_body, response_text, data = await self._post(
+            method_name=method_name, params=params, payload=payload, url=url
         )
-
-        if not r.ok:
-            e = EthereumNodeCallError(
-                url=r.request.url,
-                method_name=method_name,
-                params=params,
-                response_status=r.status_code,
-                response_reason=r.reason,
-                response_text=r.text,
-                request_headers=r.request.headers,
-                request_body=r.request.body,
-            )
-            log.warning(repr(e))
-            raise e
-
-        data = r.json()
         result = data.get("result", None)
 
         if not result:
             raise EthereumNodeCallNoResultError(
-                url=r.request.url,
+                url=url,
                 method_name=method_name,
                 params=params,
-                request_headers=r.request.headers,
-                request_body=r.request.body,
-                response_text=r.text,
+                request_headers=request_headers,
+                request_body=request_body,
+                response_text=response_text,
                 response_json=data,
             )
         else:
             return result
 
-    def _get_num_transactions(self, address):
+    async def _json_batch_call(self, method_name, params_list, url=None):
+        """Sends all calls in a single JSON-RPC batch request.
+
+        Returns a result per call (in the given order), or None for calls that
+        failed. Only an error of the request as a whole is raised, which
+        includes a response whose items do not match the calls.
+        """
+        payload = [
+            {"method": method_name, "params": params, "jsonrpc": "2.0", "id": i}
+            for i, params in enumerate(params_list)
+        ]
+        url, request_headers, request_body, response_text, data = await self._post(
+            method_name=method_name, params=params_list, payload=payload, url=url
+        )
+        no_result_error = EthereumNodeCallNoResultError(
+            url=url,
+            method_name=method_name,
+            params=params_list,
+            request_headers=request_headers,
+            request_body=request_body,
+            response_text=response_text,
+            response_json=data,
+        )
+
+        if not isinstance(data, list):
+            raise no_result_error
+
+        # The node may answer batch items in any order
+        results = [None] * len(params_list)
+        for item in data:
+            call_id = item.get("id") if isinstance(item, dict) else None
+            if not isinstance(call_id, int) or not 0 <= call_id < len(params_list):
+                log.warning(f"Unexpected item in {method_name} batch response: {item}")
+                raise no_result_error
+            if item.get("result"):
+                results[call_id] = item["result"]
+            else:
+                log.warning(
+                    f"No result for {method_name}({params_list[call_id]}): {item}"
+                )
+        return results
+
+    async def _post(self, method_name, params, payload, url=None):
+        if url is None:
+            url = self._network.current_node()
+        if self._probe_task is None and len(self._network.nodes) > 1:
+            self._probe_task = asyncio.ensure_future(self._probe_nodes_forever())
+
+        start_time = time.monotonic()
+        try:
+            rs = await self._post_to_node(url, method_name, params, payload)
+        except (aiohttp.ClientError, asyncio.TimeoutError, EthereumNodeCallError):
+            self._network.record_error(url)
+            raise
+        self._network.record_success(url, time.monotonic() - start_time)
+        return rs
+
+    async def _post_to_node(self, url, method_name, params, payload):
+        request_body = json.dumps(payload)
+
+        log.debug(f"Calling blockchain with payload: {payload}")
+        async with async_timeout.timeout(self._JSON_RPC_TIMEOUT_IN_SECONDS):
+            async with self._network_client.session.post(
+                url=url, data=request_body, headers=self._JSON_RPC_HEADERS
+            ) as r:
+                response_text = await r.text()
+                request_headers = r.request_info.headers
+
+                if r.status >= 400:
+                    e = EthereumNodeCallError(
+                        url=url,
+                        method_name=method_name,
+                        params=params,
+                        response_status=r.status,
+                        response_reason=r.reason,
+                        response_text=response_text,
+                        request_headers=request_headers,
+                        request_body=request_body,
+                    )
+                    log.warning(repr(e))
+                    raise e
+
+        return (
+            url,
+            request_headers,
+            request_body,
+            response_text,
+            json.loads(response_text),
+        )
+
+    async def _probe_nodes_forever(self):
+        """Keeps the latency and block height of idle nodes up to date"""
+        while True:
+            await asyncio.gather(
+                *[self._probe_node(url) for url in self._network.nodes],
+                return_exceptions=True,
+            )
+            await asyncio.sleep(self._NODES_PROBE_INTERVAL_IN_SECONDS)
+
+    async def _probe_node(self, url):
+        try:
+            block_number = await self._json_call("eth_blockNumber", [], url=url)
+        except (
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+            EthereumNodeCallError,
+            EthereumNodeCallNoResultError,
+            ValueError,
+        ) as e:
+            log.debug(f"Probing node {url} failed: {repr(e)}")
+            return
+        self._network.record_block_number(url, int(block_number, base=16))
+
+    async def _call_const_functions_aggregated(
+        self, codec, contract_hash, function_name, eth_args
+    ):
+        """Sends the calls as a single call to the multicall contract"""
+        aggregated_call = multicall.encode_try_aggregate(
+            [
+                (contract_hash, codec.encode_function_call(function_name, args))
+                for args in eth_args
+            ]
+        )
+        params = {
+            "to": "0x" + self._multicall_address,
+            "data": "0x" + b2h(aggregated_call),
+        }
+        return_value = await self._json_call(
+            "eth_call", [params, self.DEFAULT_BLOCK_LATEST]
+        )
+        return [
+            (
+                codec.decode_function_result(function_name, call_return_value)
+                if call_return_value
+                else None
+            )
+            for call_return_value in multicall.decode_try_aggregate(
+                h2b(return_value[2:])
+            )
+        ]
+
+    async def _get_num_transactions(self, address, block=DEFAULT_BLOCK_LATEST):
         """Query Ethereum node to get the number of committed transactions.
 
         See https://github.com/ethereum/wiki/wiki/JSON-RPC#eth_gettransactioncount
         """
-        params = [f"0x{address}", self.DEFAULT_BLOCK_LATEST]
-        nonce = self._json_call("eth_getTransactionCount", params)
+        params = [f"0x{address}", block]
+        nonce = await self._json_call("eth_getTransactionCount", params)
         return nonce
 
-    def _get_gas_price_in_wei(self):
-        return self._json_call("eth_gasPrice", [])
+    def _get_nonce_manager(self, address, next_nonce=None):
+        if address not in self._nonce_managers:
 
-    def _eval_startgas(self, src, dst, value, data, gas_price):
-        params = {
-            "value": f"0x{value}",
-            "gasPrice": gas_price,
-            "from": f"0x{src}",
-            "to": f"0x{dst}",
-        }
-        if len(data) > 0:
-            params["data"] = f"0x{data}"
+            async def read_nonce():
+                nonce_rs = await self._get_num_transactions(
+                    address, block=self.DEFAULT_BLOCK_PENDING
+                )
+                return int(nonce_rs, base=16)
 
-        return self._json_call("eth_estimateGas", [params])
+            self._nonce_managers[address] = NonceManager(read_nonce, next_nonce)
+        return self._nonce_managers[address]
 
-    def _make_transaction(
-        self, src_priv_key, dst_address, value, data, use_increased_gas_price
-    ):
-        src_address = b2h(utils.privtoaddr(src_priv_key))
-        nonce_rs = self._get_num_transactions(src_address)
-        nonce = int(nonce_rs, base=16)
-        log.debug(f"Using nonce {nonce}.")
+    async def _get_gas_price_in_wei(self):
+        return await self._json_call("eth_gasPrice", [])
 
-        gas_price_rs = self._get_gas_price_in_wei()
-        gas_price = int(gas_price_rs, base=16)
+    async def _read_gas_price_in_wei(self):
+        return int(await self._get_gas_price_in_wei(), base=16)
+
+    async def _get_gas_price(self, use_increased_gas_price):
+        gas_price = await self._gas_price_oracle.get_gas_price()
         if use_increased_gas_price:
             log.debug(f"Using increased gas price.")
             gas_price = int(gas_price * INCREASED_GAS_PRICE_FACTOR)
         log.debug(f"gas price is {gas_price}")
+        return gas_price
+
+    async def _eval_startgas(self, src, dst, value, data, gas_price=None):
+        params = {"value": f"0x{value}", "from": f"0x{src}", "to": f"0x{dst}"}
+        if gas_price is not None:
+            params["gasPrice"] = gas_price
+        if len(data) > 0:
+            params["data"] = f"0x{data}"
+
+        return await self._json_call("eth_estimateGas", [params])
 
-        start_gas_rs = self._eval_startgas(
-            src=src_address,
-            dst=dst_address,
+    async def _get_start_gas(self, src_address, dst_address, value, data):
+        estimate = self._gas_estimates.get(dst_address, data)
+        if estimate is None:
+            # Estimated without a gas price, so it does not wait for it
+            start_gas_rs = await self._eval_startgas(
+                src=src_address, dst=dst_address, value=value, data=b2h(data)
+            )
+            estimate = int(start_gas_rs, base=16)
+            self._gas_estimates.add(dst_address, data, estimate)
+        start_gas = estimate + ADDITIONAL_START_GAS_TO_BE_ON_THE_SAFE_SIDE
+        log.debug(f"Estimated start gas is {start_gas}")
+        return start_gas
+
+    async def _make_transaction(
+        self, src_priv_key, dst_address, value, data, use_increased_gas_price
+    ):
+        src_address = b2h(utils.privtoaddr(src_priv_key))
+        nonce_manager = self._get_nonce_manager(src_address)
+        try:
+            # The pre-flight queries are independent of each other
+            nonce, gas_price, start_gas = await asyncio.gather(
+                nonce_manager.next_nonce(),
+                self._get_gas_price(use_increased_gas_price),
+                self._get_start_gas(src_address, dst_address, value, data),
+            )
+            log.debug(f"Using nonce {nonce}.")
+            first_sent_time = time.monotonic()
+            tx_hash = await self._send_transaction(
+                src_priv_key=src_priv_key,
+                dst_address=dst_address,
+                value=value,
+                data=data,
+                nonce=nonce,
+                gas_price=gas_price,
+                start_gas=start_gas,
+            )
+        except BaseException:
+            # Also on cancellation. The nonce is either unused or was already
+            # spent (e.g. the node reports NonceAlreadySpent or
+            # PreviousTransactionPending), the node knows which.
+            nonce_manager.resync()
+            raise
+
+        self._pending_transactions[(src_address, nonce)] = PendingTransaction(
+            original_tx_hash=tx_hash,
+            src_priv_key=src_priv_key,
+            src_address=src_address,
+            dst_address=dst_address,
             value=value,
-            data=b2h(data),
-            gas_price=gas_price_rs,
+            data=data,
+            nonce=nonce,
+            gas_price=gas_price,
+            start_gas=start_gas,
+            sent_time=time.monotonic(),
+            first_sent_time=first_sent_time,
         )
-        start_gas = (
-            int(start_gas_rs, base=16) + ADDITIONAL_START_GAS_TO_BE_ON_THE_SAFE_SIDE
+        if self._replacement_task is None:
+            self._replacement_task = asyncio.ensure_future(
+                self._replace_stuck_transactions_forever()
+            )
+        return tx_hash
+
+    async def _replace_stuck_transactions_forever(self):
+        while True:
+            await asyncio.sleep(self._REPLACEMENT_CHECK_INTERVAL_IN_SECONDS)
+            try:
+                await self._replace_stuck_transactions()
+            except Exception:
+                log.exception("Error replacing stuck transactions")
+
+    async def _replace_stuck_transactions(self):
+        src_addresses = {tx.src_address for tx in self._pending_transactions.values()}
+        for src_address in src_addresses:
+            mined_nonce = int(await self._get_num_transactions(src_address), base=16)
+            self._get_nonce_manager(src_address).check_mined_nonce(
+                mined_nonce,
+                is_nonce_sent=(src_address, mined_nonce) in self._pending_transactions,
+            )
+            for key, tx in list(self._pending_transactions.items()):
+                if tx.src_address != src_address:
+                    continue
+                if tx.nonce < mined_nonce:
+                    del self._pending_transactions[key]
+                elif (
+                    time.monotonic() - tx.sent_time
+                    >= self._replacement_policy.bump_after_in_seconds
+                ):
+                    await self._replace_transaction(key, tx)
+
+    async def _replace_transaction(self, key, tx):
+        policy = self._replacement_policy
+        gas_price = max(
+            await self._gas_price_oracle.get_gas_price(),
+            int(tx.gas_price * policy.bump_factor) + 1,
         )
-        log.debug(f"Estimated start gas is {start_gas}")
-
+        if policy.max_gas_price_in_wei is not None:
+            gas_price = min(gas_price, policy.max_gas_price_in_wei)
+        if gas_price <= tx.gas_price:
+            log.warning(f"Transaction {tx.original_tx_hash} is stuck at max gas price")
+            return
+
+        log.info(
+            f"Replacing transaction {tx.original_tx_hash} (nonce {tx.nonce}), "
+            + f"gas price {tx.gas_price} -> {gas_price}"
+        )
+        try:
+            tx_hash = await self._send_transaction(
+                src_priv_key=tx.src_priv_key,
+                dst_address=tx.dst_address,
+                value=tx.value,
+                data=tx.data,
+                nonce=tx.nonce,
+                gas_price=gas_price,
+                start_gas=tx.start_gas,
+            )
+        except EthereumNodeCallNoResultError as e:
+            error_message = e.response_json.get("error", {}).get("message", "")
+            if node_errors.detect_nonce_too_low(error_message):
+                # Mined since we checked
+                del self._pending_transactions[key]
+                return
+            raise
+
+        self._pending_transactions[key] = tx._replace(
+            gas_price=gas_price, sent_time=time.monotonic()
+        )
+        self._replaced_tx_hashes.setdefault(
+            tx.original_tx_hash, [tx.original_tx_hash]
+        ).append(tx_hash)
+        while len(self._replaced_tx_hashes) > self._MAX_REPLACED_TRANSACTIONS_KEPT:
+            self._replaced_tx_hashes.popitem(last=False)
+
+    async def _send_transaction(
+        self, src_priv_key, dst_address, value, data, nonce, gas_price, start_gas
+    ):
         tx = transactions.Transaction(
             nonce, gas_price, start_gas, dst_address, value, data
         ).sign(src_priv_key)
@@ -258,7 +705,7 @@ class Web3Interface:
         tx_hash = b2h(tx.hash)
 
         params = ["0x" + tx_hex]
-        return_value = self._json_call("eth_sendRawTransaction", params)
+        return_value = await self._json_call("eth_sendRawTransaction", params)
         if (
             return_value
             == "0x0000000000000000000000000000000000000000000000000000000000000000"
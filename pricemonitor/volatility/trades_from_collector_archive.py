@@ -3,16 +3,26 @@ import itertools
 import json
 import re
 
-from util import network
-from util.network import DataFormat
+from util.network import DataFormat, NetworkClient
 
 
 class TradesDownloader:
     TRADE_FILE_PATTERN = re.compile(r'<a href="(\w+)"')
     TRADE_ARCHIVE_BASE_URL = "http://52.77.19.90:3000/archive/"
 
+    def __init__(self, network_access=None):
+        self._owns_network = network_access is None
+        self._network = NetworkClient() if self._owns_network else network_access
+
     async def download_all_trades(self):
         print("Downloading trades data from collector archive")
+        try:
+            return await self._download_all_trades()
+        finally:
+            if self._owns_network:
+                await self._network.close()
+
+    async def _download_all_trades(self):
         trade_urls = await self._get_trade_urls()
 
         # TODO: remove:
@@ -28,7 +38,7 @@ class TradesDownloader:
         return trades_in_files
 
     async def _get_trade_urls(self):
-        data = await network.get_response_content_from_get_request(
+        data = await self._network.get_response_content_from_get_request(
             url=TradesDownloader.TRADE_ARCHIVE_BASE_URL, format=DataFormat.TEXT
         )
 
@@ -43,7 +53,7 @@ class TradesDownloader:
 
     async def _read_data_from_web_file(self, trades_url):
         print(f"Downloading data from {trades_url} - start")
-        data = await network.get_response_content_from_get_request(
+        data = await self._network.get_response_content_from_get_request(
             url=trades_url, format=DataFormat.TEXT, timeout=240
         )
 
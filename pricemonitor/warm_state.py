@@ -0,0 +1,54 @@
+import json
+import logging
+import os
+import time
+from typing import Dict
+
+log = logging.getLogger(__name__)
+
+
+class WarmStateFile:
+    """Local checkpoint of the state that makes restarting after a crash fast.
+
+    The state is written to a temporary file first and then moved over the
+    previous checkpoint, so a crash while saving never leaves a partial file.
+    A checkpoint older than `max_age_in_seconds` is ignored, as the markets,
+    rates and nonces in it are likely outdated.
+    """
+
+    _DEFAULT_MAX_AGE_IN_SECONDS = 5 * 60
+
+    def __init__(
+        self,
+        path: str,
+        max_age_in_seconds: float = _DEFAULT_MAX_AGE_IN_SECONDS,
+        clock=time.time,
+    ) -> None:
+        self._path = path
+        self._max_age_in_seconds = max_age_in_seconds
+        self._clock = clock
+
+    def load(self) -> Dict:
+        """Returns the saved state, or an empty one if there is no usable checkpoint"""
+        try:
+            with open(self._path) as data:
+                checkpoint = json.load(data)
+            age_in_seconds = self._clock() - checkpoint["saved_time"]
+            state = checkpoint["state"]
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, KeyError, TypeError):
+            log.exception(f"Ignoring unreadable warm state file {self._path}")
+            return {}
+
+        if age_in_seconds > self._max_age_in_seconds:
+            log.info(f"Ignoring warm state saved {age_in_seconds:.0f} seconds ago")
+            return {}
+        log.info(f"Loaded warm state saved {age_in_seconds:.1f} seconds ago")
+        return state
+
+    def save(self, state: Dict) -> None:
+        temporary_path = self._path + ".tmp"
+        with open(temporary_path, "w") as data:
+            json.dump({"saved_time": self._clock(), "state": state}, data)
+        os.replace(temporary_path, self._path)
@@ -10,13 +10,21 @@ import time
 import pricemonitor.monitor
 
 WAITING_TIME_IN_SECONDS_BEFORE_RESTARTING_AFTER_CRASH = 10
+# A run that crashed after this long restarts right away from its warm state,
+# shorter runs are probably crashing repeatedly and restart after the full wait
+MIN_RUN_TIME_IN_SECONDS_FOR_WARM_RESTART = 60
+WAITING_TIME_IN_SECONDS_BEFORE_WARM_RESTART = 0.5
 
 log = logging.getLogger(__name__)
 
 if __name__ == '__main__':
     while True:
+        start_time = time.monotonic()
         try:
             fire.Fire(pricemonitor.monitor.run_on_loop)
         except Exception:
             log.exception("Crashed with this exception:")
-            time.sleep(WAITING_TIME_IN_SECONDS_BEFORE_RESTARTING_AFTER_CRASH)
+            if time.monotonic() - start_time >= MIN_RUN_TIME_IN_SECONDS_FOR_WARM_RESTART:
+                time.sleep(WAITING_TIME_IN_SECONDS_BEFORE_WARM_RESTART)
+            else:
+                time.sleep(WAITING_TIME_IN_SECONDS_BEFORE_RESTARTING_AFTER_CRASH)
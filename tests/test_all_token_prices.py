@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from pricemonitor.config import Coin
+from pricemonitor.producing.all_token_prices import AllTokenPrices
+from pricemonitor.producing.data_producer import DataProducer, PairPrice
+
+OMG = Coin(symbol="OMG", address="0x44444", name="OMG", volatility=0.05)
+DGX = Coin(symbol="DGX", address="0x33333", name="Digix Gold", volatility=0.05)
+WBTC = Coin(symbol="WBTC", address="0x11111", name="WrappedBitcoin", volatility=0.05)
+ETH = Coin(symbol="ETH", address="0x22222", name="ETH", volatility=0.05)
+
+
+class FixedProducer(DataProducer):
+    def __init__(self, prices, delay=0):
+        super().__init__(coins=[], market=ETH)
+        self._prices = prices
+        self._delay = delay
+
+    async def initialize(self):
+        pass
+
+    async def get_data(self, loop):
+        await asyncio.sleep(self._delay)
+        return self._prices
+
+
+def _make_all_token_prices(exchange_prices, feed_prices, **kwargs):
+    all_token_prices = AllTokenPrices(coins=[OMG, DGX, WBTC], market=ETH, **kwargs)
+    all_token_prices._exchange_prices = exchange_prices
+    all_token_prices._feed_prices = feed_prices
+    return all_token_prices
+
+
+@pytest.mark.asyncio
+async def test_get_data__both_sources_in_time__prices_merged():
+    omg_price = PairPrice(pair=(OMG, ETH), price=0.01)
+    dgx_price = PairPrice(pair=(DGX, ETH), price=0.3)
+    all_token_prices = _make_all_token_prices(
+        FixedProducer([omg_price]), FixedProducer([dgx_price])
+    )
+
+    res = await all_token_prices.get_data(loop=None)
+
+    assert res == [omg_price, dgx_price]
+
+
+@pytest.mark.asyncio
+async def test_get_data__slow_source__other_source_returned():
+    omg_price = PairPrice(pair=(OMG, ETH), price=0.01)
+    dgx_price = PairPrice(pair=(DGX, ETH), price=0.3)
+    all_token_prices = _make_all_token_prices(
+        FixedProducer([omg_price], delay=10),
+        FixedProducer([dgx_price]),
+        producer_timeout_in_seconds=0.1,
+    )
+
+    res = await all_token_prices.get_data(loop=None)
+
+    assert res == [dgx_price]
+
+
+@pytest.mark.asyncio
+async def test_get_data__sources_run_concurrently():
+    all_token_prices = _make_all_token_prices(
+        FixedProducer([], delay=0.2), FixedProducer([], delay=0.2)
+    )
+    loop = asyncio.get_event_loop()
+
+    start = loop.time()
+    await all_token_prices.get_data(loop=loop)
+
+    assert loop.time() - start < 0.4
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+from ethereum.abi import ContractTranslator
+
+from pricemonitor.storing.contract_codec import ContractCodec, get_codec
+
+SANITY_ABI = json.dumps([
+    {"constant": True, "inputs": [{"name": "", "type": "address"}], "name": "tokenRate",
+     "outputs": [{"name": "", "type": "uint256"}], "payable": False, "stateMutability": "view",
+     "type": "function"},
+    {"constant": False, "inputs": [{"name": "srcs", "type": "address[]"}, {"name": "rates", "type": "uint256[]"}],
+     "name": "setSanityRates", "outputs": [], "payable": False, "stateMutability": "nonpayable",
+     "type": "function"},
+    {"constant": True, "inputs": [], "name": "admin", "outputs": [{"name": "", "type": "address"}],
+     "payable": False, "stateMutability": "view", "type": "function"},
+])
+
+OMG_ADDRESS = '0xd26114cd6ee289accf82350c8d8487fedb8a0c07'
+KNC_ADDRESS = '0xdd974d5c2e2928dea5f71b9825b8b646686bd200'
+
+
+@pytest.fixture
+def translator():
+    return ContractTranslator(json.loads(SANITY_ABI))
+
+
+def test_get_codec__same_abi__codec_reused():
+    assert get_codec(SANITY_ABI) is get_codec(SANITY_ABI)
+
+
+def test_encode_function_call__token_rate__same_as_translator(translator):
+    codec = ContractCodec(SANITY_ABI)
+
+    assert (codec.encode_function_call('tokenRate', [OMG_ADDRESS]) ==
+            translator.encode_function_call('tokenRate', [OMG_ADDRESS]))
+
+
+def test_encode_function_call__set_sanity_rates__same_as_translator(translator):
+    codec = ContractCodec(SANITY_ABI)
+    args = [[OMG_ADDRESS, KNC_ADDRESS], [16883000000000000, 2 * 10 ** 15]]
+
+    assert (codec.encode_function_call('setSanityRates', args) ==
+            translator.encode_function_call('setSanityRates', args))
+
+
+def test_decode_function_result__token_rate__same_as_translator(translator):
+    codec = ContractCodec(SANITY_ABI)
+    data = (16883000000000000).to_bytes(32, byteorder='big')
+
+    assert (codec.decode_function_result('tokenRate', data) ==
+            translator.decode_function_result('tokenRate', data))
+
+
+def test_encode_function_call__function_without_fast_path__translator_used(translator):
+    codec = ContractCodec(SANITY_ABI)
+
+    assert codec.encode_function_call('admin', []) == translator.encode_function_call('admin', [])
@@ -46,3 +46,51 @@ def test__etherscan__returns_unique_etherscan_url_per_tx():
 
     assert a == b
     assert a != c
+
+
+def test__record_success__much_faster_node__becomes_current_node():
+    nodes = EthereumNetwork(["a", "b"], '')
+
+    nodes.record_success("a", 2.0)
+    nodes.record_success("b", 0.1)
+
+    assert nodes.current_node() == "b"
+
+
+def test__record_success__slightly_faster_node__current_node_kept():
+    nodes = EthereumNetwork(["a", "b"], '')
+
+    nodes.record_success("a", 0.10)
+    nodes.record_success("b", 0.09)
+
+    assert nodes.current_node() == "a"
+
+
+def test__record_error__failing_node__healthier_node_becomes_current():
+    nodes = EthereumNetwork(["a", "b"], '')
+    nodes.record_success("a", 0.1)
+    nodes.record_success("b", 0.2)
+
+    nodes.record_error("a")
+
+    assert nodes.current_node() == "b"
+
+
+def test__record_block_number__lagging_node__up_to_date_node_becomes_current():
+    nodes = EthereumNetwork(["a", "b"], '')
+    nodes.record_success("a", 0.1)
+    nodes.record_success("b", 0.2)
+
+    nodes.record_block_number("a", 100)
+    nodes.record_block_number("b", 110)
+
+    assert nodes.current_node() == "b"
+
+
+def test__next_node__skips_failing_node():
+    nodes = EthereumNetwork(["a", "b", "c"], '')
+    nodes.record_success("a", 0.1)
+    nodes.record_error("b")
+    nodes.record_success("c", 0.1)
+
+    assert nodes.next_node() == "c"
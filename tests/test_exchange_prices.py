@@ -0,0 +1,76 @@
+import pytest
+
+from pricemonitor.config import Coin
+from pricemonitor.producing.exchange_prices import ExchangePrices
+
+OMG = Coin(symbol="OMG", address="0x44444", name="OMG", volatility=0.05)
+DGX = Coin(symbol="DGX", address="0x33333", name="Digix Gold", volatility=0.05)
+ETH = Coin(symbol="ETH", address="0x22222", name="ETH", volatility=0.05)
+
+
+class RateLimiterFake:
+    def stats(self):
+        return ""
+
+
+class ExchangeFake:
+    name = "ExchangeFake"
+    rate_limiter = RateLimiterFake()
+
+    def __init__(self, supported_coins, price):
+        self.supported_coins = supported_coins
+        self.price = price
+        self.called_coins = []
+        self.markets_version = 0
+
+    def supports(self, coin, market):
+        return coin in self.supported_coins
+
+    async def get_price(self, coin, market):
+        self.called_coins.append(coin)
+        return self.price
+
+
+def _make_exchange_prices(exchanges):
+    exchange_prices = ExchangePrices(
+        coins=[OMG, DGX], market=ETH, exchange_data_action=ExchangeFake.get_price
+    )
+    exchange_prices._exchanges = exchanges
+    exchange_prices._update_routing_table()
+    return exchange_prices
+
+
+@pytest.mark.asyncio
+async def test_get_data__only_supporting_exchanges_called():
+    first = ExchangeFake(supported_coins=[OMG], price=1)
+    second = ExchangeFake(supported_coins=[], price=2)
+    exchange_prices = _make_exchange_prices([first, second])
+
+    await exchange_prices.get_data(loop=None)
+
+    assert first.called_coins == [OMG]
+    assert second.called_coins == []
+
+
+@pytest.mark.asyncio
+async def test_get_data__coin_not_supported__price_is_none():
+    exchange_prices = _make_exchange_prices([ExchangeFake(supported_coins=[OMG], price=1)])
+
+    res = await exchange_prices.get_data(loop=None)
+
+    assert {pair_price.pair[0]: pair_price.price for pair_price in res} == {
+        OMG: 1,
+        DGX: None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_data__exchange_markets_updated__newly_supported_coin_called():
+    exchange = ExchangeFake(supported_coins=[OMG], price=1)
+    exchange_prices = _make_exchange_prices([exchange])
+
+    exchange.supported_coins.append(DGX)
+    exchange.markets_version += 1
+    await exchange_prices.get_data(loop=None)
+
+    assert set(exchange.called_coins) == {OMG, DGX}
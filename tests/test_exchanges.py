@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from time import time
 
@@ -5,21 +6,48 @@ import pytest
 from ccxt.base.errors import ExchangeError
 
 from pricemonitor.config import Coin
-from pricemonitor.producing.exchanges import Exchange, ExchangeName
+from pricemonitor.producing.exchanges import Exchange, ExchangeData, ExchangeName
+from pricemonitor.producing.rate_limiter import RateLimit
 
 logging.disable(logging.WARNING)
 
 COIN = Coin(symbol='KNC', address='0x000', name='KyberNetworkCrystal', volatility=0.05)
+OTHER_COIN = Coin(symbol='OMG', address='0x002', name='OmiseGo', volatility=0.05)
 MARKET = Coin(symbol='ETH', address='0x001', name='Ether', volatility=0.05)
 
 
+class ExchangeNameFake:
+    """Stands for an ExchangeName member whose ccxt exchange is the given fake"""
+
+    def __init__(self, ccxt_exchange, max_in_flight=100):
+        self.value = ExchangeData(
+            name=lambda config: ccxt_exchange,
+            config={},
+            rate_limit=RateLimit(weight_per_second=1000, burst=1000, max_in_flight=max_in_flight, weights={}),
+        )
+
+
+def _make_exchange(ccxt_exchange, max_in_flight=100, hedge_requests=False):
+    exchange = Exchange(ExchangeNameFake(ccxt_exchange, max_in_flight), hedge_requests=hedge_requests)
+    exchange.restore_warm_state({
+        'markets': [f'{COIN.symbol}/{MARKET.symbol}', f'{OTHER_COIN.symbol}/{MARKET.symbol}'],
+        'trade_windows': [],
+    })
+    return exchange
+
+
 class CcxtExchangeWithSomeTrades:
-    TRADES = [{'price': 100}, {'price': 200}, {'price': 300}, {'price': 400}, {'price': 500}]
+    name = 'TestDummy'
+
+    TRADE_PRICES = [100, 200, 300, 400, 500]
     TRADES_AVERAGE = 300
     TRADES_VOLATILITY = 80
 
     async def fetch_trades(self, *args, **kwargs):
-        return CcxtExchangeWithSomeTrades.TRADES
+        # Timestamped when fetched, so the trades are always from the last minute
+        now = int(time() * 1_000)
+        return [{'id': str(i), 'timestamp': now, 'price': price}
+                for i, price in enumerate(CcxtExchangeWithSomeTrades.TRADE_PRICES)]
 
 
 class CcxtExchangeNoTrades:
@@ -31,28 +59,89 @@ class CcxtExchangeNoTrades:
 
 
 class CcxtExchangeNoTradesFromLastMinute:
+    name = 'TestDummy'
+
     LAST_TRADE_PRICE = 1000
-    LAST_TRADE = [{'price': LAST_TRADE_PRICE}]
+    LAST_TRADE = [{'id': '1', 'timestamp': 0, 'price': LAST_TRADE_PRICE}]
 
     @staticmethod
     def _time_now_in_millis_from_epoch():
         return int(round(time() * 1_000))
 
-    async def fetch_trades(self, since, *args, **kwargs):
-        if self._time_now_in_millis_from_epoch() - since < 60 * 1_000:
+    async def fetch_trades(self, since=None, *args, **kwargs):
+        if since is not None and self._time_now_in_millis_from_epoch() - since < 60 * 1_000:
             return []
 
         return CcxtExchangeNoTradesFromLastMinute.LAST_TRADE
 
 
+class CcxtExchangeCountingFetchedTrades:
+    name = 'TestDummy'
+
+    def __init__(self):
+        self.fetched_trades = 0
+        self.last_since = None
+
+    async def fetch_trades(self, since=None, *args, **kwargs):
+        self.last_since = since
+        now = int(time() * 1_000)
+        trades = [{'id': str(now // 1_000), 'timestamp': now // 1_000 * 1_000, 'price': 100}]
+        self.fetched_trades += len(trades)
+        return trades
+
+
+class CcxtExchangeFailingAfterFirstCall(CcxtExchangeWithSomeTrades):
+    def __init__(self):
+        self.calls = 0
+
+    async def fetch_trades(self, *args, **kwargs):
+        self.calls += 1
+        if self.calls > 1:
+            raise ExchangeError()
+        return await super().fetch_trades(*args, **kwargs)
+
+
+class CcxtExchangeWithTickers:
+    has = {'fetchTickers': True}
+    LAST_PRICE = 0.01
+
+    def __init__(self):
+        self.name = "TestDummy"
+        self.tickers_requests = 0
+
+    async def fetch_tickers(self, *args, **kwargs):
+        self.tickers_requests += 1
+        return {
+            f'{COIN.symbol}/{MARKET.symbol}': {'last': CcxtExchangeWithTickers.LAST_PRICE, 'close': 1},
+            f'{OTHER_COIN.symbol}/{MARKET.symbol}': {'last': None, 'close': CcxtExchangeWithTickers.LAST_PRICE},
+        }
+
+
+class CcxtExchangeWithSlowTicker:
+    """Answers ticker requests after `delay` seconds"""
+    name = 'TestDummy'
+    has = {}
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.ticker_requests = 0
+
+    async def fetch_ticker(self, symbol):
+        self.ticker_requests += 1
+        await asyncio.sleep(self.delay)
+        return {'last': 1, 'close': 1}
+
+
 class CcxtExchangeThatRaisesException:
+    name = 'TestDummy'
+
     async def fetch_trades(self, *args, **kwargs):
         raise ExchangeError()
 
 
 @pytest.mark.asyncio
 async def test_get_last_trade_price():
-    exchange = Exchange(CcxtExchangeWithSomeTrades())
+    exchange = _make_exchange(CcxtExchangeWithSomeTrades())
 
     res = await exchange.get_last_trade_price(coin=COIN, market=MARKET)
 
@@ -61,7 +150,7 @@ async def test_get_last_trade_price():
 
 @pytest.mark.asyncio
 async def test_get_last_trade_price__no_trades__returns_none():
-    exchange = Exchange(CcxtExchangeNoTrades())
+    exchange = _make_exchange(CcxtExchangeNoTrades())
 
     res = await exchange.get_last_trade_price(coin=COIN, market=MARKET)
 
@@ -70,7 +159,7 @@ async def test_get_last_trade_price__no_trades__returns_none():
 
 @pytest.mark.asyncio
 async def test_get_average_of_trades_last_minute():
-    exchange = Exchange(CcxtExchangeWithSomeTrades())
+    exchange = _make_exchange(CcxtExchangeWithSomeTrades())
 
     res = await exchange.get_average_of_trades_last_minute(coin=COIN, market=MARKET)
 
@@ -79,16 +168,29 @@ async def test_get_average_of_trades_last_minute():
 
 @pytest.mark.asyncio
 async def test_get_last_minute_trades_average_or_last_trade__no_trades_from_last_minute__returns_last_trade():
-    exchange = Exchange(CcxtExchangeNoTradesFromLastMinute())
+    exchange = _make_exchange(CcxtExchangeNoTradesFromLastMinute())
 
     res = await exchange.get_last_minute_trades_average_or_last_trade(coin=COIN, market=MARKET)
 
     assert CcxtExchangeNoTradesFromLastMinute.LAST_TRADE_PRICE == res
 
 
+@pytest.mark.asyncio
+async def test_get_average_of_trades_last_minute__called_twice__only_newer_trades_fetched():
+    ccxt_exchange = CcxtExchangeCountingFetchedTrades()
+    exchange = _make_exchange(ccxt_exchange)
+
+    await exchange.get_average_of_trades_last_minute(coin=COIN, market=MARKET)
+    first_since = ccxt_exchange.last_since
+    res = await exchange.get_average_of_trades_last_minute(coin=COIN, market=MARKET)
+
+    assert ccxt_exchange.last_since > first_since
+    assert 100 == res
+
+
 @pytest.mark.asyncio
 async def test_get_average_of_trades_last_minute__exception_raised__returns_none():
-    exchange = Exchange(CcxtExchangeThatRaisesException())
+    exchange = _make_exchange(CcxtExchangeThatRaisesException())
 
     res = await exchange.get_average_of_trades_last_minute(coin=COIN, market=MARKET)
 
@@ -97,7 +199,7 @@ async def test_get_average_of_trades_last_minute__exception_raised__returns_none
 
 @pytest.mark.asyncio
 async def test_get_average_of_trades_last_minute__no_trades__returns_none():
-    exchange = Exchange(CcxtExchangeNoTrades())
+    exchange = _make_exchange(CcxtExchangeNoTrades())
 
     res = await exchange.get_average_of_trades_last_minute(coin=COIN, market=MARKET)
 
@@ -106,7 +208,31 @@ async def test_get_average_of_trades_last_minute__no_trades__returns_none():
 
 @pytest.mark.asyncio
 async def test_get_last_trade_price__exception_raised__returns_none():
-    exchange = Exchange(CcxtExchangeThatRaisesException())
+    exchange = _make_exchange(CcxtExchangeThatRaisesException())
+
+    res = await exchange.get_last_trade_price(coin=COIN, market=MARKET)
+
+    assert res is None
+
+
+@pytest.mark.asyncio
+async def test_get_last_minute_trades_average_or_last_trade__exchange_fails_after_first_call__returns_none():
+    exchange = _make_exchange(CcxtExchangeFailingAfterFirstCall())
+
+    first = await exchange.get_last_minute_trades_average_or_last_trade(coin=COIN, market=MARKET)
+    res = await exchange.get_last_minute_trades_average_or_last_trade(coin=COIN, market=MARKET)
+
+    assert CcxtExchangeWithSomeTrades.TRADES_AVERAGE == first
+    assert res is None
+
+
+@pytest.mark.asyncio
+async def test_get_last_trade_price__cached_trade_older_than_a_minute__exchange_asked_again():
+    exchange = _make_exchange(CcxtExchangeThatRaisesException())
+    exchange.restore_warm_state({
+        'markets': [f'{COIN.symbol}/{MARKET.symbol}'],
+        'trade_windows': [[f'{COIN.symbol}/{MARKET.symbol}', 1, [[int(time() * 1_000) - 61_000, 5.0, '1']]]],
+    })
 
     res = await exchange.get_last_trade_price(coin=COIN, market=MARKET)
 
@@ -115,7 +241,7 @@ async def test_get_last_trade_price__exception_raised__returns_none():
 
 @pytest.mark.asyncio
 async def test_get_last_minute_trades_average_or_last_trade__exception_raised__returns_none():
-    exchange = Exchange(CcxtExchangeThatRaisesException())
+    exchange = _make_exchange(CcxtExchangeThatRaisesException())
 
     res = await exchange.get_last_minute_trades_average_or_last_trade(coin=COIN, market=MARKET)
 
@@ -124,7 +250,7 @@ async def test_get_last_minute_trades_average_or_last_trade__exception_raised__r
 
 @pytest.mark.asyncio
 async def test_get_volatility__some_trades__returns_value():
-    exchange = Exchange(CcxtExchangeWithSomeTrades())
+    exchange = _make_exchange(CcxtExchangeWithSomeTrades())
 
     res = await exchange.get_volatility(coin=COIN, market=MARKET, time_period_in_minutes=1)
 
@@ -133,7 +259,7 @@ async def test_get_volatility__some_trades__returns_value():
 
 @pytest.mark.asyncio
 async def test_get_volatility__exception_raised__returns_none():
-    exchange = Exchange(CcxtExchangeThatRaisesException())
+    exchange = _make_exchange(CcxtExchangeThatRaisesException())
 
     res = await exchange.get_volatility(coin=COIN, market=MARKET, time_period_in_minutes=1)
 
@@ -142,13 +268,65 @@ async def test_get_volatility__exception_raised__returns_none():
 
 @pytest.mark.asyncio
 async def test_get_volatility__no_trades__returns_0():
-    exchange = Exchange(CcxtExchangeNoTrades())
+    exchange = _make_exchange(CcxtExchangeNoTrades())
 
     res = await exchange.get_volatility(coin=COIN, market=MARKET, time_period_in_minutes=1)
 
     assert 0 == res
 
 
+@pytest.mark.asyncio
+async def test_get_ticker_last_price__multiple_coins__single_tickers_request():
+    ccxt_exchange = CcxtExchangeWithTickers()
+    exchange = _make_exchange(ccxt_exchange)
+
+    res = await asyncio.gather(
+        exchange.get_ticker_last_price(coin=COIN, market=MARKET),
+        exchange.get_ticker_last_price(coin=OTHER_COIN, market=MARKET),
+    )
+
+    assert [CcxtExchangeWithTickers.LAST_PRICE] * 2 == res
+    assert 1 == ccxt_exchange.tickers_requests
+
+
+@pytest.mark.asyncio
+async def test_get_ticker_last_price__exception_raised__returns_none():
+    exchange = _make_exchange(CcxtExchangeThatRaisesException())
+
+    res = await exchange.get_ticker_last_price(coin=COIN, market=MARKET)
+
+    assert res is None
+
+
+@pytest.mark.asyncio
+async def test_get_ticker_last_price__requests_throttled__no_duplicates_sent():
+    ccxt_exchange = CcxtExchangeWithSlowTicker(delay=0.05)
+    exchange = _make_exchange(ccxt_exchange, max_in_flight=1, hedge_requests=True)
+    for _ in range(20):
+        await exchange.get_ticker_last_price(coin=COIN, market=MARKET)
+    ccxt_exchange.delay = 0.01
+    ccxt_exchange.ticker_requests = 0
+
+    # Most of the requests wait for the limiter for longer than the usual latency
+    await asyncio.gather(*(exchange.get_ticker_last_price(coin=COIN, market=MARKET) for _ in range(10)))
+
+    assert 10 == ccxt_exchange.ticker_requests
+
+
+@pytest.mark.asyncio
+async def test_get_ticker_last_price__slow_reply__duplicate_sent():
+    ccxt_exchange = CcxtExchangeWithSlowTicker(delay=0.01)
+    exchange = _make_exchange(ccxt_exchange, max_in_flight=2, hedge_requests=True)
+    for _ in range(20):
+        await exchange.get_ticker_last_price(coin=COIN, market=MARKET)
+    ccxt_exchange.delay = 0.1
+    ccxt_exchange.ticker_requests = 0
+
+    await exchange.get_ticker_last_price(coin=COIN, market=MARKET)
+
+    assert 2 == ccxt_exchange.ticker_requests
+
+
 @pytest.mark.asyncio
 async def test_get_exchange__returns_an_exchange():
     exchange = await Exchange.create(ExchangeName.BITTREX)
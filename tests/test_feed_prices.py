@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from pricemonitor.config import Coin
+from pricemonitor.producing.feed_prices import FeedPrices, DigixFeed, BtcFeed
+from util.network import NetworkError
+
+DGX_COIN = Coin(symbol="DGX", address="0x000", name="Digix Gold", volatility=0.05)
+WBTC_COIN = Coin(symbol="WBTC", address="0x002", name="WrappedBitcoin", volatility=0.05)
+ETH_COIN = Coin(symbol="ETH", address="0x001", name="Ether", volatility=0.05)
+
+DIGIX_FEED = {
+    "data": [{"symbol": "ETHUSD", "price": 100}, {"symbol": "XAUUSD", "price": 1000}]
+}
+BTC_FEED = {"price": "0.5"}
+
+
+class RoutingNetwork:
+    """Answers each feed URL with a fixed response, failure or delay"""
+
+    def __init__(self, responses, delays=None):
+        self._responses = responses
+        self._delays = delays or {}
+
+    async def get_response_content_from_get_request(self, url, *args, **kwargs):
+        await asyncio.sleep(self._delays.get(url, 0))
+        response = self._responses[url]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def _make_feed_prices(network, **kwargs):
+    return FeedPrices(
+        coins=[DGX_COIN, WBTC_COIN], market=ETH_COIN, network_access=network, **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_data__all_feeds_succeed__returns_all_prices():
+    feed_prices = _make_feed_prices(
+        RoutingNetwork(
+            {DigixFeed._DIGIX_FEED_URL: DIGIX_FEED, BtcFeed._BTC_FEED_URL: BTC_FEED}
+        )
+    )
+
+    res = await feed_prices.get_data(loop=None)
+
+    assert {pair_price.pair[0] for pair_price in res} == {DGX_COIN, WBTC_COIN}
+
+
+@pytest.mark.asyncio
+async def test_get_data__feed_coin_not_given__feed_skipped():
+    feed_prices = FeedPrices(
+        coins=[WBTC_COIN],
+        market=ETH_COIN,
+        network_access=RoutingNetwork({BtcFeed._BTC_FEED_URL: BTC_FEED}),
+    )
+
+    res = await feed_prices.get_data(loop=None)
+
+    assert [pair_price.pair[0] for pair_price in res] == [WBTC_COIN]
+
+
+@pytest.mark.asyncio
+async def test_get_data__one_feed_fails__returns_other_feed_price():
+    feed_prices = _make_feed_prices(
+        RoutingNetwork(
+            {
+                DigixFeed._DIGIX_FEED_URL: NetworkError(),
+                BtcFeed._BTC_FEED_URL: BTC_FEED,
+            }
+        )
+    )
+
+    res = await feed_prices.get_data(loop=None)
+
+    assert len(res) == 1
+    assert res[0].pair == (WBTC_COIN, ETH_COIN)
+    assert res[0].price == 2
+
+
+@pytest.mark.asyncio
+async def test_get_data__one_feed_times_out__returns_other_feed_price():
+    feed_prices = _make_feed_prices(
+        RoutingNetwork(
+            {DigixFeed._DIGIX_FEED_URL: DIGIX_FEED, BtcFeed._BTC_FEED_URL: BTC_FEED},
+            delays={BtcFeed._BTC_FEED_URL: 10},
+        ),
+        feed_timeout_in_seconds=0.1,
+    )
+
+    res = await feed_prices.get_data(loop=None)
+
+    assert [pair_price.pair[0] for pair_price in res] == [DGX_COIN]
+
+
+@pytest.mark.asyncio
+async def test_get_data__feeds_fetched_concurrently():
+    delays = {DigixFeed._DIGIX_FEED_URL: 0.2, BtcFeed._BTC_FEED_URL: 0.2}
+    feed_prices = _make_feed_prices(
+        RoutingNetwork(
+            {DigixFeed._DIGIX_FEED_URL: DIGIX_FEED, BtcFeed._BTC_FEED_URL: BTC_FEED},
+            delays=delays,
+        )
+    )
+    loop = asyncio.get_event_loop()
+
+    start = loop.time()
+    await feed_prices.get_data(loop=loop)
+
+    assert loop.time() - start < sum(delays.values())
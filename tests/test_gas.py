@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from pricemonitor.storing.gas import GasEstimateCache, GasPriceOracle
+
+SANITY_ADDRESS = 'dfc85c08d5e5924ab49750e006cf8a826ffb7b13'
+TWO_RATES_CALL = b'\x01' * 196
+THREE_RATES_CALL = b'\x01' * 260
+GAS_PRICE = 20 * 10 ** 9
+
+
+class ClockFake:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get__no_estimate__none():
+    cache = GasEstimateCache()
+
+    assert cache.get(SANITY_ADDRESS, TWO_RATES_CALL) is None
+
+
+def test_get__estimate_of_same_length_call__estimate_returned():
+    cache = GasEstimateCache()
+
+    cache.add(SANITY_ADDRESS, TWO_RATES_CALL, 50000)
+
+    assert cache.get(SANITY_ADDRESS, b'\x02' * len(TWO_RATES_CALL)) == 50000
+    assert cache.get(SANITY_ADDRESS, THREE_RATES_CALL) is None
+
+
+def test_get__estimate_too_old__none():
+    clock = ClockFake()
+    cache = GasEstimateCache(max_age_in_seconds=60, clock=clock)
+
+    cache.add(SANITY_ADDRESS, TWO_RATES_CALL, 50000)
+    clock.now += 60
+
+    assert cache.get(SANITY_ADDRESS, TWO_RATES_CALL) is None
+
+
+def test_add__lower_estimate_for_same_length__highest_estimate_kept():
+    cache = GasEstimateCache()
+
+    cache.add(SANITY_ADDRESS, TWO_RATES_CALL, 70000)
+    cache.add(SANITY_ADDRESS, TWO_RATES_CALL, 50000)
+
+    assert cache.get(SANITY_ADDRESS, TWO_RATES_CALL) == 70000
+
+
+class NodeFake:
+    def __init__(self, gas_price):
+        self.gas_price = gas_price
+        self.reads = 0
+        self.fail = False
+
+    async def read_gas_price(self):
+        self.reads += 1
+        if self.fail:
+            raise IOError()
+        return self.gas_price
+
+
+@pytest.mark.asyncio
+async def test_get_gas_price__consecutive_calls__node_read_once():
+    node = NodeFake(gas_price=GAS_PRICE)
+    oracle = GasPriceOracle(node.read_gas_price, refresh_interval_in_seconds=60)
+
+    prices = [await oracle.get_gas_price() for _ in range(3)]
+    await oracle.close()
+
+    assert prices == [GAS_PRICE] * 3
+    assert node.reads == 1
+
+
+@pytest.mark.asyncio
+async def test_get_gas_price__after_refresh__new_price_returned():
+    node = NodeFake(gas_price=GAS_PRICE)
+    oracle = GasPriceOracle(node.read_gas_price, refresh_interval_in_seconds=0.01)
+
+    await oracle.get_gas_price()
+    node.gas_price = 2 * GAS_PRICE
+    await asyncio.sleep(0.05)
+    price = await oracle.get_gas_price()
+    await oracle.close()
+
+    assert price == 2 * GAS_PRICE
+
+
+@pytest.mark.asyncio
+async def test_get_gas_price__refresh_failed__last_price_returned():
+    node = NodeFake(gas_price=GAS_PRICE)
+    oracle = GasPriceOracle(node.read_gas_price, refresh_interval_in_seconds=0.01)
+
+    await oracle.get_gas_price()
+    node.fail = True
+    await asyncio.sleep(0.05)
+    price = await oracle.get_gas_price()
+    await oracle.close()
+
+    assert price == GAS_PRICE
+    assert node.reads > 1
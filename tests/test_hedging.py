@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from pricemonitor.producing.hedging import hedged_request
+
+
+class RequestsFake:
+    """Each call takes the next delay from `delays` and returns its call number"""
+
+    def __init__(self, delays, errors=()):
+        self._delays = list(delays)
+        self._errors = set(errors)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def request(self):
+        call_number = self.calls
+        self.calls += 1
+        try:
+            await asyncio.sleep(self._delays[call_number])
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if call_number in self._errors:
+            raise RuntimeError(f"call {call_number} failed")
+        return call_number
+
+
+@pytest.mark.asyncio
+async def test_hedged_request__no_hedging__single_request():
+    requests = RequestsFake(delays=[0.05])
+
+    res = await hedged_request(requests.request, hedge_after_in_seconds=None)
+
+    assert res == 0
+    assert requests.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request__fast_reply__no_duplicate_sent():
+    requests = RequestsFake(delays=[0.01, 0.01])
+
+    res = await hedged_request(requests.request, hedge_after_in_seconds=0.5)
+
+    assert res == 0
+    assert requests.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request__slow_reply__duplicate_answer_used():
+    requests = RequestsFake(delays=[5, 0.01])
+
+    res = await hedged_request(requests.request, hedge_after_in_seconds=0.05)
+    await asyncio.sleep(0)
+
+    assert res == 1
+    assert requests.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request__duplicate_fails__original_answer_used():
+    requests = RequestsFake(delays=[0.2, 0.01], errors=[1])
+
+    res = await hedged_request(requests.request, hedge_after_in_seconds=0.05)
+
+    assert res == 0
+
+
+@pytest.mark.asyncio
+async def test_hedged_request__all_fail__raises():
+    requests = RequestsFake(delays=[0.1, 0.01], errors=[0, 1])
+
+    with pytest.raises(RuntimeError):
+        await hedged_request(requests.request, hedge_after_in_seconds=0.05)
+
+
+@pytest.mark.asyncio
+async def test_hedged_request__timed_out__all_requests_cancelled():
+    requests = RequestsFake(delays=[5, 5])
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(
+            hedged_request(requests.request, hedge_after_in_seconds=0.01), timeout=0.1
+        )
+    await asyncio.sleep(0)
+
+    assert requests.cancelled == 2
+
+
+@pytest.mark.asyncio
+async def test_hedged_request__hedge_factory__duplicate_made_by_it():
+    requests = RequestsFake(delays=[0.5])
+    hedges = RequestsFake(delays=[0.01])
+
+    res = await hedged_request(
+        requests.request, hedge_after_in_seconds=0.05, hedge_factory=hedges.request
+    )
+    await asyncio.sleep(0)
+
+    assert res == 0
+    assert requests.calls == 1
+    assert hedges.calls == 1
+    assert requests.cancelled == 1
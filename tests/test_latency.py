@@ -0,0 +1,17 @@
+from util.latency import LatencyTracker
+
+
+def test_percentile__not_enough_samples__returns_none():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.record(1)
+
+    assert tracker.percentile(95) is None
+
+
+def test_percentile__returns_latency_at_percentile():
+    tracker = LatencyTracker(min_samples=1)
+    for latency in range(1, 101):
+        tracker.record(latency)
+
+    assert tracker.percentile(95) == 96
+    assert tracker.percentile(100) == 100
@@ -0,0 +1,108 @@
+from pricemonitor.storing.abi_encoding import (
+    WORD_SIZE,
+    decode_bytes,
+    decode_dynamic_array_positions,
+    decode_uint,
+    encode_address,
+    encode_bool,
+    encode_bytes,
+    encode_dynamic_array,
+    encode_uint,
+)
+from pricemonitor.storing.multicall import (
+    TRY_AGGREGATE_SELECTOR,
+    decode_try_aggregate,
+    encode_try_aggregate,
+)
+
+TOKEN_RATE_SELECTOR = bytes.fromhex("c57fbf90")
+SANITY_ADDRESS = "dfc85c08d5e5924ab49750e006cf8a826ffb7b13"
+OMG_ADDRESS = "0x0000000000000000000000000000000000044444"
+KNC_ADDRESS = "0x0000000000000000000000000000000000055555"
+
+
+def _token_rate_call(token_address):
+    return TOKEN_RATE_SELECTOR + encode_address(token_address)
+
+
+class MulticallContractFake:
+    """Stand-in for a deployed Multicall2, calling a tokenRate only contract"""
+
+    def __init__(self, rates):
+        self._rates = rates
+
+    def call(self, data):
+        assert data[:4] == TRY_AGGREGATE_SELECTOR
+        arguments = data[4:]
+        calls_position = decode_uint(arguments, WORD_SIZE)
+
+        results = []
+        for position in decode_dynamic_array_positions(arguments, calls_position):
+            target = arguments[position + 12 : position + WORD_SIZE].hex()
+            call_data = decode_bytes(
+                arguments, position + decode_uint(arguments, position + WORD_SIZE)
+            )
+            results.append(self._call_contract(target, call_data))
+
+        encoded_results = [
+            encode_bool(success)
+            + encode_uint(2 * WORD_SIZE)
+            + encode_bytes(return_data)
+            for success, return_data in results
+        ]
+        return encode_uint(WORD_SIZE) + encode_dynamic_array(encoded_results)
+
+    def _call_contract(self, target, call_data):
+        token = int.from_bytes(call_data[4:], byteorder="big")
+        if target != SANITY_ADDRESS or token not in self._rates:
+            return False, b""
+        return True, encode_uint(self._rates[token])
+
+
+def test_encode_try_aggregate__empty_calls__only_head_encoded():
+    data = encode_try_aggregate([])
+
+    # requireSuccess=false, offset of the calls array, empty calls array
+    assert data == (
+        TRY_AGGREGATE_SELECTOR + encode_uint(0) + encode_uint(64) + encode_uint(0)
+    )
+
+
+def test_encode_try_aggregate__call_data_padded_to_words():
+    data = encode_try_aggregate([(SANITY_ADDRESS, _token_rate_call(OMG_ADDRESS))])
+
+    assert (len(data) - len(TRY_AGGREGATE_SELECTOR)) % WORD_SIZE == 0
+
+
+def test_decode_try_aggregate__all_calls_succeed__results_in_call_order():
+    contract = MulticallContractFake(rates={0x44444: 10, 0x55555: 20})
+
+    rs = decode_try_aggregate(
+        contract.call(
+            encode_try_aggregate(
+                [
+                    (SANITY_ADDRESS, _token_rate_call(KNC_ADDRESS)),
+                    (SANITY_ADDRESS, _token_rate_call(OMG_ADDRESS)),
+                ]
+            )
+        )
+    )
+
+    assert rs == [encode_uint(20), encode_uint(10)]
+
+
+def test_decode_try_aggregate__failed_call__none_returned_for_it_only():
+    contract = MulticallContractFake(rates={0x44444: 10})
+
+    rs = decode_try_aggregate(
+        contract.call(
+            encode_try_aggregate(
+                [
+                    (SANITY_ADDRESS, _token_rate_call(OMG_ADDRESS)),
+                    (SANITY_ADDRESS, _token_rate_call(KNC_ADDRESS)),
+                ]
+            )
+        )
+    )
+
+    assert rs == [encode_uint(10), None]
@@ -0,0 +1,100 @@
+import pytest
+from aiohttp import web
+
+from util.network import NetworkClient, DataFormat, NetworkError
+
+
+async def _start_server(handler):
+    app = web.Application()
+    app.router.add_get("/", handler)
+    app.router.add_post("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/"
+
+
+@pytest.mark.asyncio
+async def test_get__json_response__returns_parsed_json():
+    async def handler(request):
+        return web.json_response({"price": "0.5"})
+
+    runner, url = await _start_server(handler)
+    client = NetworkClient()
+    try:
+        res = await client.get_response_content_from_get_request(
+            url=url, format=DataFormat.JSON
+        )
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+    assert res == {"price": "0.5"}
+
+
+@pytest.mark.asyncio
+async def test_get__multiple_requests__connection_reused():
+    peers = set()
+
+    async def handler(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        return web.Response(text="ok")
+
+    runner, url = await _start_server(handler)
+    client = NetworkClient()
+    try:
+        for _ in range(3):
+            await client.get_response_content_from_get_request(url=url)
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+    assert len(peers) == 1
+
+
+@pytest.mark.asyncio
+async def test_post__returns_text():
+    async def handler(request):
+        return web.Response(text=await request.text())
+
+    runner, url = await _start_server(handler)
+    client = NetworkClient()
+    try:
+        res = await client.get_response_content_from_post_request(
+            url=url, payload="data"
+        )
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+    assert res == "data"
+
+
+@pytest.mark.asyncio
+async def test_get__connection_refused__raises_NetworkError():
+    async def handler(request):
+        return web.Response(text="ok")
+
+    runner, url = await _start_server(handler)
+    await runner.cleanup()
+    client = NetworkClient()
+
+    try:
+        with pytest.raises(NetworkError):
+            await client.get_response_content_from_get_request(url=url)
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_close__session_recreated_on_next_use():
+    client = NetworkClient()
+    first_session = client.session
+
+    await client.close()
+    second_session = client.session
+    await client.close()
+
+    assert first_session is not second_session
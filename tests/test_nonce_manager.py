@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from pricemonitor.storing.nonce_manager import NonceManager
+
+NODE_NONCE = 7
+
+
+class NodeFake:
+    def __init__(self):
+        self.nonce = NODE_NONCE
+        self.reads = 0
+
+    async def read_nonce(self):
+        self.reads += 1
+        await asyncio.sleep(0)
+        return self.nonce
+
+
+@pytest.mark.asyncio
+async def test_next_nonce__consecutive_calls__node_read_once():
+    node = NodeFake()
+    nonce_manager = NonceManager(node.read_nonce)
+
+    nonces = [await nonce_manager.next_nonce() for _ in range(3)]
+
+    assert nonces == [NODE_NONCE, NODE_NONCE + 1, NODE_NONCE + 2]
+    assert node.reads == 1
+
+
+@pytest.mark.asyncio
+async def test_next_nonce__concurrent_calls__distinct_nonces():
+    node = NodeFake()
+    nonce_manager = NonceManager(node.read_nonce)
+
+    nonces = await asyncio.gather(*[nonce_manager.next_nonce() for _ in range(3)])
+
+    assert sorted(nonces) == [NODE_NONCE, NODE_NONCE + 1, NODE_NONCE + 2]
+    assert node.reads == 1
+
+
+@pytest.mark.asyncio
+async def test_next_nonce__after_resync__node_read_again():
+    node = NodeFake()
+    nonce_manager = NonceManager(node.read_nonce)
+
+    await nonce_manager.next_nonce()
+    node.nonce = 20
+    nonce_manager.resync()
+
+    assert await nonce_manager.next_nonce() == 20
+    assert node.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_next_nonce__restored_nonce__node_not_read():
+    node = NodeFake()
+    nonce_manager = NonceManager(node.read_nonce, next_nonce=30)
+
+    assert await nonce_manager.next_nonce() == 30
+    assert nonce_manager.known_next_nonce == 31
+    assert node.reads == 0
+
+
+class ClockFake:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def _make_nonce_manager_with_gap(node, clock):
+    """Nonces 30 and 31 were handed out, the chain is still at 30"""
+    return NonceManager(node.read_nonce, next_nonce=32, gap_timeout_in_seconds=60, clock=clock)
+
+
+@pytest.mark.asyncio
+async def test_check_mined_nonce__unsent_nonce_awaited_past_timeout__node_read_again():
+    node = NodeFake()
+    clock = ClockFake()
+    nonce_manager = _make_nonce_manager_with_gap(node, clock)
+
+    nonce_manager.check_mined_nonce(30, is_nonce_sent=False)
+    clock.now += 60
+    nonce_manager.check_mined_nonce(30, is_nonce_sent=False)
+
+    assert nonce_manager.known_next_nonce is None
+    assert await nonce_manager.next_nonce() == NODE_NONCE
+
+
+def test_check_mined_nonce__unsent_nonce_awaited_within_timeout__nonce_kept():
+    clock = ClockFake()
+    nonce_manager = _make_nonce_manager_with_gap(NodeFake(), clock)
+
+    nonce_manager.check_mined_nonce(30, is_nonce_sent=False)
+    clock.now += 59
+    nonce_manager.check_mined_nonce(30, is_nonce_sent=False)
+
+    assert nonce_manager.known_next_nonce == 32
+
+
+def test_check_mined_nonce__awaited_nonce_sent__nonce_kept():
+    clock = ClockFake()
+    nonce_manager = _make_nonce_manager_with_gap(NodeFake(), clock)
+
+    nonce_manager.check_mined_nonce(30, is_nonce_sent=True)
+    clock.now += 60
+    nonce_manager.check_mined_nonce(30, is_nonce_sent=True)
+
+    assert nonce_manager.known_next_nonce == 32
+
+
+def test_check_mined_nonce__gap_closed_in_between__timeout_restarted():
+    clock = ClockFake()
+    nonce_manager = _make_nonce_manager_with_gap(NodeFake(), clock)
+
+    nonce_manager.check_mined_nonce(30, is_nonce_sent=False)
+    clock.now += 30
+    nonce_manager.check_mined_nonce(31, is_nonce_sent=True)
+    clock.now += 30
+    nonce_manager.check_mined_nonce(31, is_nonce_sent=False)
+
+    assert nonce_manager.known_next_nonce == 32
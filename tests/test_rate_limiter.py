@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from pricemonitor.producing.rate_limiter import RateLimit, RateLimiter, share_of
+
+
+def _make_rate_limiter(weight_per_second=100, burst=1, max_in_flight=10, weights=None):
+    return RateLimiter(
+        RateLimit(
+            weight_per_second=weight_per_second,
+            burst=burst,
+            max_in_flight=max_in_flight,
+            weights=weights or {},
+        )
+    )
+
+
+async def _call(rate_limiter, weight=1, duration=0):
+    async with rate_limiter.limit(weight):
+        await asyncio.sleep(duration)
+
+
+@pytest.mark.asyncio
+async def test_limit__within_burst__not_throttled():
+    rate_limiter = _make_rate_limiter(burst=5)
+
+    await asyncio.gather(*(_call(rate_limiter) for _ in range(5)))
+
+    assert rate_limiter.calls == 5
+    assert rate_limiter.throttled_calls == 0
+
+
+@pytest.mark.asyncio
+async def test_limit__above_burst__calls_wait_for_budget():
+    rate_limiter = _make_rate_limiter(weight_per_second=20, burst=1)
+    loop = asyncio.get_event_loop()
+
+    start = loop.time()
+    await asyncio.gather(*(_call(rate_limiter) for _ in range(3)))
+
+    assert loop.time() - start >= 0.09
+    assert rate_limiter.throttled_calls == 2
+    assert rate_limiter.total_queued_time_in_seconds > 0
+
+
+@pytest.mark.asyncio
+async def test_limit__max_in_flight__concurrency_capped():
+    rate_limiter = _make_rate_limiter(burst=10, max_in_flight=2)
+    in_flight = []
+    max_in_flight = []
+
+    async def call():
+        async with rate_limiter.limit():
+            in_flight.append(1)
+            max_in_flight.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+
+    await asyncio.gather(*(call() for _ in range(6)))
+
+    assert max(max_in_flight) == 2
+
+
+@pytest.mark.asyncio
+async def test_limit__call_raises__slot_released():
+    rate_limiter = _make_rate_limiter(max_in_flight=1)
+
+    with pytest.raises(RuntimeError):
+        async with rate_limiter.limit():
+            raise RuntimeError()
+    await asyncio.wait_for(_call(rate_limiter), timeout=1)
+
+
+def test_weight_of__listed_and_unlisted_methods():
+    rate_limiter = _make_rate_limiter(weights={"fetch_tickers": 40})
+
+    assert rate_limiter.weight_of("fetch_tickers") == 40
+    assert rate_limiter.weight_of("fetch_trades") == 1
+
+
+def test_share_of__limits_divided_weights_kept():
+    rate_limit = RateLimit(weight_per_second=20, burst=10, max_in_flight=5, weights={"fetch_tickers": 40})
+
+    shared = share_of(rate_limit, 1 / 4)
+
+    assert shared.weight_per_second == 5
+    assert shared.burst == 2.5
+    assert shared.max_in_flight == 1
+    assert shared.weights == {"fetch_tickers": 40}
+
+
+def test_share_of__tiny_share__one_call_still_allowed():
+    rate_limit = RateLimit(weight_per_second=20, burst=10, max_in_flight=2, weights={})
+
+    assert share_of(rate_limit, 1 / 10).max_in_flight == 1
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from pricemonitor.storing.receipt_tracker import ReceiptTracker
+
+TX_1 = '0x1111'
+TX_2 = '0x2222'
+POLL_INTERVAL_IN_SECONDS = 0.01
+
+
+class NodeFake:
+    def __init__(self):
+        self.receipts = {}
+        self.requests = []
+
+    async def get_receipts(self, tx_hashes):
+        self.requests.append(tx_hashes)
+        return [self.receipts.get(tx_hash) for tx_hash in tx_hashes]
+
+    def mine(self, tx_hash):
+        self.receipts[tx_hash] = {'transactionHash': tx_hash, 'status': '0x1'}
+
+
+def _make_tracker(node):
+    return ReceiptTracker(node.get_receipts, poll_interval_in_seconds=POLL_INTERVAL_IN_SECONDS)
+
+
+@pytest.mark.asyncio
+async def test_track__transaction_mined__future_resolved_with_receipt():
+    node = NodeFake()
+    tracker = _make_tracker(node)
+
+    receipt = tracker.track(TX_1)
+    node.mine(TX_1)
+    rs = await asyncio.wait_for(receipt, 1)
+    await tracker.close()
+
+    assert rs['transactionHash'] == TX_1
+    assert tracker.time_to_inclusion.percentile(50) is not None
+
+
+@pytest.mark.asyncio
+async def test_track__several_transactions__polled_in_one_request():
+    node = NodeFake()
+    tracker = _make_tracker(node)
+
+    tracker.track(TX_1)
+    tracker.track(TX_2)
+    await asyncio.sleep(POLL_INTERVAL_IN_SECONDS * 2)
+    await tracker.close()
+
+    assert node.requests[0] == [TX_1, TX_2]
+
+
+@pytest.mark.asyncio
+async def test_track__future_cancelled__transaction_not_polled_anymore():
+    node = NodeFake()
+    tracker = _make_tracker(node)
+
+    tracker.track(TX_1).cancel()
+    receipt = tracker.track(TX_2)
+    node.mine(TX_2)
+    await asyncio.wait_for(receipt, 1)
+    await tracker.close()
+
+    assert all(TX_1 not in request for request in node.requests)
+
+
+@pytest.mark.asyncio
+async def test_track__all_mined__polling_stops():
+    node = NodeFake()
+    tracker = _make_tracker(node)
+
+    receipt = tracker.track(TX_1)
+    node.mine(TX_1)
+    await asyncio.wait_for(receipt, 1)
+    requests_when_mined = len(node.requests)
+    await asyncio.sleep(POLL_INTERVAL_IN_SECONDS * 3)
+
+    assert len(node.requests) == requests_when_mined
+
+
+@pytest.mark.asyncio
+async def test_track__sent_time_given__time_to_inclusion_measured_from_it():
+    node = NodeFake()
+    tracker = ReceiptTracker(node.get_receipts, poll_interval_in_seconds=POLL_INTERVAL_IN_SECONDS, clock=lambda: 100)
+
+    receipt = tracker.track(TX_1, sent_time=70)
+    node.mine(TX_1)
+    await asyncio.wait_for(receipt, 1)
+    await tracker.close()
+
+    assert tracker.time_to_inclusion.percentile(50) == 30
@@ -1,9 +1,11 @@
+import asyncio
 import logging
 import os
 
 import pytest
 
 from pricemonitor.config import Coin
+from pricemonitor.producing.data_producer import PairPrice
 from pricemonitor.storing.node_errors import PreviousTransactionPending
 from pricemonitor.storing.storing import SanityContractUpdater, ContractRateArgumentsConverter
 
@@ -13,6 +15,7 @@ SOME_TX_ADDRESS = '0x9865'
 
 OMG = Coin(symbol='OMG', address='0x44444', name='OMG', volatility=0.05)
 ETH = Coin(symbol='ETH', address='0x22222', name='ETH', volatility=0.05)
+KNC = Coin(symbol='KNC', address='0x55555', name='KNC', volatility=0.05)
 
 INITIAL_OMG_PRICE = 0.1
 
@@ -21,25 +24,43 @@ DIFFERENT_FROM_INITIAL_OMG_ETH_RATE = 0.110
 SOME_OTHER_OMG_ETH_RATE = 0.1667
 
 SOME_OTHER_COIN_PRICES = [
-    ((OMG, ETH), SOME_OTHER_OMG_ETH_RATE),
+    PairPrice(pair=(OMG, ETH), price=SOME_OTHER_OMG_ETH_RATE),
 ]
 
 SIMILAR_TO_INITIAL_COIN_PRICES = [
-    ((OMG, ETH), SIMILAR_TO_INITIAL_OMG_ETH_RATE),
+    PairPrice(pair=(OMG, ETH), price=SIMILAR_TO_INITIAL_OMG_ETH_RATE),
 ]
 
 DIFFERENT_FROM_INITIAL_OMG_ETH_PRICES = [
-    ((OMG, ETH), DIFFERENT_FROM_INITIAL_OMG_ETH_RATE),
+    PairPrice(pair=(OMG, ETH), price=DIFFERENT_FROM_INITIAL_OMG_ETH_RATE),
+]
+
+DIFFERENT_FROM_INITIAL_OMG_AND_KNC_PRICES = [
+    PairPrice(pair=(OMG, ETH), price=DIFFERENT_FROM_INITIAL_OMG_ETH_RATE),
+    PairPrice(pair=(KNC, ETH), price=SOME_OTHER_OMG_ETH_RATE),
 ]
 
 
 class Web3ConnectorFake:
-    async def call_remote_function(self, function_name, args, loop):
+    nonce_resyncs = 0
+
+    async def call_remote_function(self, function_name, eth_args, loop):
         return SOME_TX_ADDRESS
 
-    async def call_local_function(self, function_name, args, loop):
+    async def call_local_function(self, function_name, eth_args, loop):
         return 0
 
+    async def call_local_functions(self, function_name, eth_args_list, loop):
+        return [[0] for _ in eth_args_list]
+
+    def track_transaction(self, tx_hash):
+        receipt = asyncio.Future()
+        receipt.set_result({'blockHash': '0x1234', 'status': '0x1'})
+        return receipt
+
+    def resync_nonce(self):
+        self.nonce_resyncs += 1
+
 
 class Web3ConnectorFakeWithInitialOMG(Web3ConnectorFake):
     INITIAL_OMG_CONTRACT_RATE = INITIAL_OMG_PRICE * 10 ** 18
@@ -47,30 +68,61 @@ class Web3ConnectorFakeWithInitialOMG(Web3ConnectorFake):
     def __init__(self):
         self.prices = {OMG.address: Web3ConnectorFakeWithInitialOMG.INITIAL_OMG_CONTRACT_RATE}
         self.raise_previous_transaction_pending = False
+        self.rates_reads = 0
 
-    async def call_local_function(self, function_name, args, loop):
+    async def call_local_function(self, function_name, eth_args, loop):
         if function_name == SanityContractUpdater.GET_RATE_FUNCTION_NAME:
-            return [self.prices[args[0]]]
+            return [self.prices[eth_args[0]]]
 
-        return super().call_local_function(function_name, args, loop)
+        return await super().call_local_function(function_name, eth_args, loop)
 
-    async def call_remote_function(self, function_name, args, loop):
+    async def call_local_functions(self, function_name, eth_args_list, loop):
+        if function_name == SanityContractUpdater.GET_RATE_FUNCTION_NAME:
+            self.rates_reads += 1
+            return [
+                [self.prices[args[0]]] if args[0] in self.prices else None
+                for args in eth_args_list
+            ]
+
+        return await super().call_local_functions(function_name, eth_args_list, loop)
+
+    async def call_remote_function(self, function_name, eth_args, loop):
         if self.raise_previous_transaction_pending:
             raise PreviousTransactionPending()
 
         if function_name == SanityContractUpdater.SET_RATES_FUNCTION_NAME:
-            coins, rates = args
+            coins, rates = eth_args
             for coin_address, rate in zip(coins, rates):
                 self.prices[coin_address] = rate
             return SOME_TX_ADDRESS
 
-        return super().call_remote_function(function_name, args, loop)
+        return await super().call_remote_function(function_name, eth_args, loop)
 
 
-class ConfigFake:
+class Web3ConnectorFakeWithFailingUpdates(Web3ConnectorFakeWithInitialOMG):
+    def track_transaction(self, tx_hash):
+        receipt = asyncio.Future()
+        receipt.set_result({'blockHash': '0x1234', 'status': '0x0'})
+        return receipt
+
+
+class Web3ConnectorFakeWithUnminedUpdates(Web3ConnectorFakeWithInitialOMG):
+    def track_transaction(self, tx_hash):
+        return asyncio.Future()
+
+
+class ClockFake:
     def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class ConfigFake:
+    def __init__(self, coins=None):
         self.market = ETH
-        self.coins = [OMG]
+        self.coins = [OMG] if coins is None else coins
 
 
 def test_initial():
@@ -138,24 +190,146 @@ async def test_update_prices__insignificant_change__rates_do_not_change(event_lo
     # TODO: assert web3_connector.set_prices was not called!
 
 
+@pytest.mark.asyncio
+async def test_update_prices__previous_rate_not_read__other_rates_updated(event_loop):
+    web3_connector = Web3ConnectorFakeWithInitialOMG()
+    s = SanityContractUpdater(web3_connector, ConfigFake(coins=[OMG, KNC]))
+
+    rs = await s.update_prices(DIFFERENT_FROM_INITIAL_OMG_AND_KNC_PRICES, event_loop)
+
+    assert rs is not None
+    assert OMG.address in web3_connector.prices
+    assert KNC.address not in web3_connector.prices
+
+
+@pytest.mark.asyncio
+async def test_update_prices__previous_rate_not_read__read_again_and_updated_next_cycle(event_loop):
+    web3_connector = Web3ConnectorFakeWithInitialOMG()
+    s = SanityContractUpdater(web3_connector, ConfigFake(coins=[OMG, KNC]))
+    await s.update_prices(SIMILAR_TO_INITIAL_COIN_PRICES, event_loop)
+    web3_connector.prices[KNC.address] = Web3ConnectorFakeWithInitialOMG.INITIAL_OMG_CONTRACT_RATE
+
+    rs = await s.update_prices(DIFFERENT_FROM_INITIAL_OMG_AND_KNC_PRICES, event_loop)
+
+    assert rs is not None
+    assert web3_connector.rates_reads == 2
+    assert web3_connector.prices[KNC.address] != Web3ConnectorFakeWithInitialOMG.INITIAL_OMG_CONTRACT_RATE
+
+
+@pytest.mark.asyncio
+async def test_update_prices__second_cycle__rates_not_read_again(event_loop):
+    web3_connector = Web3ConnectorFakeWithInitialOMG()
+    s = SanityContractUpdater(web3_connector, ConfigFake())
+
+    await s.update_prices(SIMILAR_TO_INITIAL_COIN_PRICES, event_loop)
+    await s.update_prices(SIMILAR_TO_INITIAL_COIN_PRICES, event_loop)
+
+    assert web3_connector.rates_reads == 1
+
+
+@pytest.mark.asyncio
+async def test_update_prices__reconciliation_interval_passed__rates_read_again(event_loop):
+    web3_connector = Web3ConnectorFakeWithInitialOMG()
+    clock = ClockFake()
+    s = SanityContractUpdater(web3_connector, ConfigFake(), clock=clock)
+
+    await s.update_prices(SIMILAR_TO_INITIAL_COIN_PRICES, event_loop)
+    clock.now += SanityContractUpdater._RECONCILIATION_INTERVAL_IN_SECONDS
+    await s.update_prices(SIMILAR_TO_INITIAL_COIN_PRICES, event_loop)
+
+    assert web3_connector.rates_reads == 2
+
+
+@pytest.mark.asyncio
+async def test_update_prices__update_mined__next_cycle_compares_to_updated_rate(event_loop):
+    web3_connector = Web3ConnectorFakeWithInitialOMG()
+    s = SanityContractUpdater(web3_connector, ConfigFake())
+
+    await s.update_prices(DIFFERENT_FROM_INITIAL_OMG_ETH_PRICES, event_loop)
+    rs = await s.update_prices(DIFFERENT_FROM_INITIAL_OMG_ETH_PRICES, event_loop)
+
+    assert rs is None
+    assert web3_connector.rates_reads == 1
+
+
+@pytest.mark.asyncio
+async def test_update_prices__warm_state_restored__rates_not_read(event_loop):
+    web3_connector = Web3ConnectorFakeWithInitialOMG()
+    s = SanityContractUpdater(web3_connector, ConfigFake())
+    await s.update_prices(SIMILAR_TO_INITIAL_COIN_PRICES, event_loop)
+
+    restarted_connector = Web3ConnectorFakeWithInitialOMG()
+    restarted = SanityContractUpdater(restarted_connector, ConfigFake())
+    restarted.restore_warm_state(s.warm_state())
+    rs = await restarted.update_prices(SIMILAR_TO_INITIAL_COIN_PRICES, event_loop)
+
+    assert rs is None
+    assert restarted_connector.rates_reads == 0
+
+
+@pytest.mark.asyncio
+async def test_update_prices__warm_state_missing_coin__rates_read(event_loop):
+    web3_connector = Web3ConnectorFakeWithInitialOMG()
+    s = SanityContractUpdater(web3_connector, ConfigFake())
+    await s.update_prices(SIMILAR_TO_INITIAL_COIN_PRICES, event_loop)
+
+    restarted_connector = Web3ConnectorFakeWithInitialOMG()
+    restarted = SanityContractUpdater(restarted_connector, ConfigFake(coins=[OMG, KNC]))
+    restarted.restore_warm_state(s.warm_state())
+    await restarted.update_prices(SIMILAR_TO_INITIAL_COIN_PRICES, event_loop)
+
+    assert restarted_connector.rates_reads == 1
+
+
+@pytest.mark.asyncio
+async def test_update_prices__update_failed_when_mined__rates_read_again(event_loop):
+    web3_connector = Web3ConnectorFakeWithFailingUpdates()
+    s = SanityContractUpdater(web3_connector, ConfigFake())
+
+    await s.update_prices(DIFFERENT_FROM_INITIAL_OMG_ETH_PRICES, event_loop)
+    await s.update_prices(DIFFERENT_FROM_INITIAL_OMG_ETH_PRICES, event_loop)
+
+    assert web3_connector.rates_reads == 2
+
+
+@pytest.mark.asyncio
+async def test_update_prices__update_not_mined_in_time__nonce_resynced(event_loop):
+    web3_connector = Web3ConnectorFakeWithUnminedUpdates()
+    clock = ClockFake()
+    s = SanityContractUpdater(web3_connector, ConfigFake(), clock=clock)
+
+    await s.update_prices(DIFFERENT_FROM_INITIAL_OMG_ETH_PRICES, event_loop)
+    await s.update_prices(DIFFERENT_FROM_INITIAL_OMG_ETH_PRICES, event_loop)
+    assert web3_connector.nonce_resyncs == 0
+
+    clock.now += SanityContractUpdater._PENDING_UPDATE_TIMEOUT_IN_SECONDS
+    await s.update_prices(DIFFERENT_FROM_INITIAL_OMG_ETH_PRICES, event_loop)
+
+    assert web3_connector.nonce_resyncs == 1
+
+
 @pytest.mark.skip
 @pytest.mark.asyncio
 async def test_update_prices__mixed_price_updates__only_major_changes_get_updated():
     assert False
 
 
+# Resending with a higher gas price is done by Web3Connector and Web3Interface,
+# the updater only sees PreviousTransactionPending once every attempt failed
 @pytest.mark.asyncio
-async def test_update_prices__two_very_fast_rates_updates__second_tx_sent(event_loop):
+async def test_update_prices__two_very_fast_rates_updates__second_tx_pending__sent_again_next_cycle(event_loop):
     web3_connector = Web3ConnectorFakeWithInitialOMG()
     s = SanityContractUpdater(web3_connector, ConfigFake())
-
-    rs1 = await s.update_prices(DIFFERENT_FROM_INITIAL_OMG_ETH_PRICES, event_loop)
+    await s.update_prices(DIFFERENT_FROM_INITIAL_OMG_ETH_PRICES, event_loop)
 
     web3_connector.raise_previous_transaction_pending = True
     rs2 = await s.update_prices(SOME_OTHER_COIN_PRICES, event_loop)
+    web3_connector.raise_previous_transaction_pending = False
+    rs3 = await s.update_prices(SOME_OTHER_COIN_PRICES, event_loop)
 
-    assert rs2 is not None
-    assert rs1 != rs2
+    assert rs2 is None
+    assert rs3 is not None
+    assert web3_connector.rates_reads == 2
 
 
 # @pytest.mark.asyncio
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from pricemonitor.scheduling import CycleScheduler, LatestSnapshotPipeline
+
+INTERVAL_IN_SECONDS = 10
+
+
+class StopScheduler(Exception):
+    pass
+
+
+class TimeFake:
+    """Clock that only moves when sleeping or working"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+async def _run_cycles(scheduler, time_fake, cycle_durations):
+    start_times = []
+
+    async def cycle():
+        if len(start_times) == len(cycle_durations):
+            raise StopScheduler()
+        start_times.append(time_fake.now)
+        time_fake.now += cycle_durations[len(start_times) - 1]
+
+    with pytest.raises(StopScheduler):
+        await scheduler.run_forever(cycle)
+    return start_times
+
+
+def _make_scheduler(time_fake, deadline_in_seconds=None):
+    return CycleScheduler(
+        interval_in_seconds=INTERVAL_IN_SECONDS,
+        deadline_in_seconds=deadline_in_seconds,
+        clock=time_fake.time,
+        sleep=time_fake.sleep,
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_forever__cycles_take_time__first_started_at_once_then_on_fixed_ticks():
+    time_fake = TimeFake(now=1003)
+    scheduler = _make_scheduler(time_fake)
+
+    start_times = await _run_cycles(scheduler, time_fake, [3, 7, 1])
+
+    assert start_times == [1003, 1010, 1020]
+    assert scheduler.skipped_cycles == 0
+
+
+@pytest.mark.asyncio
+async def test_run_forever__cycle_overruns__missed_ticks_skipped():
+    time_fake = TimeFake(now=1000)
+    scheduler = _make_scheduler(time_fake)
+
+    start_times = await _run_cycles(scheduler, time_fake, [25, 1])
+
+    assert start_times == [1000, 1030]
+    assert scheduler.skipped_cycles == 2
+
+
+@pytest.mark.asyncio
+async def test_run_forever__cycle_passes_deadline__cancelled():
+    scheduler = CycleScheduler(interval_in_seconds=0.02, deadline_in_seconds=0.01)
+    cycles = []
+
+    async def cycle():
+        cycles.append(len(cycles))
+        if len(cycles) == 1:
+            await asyncio.sleep(1)
+        raise StopScheduler()
+
+    with pytest.raises(StopScheduler):
+        await scheduler.run_forever(cycle)
+
+    assert scheduler.cancelled_cycles == 1
+    assert cycles == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_pipeline__slow_consumer__producing_not_delayed_and_stale_snapshots_dropped():
+    pipeline = LatestSnapshotPipeline(CycleScheduler(interval_in_seconds=0.01))
+    produced = []
+    consumed = []
+
+    async def produce():
+        produced.append(len(produced))
+        return produced[-1]
+
+    async def consume(snapshot):
+        consumed.append(snapshot)
+        if len(consumed) == 2:
+            raise StopScheduler()
+        await asyncio.sleep(0.1)
+
+    with pytest.raises(StopScheduler):
+        await pipeline.run_forever(produce, consume)
+
+    assert len(produced) > 5
+    assert consumed[0] == 0
+    assert consumed[1] > 1
+    assert pipeline.dropped_snapshots == consumed[1] - 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline__producer_fails__consumer_stopped():
+    pipeline = LatestSnapshotPipeline(CycleScheduler(interval_in_seconds=0.01))
+    consumed = []
+
+    async def produce():
+        raise StopScheduler()
+
+    async def consume(snapshot):
+        consumed.append(snapshot)
+
+    with pytest.raises(StopScheduler):
+        await pipeline.run_forever(produce, consume)
+
+    assert consumed == []
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from pricemonitor.config import Coin
+from pricemonitor.producing.data_producer import DataProducer, PairPrice
+from pricemonitor.producing.sharded_producer import ShardedProducer
+
+ETH = Coin(symbol="ETH", address="0x22222", name="ETH", volatility=0.05)
+COINS = [
+    Coin(symbol=f"T{i}", address=f"0x{i}", name=f"Token {i}", volatility=0.05)
+    for i in range(5)
+]
+
+
+class PidProducerFake(DataProducer):
+    """Prices each coin with the id of the process producing it"""
+
+    def __init__(self, coins, market, rate_limit_share=1):
+        super().__init__(coins=coins, market=market)
+
+    async def initialize(self):
+        pass
+
+    async def get_data(self, loop):
+        return [
+            PairPrice(pair=(coin, self._market), price=os.getpid())
+            for coin in self._coins
+        ]
+
+
+@pytest.mark.asyncio
+async def test_get_data__coins_split_across_processes__all_prices_merged():
+    producer = ShardedProducer(
+        coins=COINS, market=ETH, shards=2, data_producer=PidProducerFake
+    )
+    await producer.initialize()
+    try:
+        rs = await producer.get_data(loop=None)
+        rs_again = await producer.get_data(loop=None)
+    finally:
+        await producer.close()
+
+    assert sorted(pair_price.pair[0].symbol for pair_price in rs) == [
+        coin.symbol for coin in COINS
+    ]
+    pids = {pair_price.price for pair_price in rs}
+    assert len(pids) == 2
+    assert os.getpid() not in pids
+    assert rs_again == rs
+
+
+class RateLimitShareProducerFake(PidProducerFake):
+    """Prices each coin with the share of the rate limit its process was given"""
+
+    def __init__(self, coins, market, rate_limit_share=1):
+        super().__init__(coins=coins, market=market)
+        self._rate_limit_share = rate_limit_share
+
+    async def get_data(self, loop):
+        return [
+            PairPrice(pair=(coin, self._market), price=self._rate_limit_share)
+            for coin in self._coins
+        ]
+
+
+@pytest.mark.asyncio
+async def test_get_data__shards__each_gets_an_equal_share_of_the_rate_limit():
+    producer = ShardedProducer(
+        coins=COINS, market=ETH, shards=4, data_producer=RateLimitShareProducerFake
+    )
+    await producer.initialize()
+    try:
+        rs = await producer.get_data(loop=None)
+    finally:
+        await producer.close()
+
+    assert {pair_price.price for pair_price in rs} == {1 / 4}
+
+
+def test_init__more_shards_than_coins__no_empty_shards():
+    producer = ShardedProducer(
+        coins=COINS[:2], market=ETH, shards=4, data_producer=PidProducerFake
+    )
+
+    assert producer._shard_coins == [[COINS[0]], [COINS[1]]]
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from pricemonitor.config import Coin
+from pricemonitor.producing.data_producer import DataProducer, PairPrice
+from pricemonitor.producing.shared_producer import SharedDataProducer
+
+OMG = Coin(symbol="OMG", address="0x44444", name="OMG", volatility=0.05)
+ETH = Coin(symbol="ETH", address="0x22222", name="ETH", volatility=0.05)
+MAX_AGE_IN_SECONDS = 10
+
+
+class ClockFake:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class DataProducerFake(DataProducer):
+    def __init__(self, fail=False):
+        super().__init__(coins=[OMG], market=ETH)
+        self.samples = 0
+        self._fail = fail
+
+    async def initialize(self):
+        pass
+
+    async def get_data(self, loop):
+        self.samples += 1
+        await asyncio.sleep(0)
+        if self._fail:
+            raise IOError("Exchange down")
+        return [PairPrice(pair=(OMG, ETH), price=self.samples)]
+
+
+def _make_shared(producer, clock):
+    return SharedDataProducer(producer, max_age_in_seconds=MAX_AGE_IN_SECONDS, clock=clock)
+
+
+@pytest.mark.asyncio
+async def test_get_data__concurrent_consumers__sampled_once():
+    producer = DataProducerFake()
+    shared = _make_shared(producer, ClockFake())
+
+    rs = await asyncio.gather(shared.get_data(loop=None), shared.get_data(loop=None))
+
+    assert producer.samples == 1
+    assert rs[0] == rs[1]
+
+
+@pytest.mark.asyncio
+async def test_get_data__within_max_age__sample_reused():
+    producer = DataProducerFake()
+    clock = ClockFake()
+    shared = _make_shared(producer, clock)
+
+    await shared.get_data(loop=None)
+    clock.now += MAX_AGE_IN_SECONDS
+    await shared.get_data(loop=None)
+
+    assert producer.samples == 1
+
+
+@pytest.mark.asyncio
+async def test_get_data__sample_too_old__sampled_again():
+    producer = DataProducerFake()
+    clock = ClockFake()
+    shared = _make_shared(producer, clock)
+
+    await shared.get_data(loop=None)
+    clock.now += MAX_AGE_IN_SECONDS + 1
+    rs = await shared.get_data(loop=None)
+
+    assert producer.samples == 2
+    assert rs == [PairPrice(pair=(OMG, ETH), price=2)]
+
+
+@pytest.mark.asyncio
+async def test_get_data__sampling_failed__sampled_again():
+    producer = DataProducerFake(fail=True)
+    shared = _make_shared(producer, ClockFake())
+
+    for _ in range(2):
+        with pytest.raises(IOError):
+            await shared.get_data(loop=None)
+
+    assert producer.samples == 2
@@ -0,0 +1,170 @@
+import asyncio
+import gzip
+import json
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from pricemonitor.config import Coin
+from pricemonitor.producing.trade_streams import (
+    BinanceTradeStream,
+    HuobiTradeStream,
+    TradeStreamPrices,
+)
+from util.time import millis_since_epoch
+
+OMG = Coin(symbol="OMG", address="0x44444", name="OMG", volatility=0.05)
+KNC = Coin(symbol="KNC", address="0x33333", name="KyberNetwork", volatility=0.05)
+ETH = Coin(symbol="ETH", address="0x22222", name="ETH", volatility=0.05)
+
+
+def _binance_trade(symbol, price, timestamp):
+    return {
+        "stream": f"{symbol.lower()}@trade",
+        "data": {"e": "trade", "s": symbol, "p": str(price), "T": timestamp},
+    }
+
+
+async def _start_fake_stream_server(messages):
+    """Local stand-in for an exchange stream, sends `messages` to every client"""
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        for message in messages:
+            await ws.send_json(message)
+        async for _ in ws:
+            pass
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/"
+
+
+async def _wait_for_price(producer, coin, expected_price, timeout=5):
+    for _ in range(int(timeout / 0.05)):
+        prices = {
+            pair_price.pair[0]: pair_price.price
+            for pair_price in await producer.get_data(loop=None)
+        }
+        if prices[coin] == pytest.approx(expected_price):
+            return prices
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"Expected price not received for {coin.symbol}")
+
+
+@pytest.mark.asyncio
+async def test_get_data__trades_streamed__returns_average_of_last_minute():
+    now = millis_since_epoch()
+    runner, url = await _start_fake_stream_server(
+        [
+            _binance_trade("OMGETH", 0.01, now - 120_000),
+            _binance_trade("OMGETH", 0.02, now - 1_000),
+            _binance_trade("OMGETH", 0.04, now),
+        ]
+    )
+    stream = BinanceTradeStream(coins=[OMG], market=ETH, url=url)
+    producer = TradeStreamPrices(coins=[OMG], market=ETH, streams=[stream])
+    await producer.initialize()
+    try:
+        prices = await _wait_for_price(producer, OMG, expected_price=0.03)
+    finally:
+        await producer.close()
+        await runner.cleanup()
+
+    assert prices[OMG] == pytest.approx(0.03)
+
+
+@pytest.mark.asyncio
+async def test_get_data__no_trades_in_last_minute__returns_last_trade():
+    now = millis_since_epoch()
+    runner, url = await _start_fake_stream_server(
+        [_binance_trade("OMGETH", 0.01, now - 120_000)]
+    )
+    stream = BinanceTradeStream(coins=[OMG, KNC], market=ETH, url=url)
+    producer = TradeStreamPrices(coins=[OMG, KNC], market=ETH, streams=[stream])
+    await producer.initialize()
+    try:
+        prices = await _wait_for_price(producer, OMG, expected_price=0.01)
+    finally:
+        await producer.close()
+        await runner.cleanup()
+
+    assert prices[OMG] == 0.01
+    assert prices[KNC] is None
+
+
+class BinanceTradeStreamFailingOnce(BinanceTradeStream):
+    """Fails parsing the first message with an unexpected error"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failed = False
+
+    def parse_message(self, message):
+        if not self.failed:
+            self.failed = True
+            raise TypeError("unexpected message")
+        return super().parse_message(message)
+
+
+@pytest.mark.asyncio
+async def test_get_data__unexpected_stream_error__reconnected(monkeypatch):
+    monkeypatch.setattr(TradeStreamPrices, "_INITIAL_RECONNECT_DELAY_IN_SECONDS", 0.01)
+    now = millis_since_epoch()
+    runner, url = await _start_fake_stream_server(
+        [_binance_trade("OMGETH", 0.01, now)]
+    )
+    stream = BinanceTradeStreamFailingOnce(coins=[OMG], market=ETH, url=url)
+    producer = TradeStreamPrices(coins=[OMG], market=ETH, streams=[stream])
+    await producer.initialize()
+    try:
+        prices = await _wait_for_price(producer, OMG, expected_price=0.01)
+    finally:
+        await producer.close()
+        await runner.cleanup()
+
+    assert stream.failed
+    assert prices[OMG] == 0.01
+
+
+def test_binance_default_url__includes_all_coins():
+    stream = BinanceTradeStream(coins=[OMG, KNC], market=ETH)
+
+    assert stream.url.endswith("omgeth@trade/knceth@trade")
+
+
+def test_huobi_parse_message__ping__pong_reply():
+    stream = HuobiTradeStream(coins=[OMG], market=ETH)
+    message = aiohttp.WSMessage(
+        aiohttp.WSMsgType.BINARY, gzip.compress(b'{"ping": 1234}'), None
+    )
+
+    trades, reply = stream.parse_message(message)
+
+    assert trades == []
+    assert reply == {"pong": 1234}
+
+
+def test_huobi_parse_message__trades__returned_in_timestamp_order():
+    stream = HuobiTradeStream(coins=[OMG], market=ETH)
+    data = {
+        "ch": "market.omgeth.trade.detail",
+        "tick": {"data": [{"price": 0.02, "ts": 2}, {"price": 0.01, "ts": 1}]},
+    }
+    message = aiohttp.WSMessage(
+        aiohttp.WSMsgType.BINARY, gzip.compress(json.dumps(data).encode()), None
+    )
+
+    trades, reply = stream.parse_message(message)
+
+    assert [trade.price for trade in trades] == [0.01, 0.02]
+    assert {trade.coin_symbol for trade in trades} == {"OMG"}
+    assert reply is None
@@ -0,0 +1,80 @@
+from pricemonitor.producing.trade_window import TradeWindow
+
+
+def test_average__no_trades__returns_none():
+    window = TradeWindow(window_in_millis=60_000)
+
+    assert window.average(now_in_millis=0) is None
+
+
+def test_average__trades_in_window__returns_average():
+    window = TradeWindow(window_in_millis=60_000)
+    window.add(timestamp=1_000, price=100)
+    window.add(timestamp=2_000, price=200)
+
+    assert window.average(now_in_millis=3_000) == 150
+
+
+def test_average__old_trades__evicted():
+    window = TradeWindow(window_in_millis=60_000)
+    window.add(timestamp=1_000, price=100)
+    window.add(timestamp=50_000, price=200)
+
+    assert window.average(now_in_millis=70_000) == 200
+    assert len(window) == 1
+
+
+def test_average_or_last_price__all_trades_evicted__returns_last_price():
+    window = TradeWindow(window_in_millis=60_000)
+    window.add(timestamp=1_000, price=100)
+    window.add(timestamp=2_000, price=200)
+
+    assert window.average_or_last_price(now_in_millis=100_000) == 200
+
+
+def test_add__same_trade_id_twice__added_once():
+    window = TradeWindow(window_in_millis=60_000)
+
+    assert window.add(timestamp=1_000, price=100, trade_id="a")
+    assert not window.add(timestamp=1_000, price=100, trade_id="a")
+    assert len(window) == 1
+
+
+def test_add__evicted_trade_id__added_again():
+    window = TradeWindow(window_in_millis=60_000)
+    window.add(timestamp=1_000, price=100, trade_id="a")
+    window.evict(now_in_millis=100_000)
+
+    assert window.add(timestamp=1_000, price=100, trade_id="a")
+
+
+def test_max_and_min_price__follow_evictions():
+    window = TradeWindow(window_in_millis=60_000)
+    for timestamp, price in [(1_000, 500), (2_000, 100), (30_000, 300), (40_000, 200)]:
+        window.add(timestamp=timestamp, price=price)
+
+    assert window.max_price(now_in_millis=50_000) == 500
+    assert window.min_price(now_in_millis=50_000) == 100
+    assert window.max_price(now_in_millis=61_500) == 300
+    assert window.min_price(now_in_millis=61_500) == 100
+    assert window.min_price(now_in_millis=62_500) == 200
+
+
+def test_max_price__no_trades__returns_none():
+    window = TradeWindow(window_in_millis=60_000)
+
+    assert window.max_price(now_in_millis=0) is None
+    assert window.min_price(now_in_millis=0) is None
+
+
+def test_trades__restored_into_new_window__same_average():
+    window = TradeWindow(window_in_millis=60_000)
+    window.add(timestamp=1_000, price=100, trade_id="a")
+    window.add(timestamp=2_000, price=300, trade_id="b")
+
+    restored = TradeWindow(window_in_millis=60_000)
+    for timestamp, price, trade_id in window.trades():
+        restored.add(timestamp=timestamp, price=price, trade_id=trade_id)
+
+    assert restored.average(now_in_millis=3_000) == 200
+    assert not restored.add(timestamp=2_000, price=300, trade_id="b")
@@ -0,0 +1,57 @@
+import json
+
+from pricemonitor.warm_state import WarmStateFile
+
+MAX_AGE_IN_SECONDS = 60
+STATE = {"UPDATE_CONTRACT_AVERAGE_LAST_MINUTE": {"consumer": {"nonces": {"0x1": 7}}}}
+
+
+class ClockFake:
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+def _make_file(tmpdir, clock):
+    return WarmStateFile(
+        str(tmpdir.join("warm_state.json")),
+        max_age_in_seconds=MAX_AGE_IN_SECONDS,
+        clock=clock,
+    )
+
+
+def test_load__saved_state__same_state_returned(tmpdir):
+    clock = ClockFake()
+    _make_file(tmpdir, clock).save(STATE)
+
+    assert _make_file(tmpdir, clock).load() == STATE
+
+
+def test_load__no_file__empty_state(tmpdir):
+    assert _make_file(tmpdir, ClockFake()).load() == {}
+
+
+def test_load__state_too_old__empty_state(tmpdir):
+    clock = ClockFake()
+    warm_state_file = _make_file(tmpdir, clock)
+    warm_state_file.save(STATE)
+    clock.now += MAX_AGE_IN_SECONDS + 1
+
+    assert warm_state_file.load() == {}
+
+
+def test_load__corrupt_file__empty_state(tmpdir):
+    tmpdir.join("warm_state.json").write('{"saved_time": 1000, "sta')
+
+    assert _make_file(tmpdir, ClockFake()).load() == {}
+
+
+def test_save__state_saved_again__replaced(tmpdir):
+    warm_state_file = _make_file(tmpdir, ClockFake())
+    warm_state_file.save({"old": 1})
+    warm_state_file.save(STATE)
+
+    assert json.loads(tmpdir.join("warm_state.json").read())["state"] == STATE
+    assert not tmpdir.join("warm_state.json.tmp").exists()
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from pricemonitor.storing.ethereum_nodes import EthereumNetwork
+from pricemonitor.storing.web3_interface import EthereumNodeCallNoResultError, Web3Interface
+
+NODES = ['http://node-1', 'http://node-2']
+TOKEN_RATE_ABI = json.dumps([
+    {"constant": True, "inputs": [{"name": "src", "type": "address"}], "name": "tokenRate",
+     "outputs": [{"name": "", "type": "uint256"}], "payable": False, "stateMutability": "view",
+     "type": "function"},
+])
+OMG_ADDRESS = '0x0000000000000000000000000000000000044444'
+
+
+class Web3InterfaceWithNodesFake(Web3Interface):
+    """Answers requests with `batch_response`, after switching node on every request"""
+
+    def __init__(self, batch_response=None):
+        super().__init__(EthereumNetwork(NODES, etherscan_prefix=''))
+        self.batch_response = batch_response
+        self.urls = []
+
+    async def _post(self, method_name, params, payload, url=None):
+        if url is None:
+            url = self._network.current_node()
+        self.urls.append(url)
+        self._network.next_node()
+        data = {'result': '0x10'} if method_name == 'eth_blockNumber' else self.batch_response
+        return url, {}, '', '', data
+
+
+@pytest.mark.asyncio
+async def test_json_batch_call__items_out_of_order__results_in_call_order():
+    web3 = Web3InterfaceWithNodesFake([{'id': 1, 'result': '0x2'}, {'id': 0, 'result': '0x1'}])
+
+    results = await web3._json_batch_call('eth_call', [['a'], ['b']])
+
+    assert results == ['0x1', '0x2']
+
+
+@pytest.mark.asyncio
+async def test_json_batch_call__error_item__none_for_its_call_only():
+    web3 = Web3InterfaceWithNodesFake([{'id': 0, 'error': {'message': 'reverted'}}, {'id': 1, 'result': '0x2'}])
+
+    results = await web3._json_batch_call('eth_call', [['a'], ['b']])
+
+    assert results == [None, '0x2']
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('item', [{'id': 5, 'result': '0x1'}, {'result': '0x1'}, 'not an item'])
+async def test_json_batch_call__unexpected_item__node_error_raised(item):
+    web3 = Web3InterfaceWithNodesFake([item])
+
+    with pytest.raises(EthereumNodeCallNoResultError):
+        await web3._json_batch_call('eth_call', [['a']])
+
+
+@pytest.mark.asyncio
+async def test_call_const_functions__node_switched_in_between__block_and_calls_from_same_node():
+    web3 = Web3InterfaceWithNodesFake([{'id': 0, 'result': '0x'}])
+
+    await web3.call_const_functions(
+        priv_key=None, value=0, contract_hash='00', contract_abi=TOKEN_RATE_ABI,
+        function_name='tokenRate', eth_args=[[OMG_ADDRESS]])
+
+    assert web3.urls == [NODES[0], NODES[0]]
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging.config
 import time
@@ -28,32 +29,39 @@ class Compare:
         self.sanity_abi = sanity_abi
         self._w3 = Web3Interface(Network.MAINNET.value)
 
-    def sanity_rate(self, token):
-        rs = self._w3.call_const_function(contract_hash=self.sanity_address,
-                                          contract_abi=self.sanity_abi,
-                                          function_name='tokenRate',
-                                          eth_args=[token.address],
-                                          priv_key=None, value=None)
+    async def sanity_rate(self, token):
+        rs = await self._w3.call_const_function(contract_hash=self.sanity_address,
+                                                contract_abi=self.sanity_abi,
+                                                function_name='tokenRate',
+                                                eth_args=[token.address],
+                                                priv_key=None, value=None)
         return rs[0]
 
-    def contract_price(self, token, base_token):
+    async def contract_price(self, token, base_token):
         quantity = 1
-        rs = self._w3.call_const_function(contract_hash=self.main_contract_address,
-                                          contract_abi=self.main_contract_abi,
-                                          function_name='getExpectedRate',
-                                          eth_args=[token.address, base_token.address, quantity],
-                                          priv_key=None, value=None)
+        rs = await self._w3.call_const_function(contract_hash=self.main_contract_address,
+                                                contract_abi=self.main_contract_abi,
+                                                function_name='getExpectedRate',
+                                                eth_args=[token.address, base_token.address, quantity],
+                                                priv_key=None, value=None)
         return rs[0]
 
-    def compare_for_token(self, token, base_token):
-        price = self.contract_price(token, base_token)
-        sanity = self.sanity_rate(token)
+    async def compare_for_token(self, token, base_token):
+        price, sanity = await asyncio.gather(self.contract_price(token, base_token), self.sanity_rate(token))
         diff = abs(price - sanity) / sanity
         return {'price': price, 'sanity': sanity, 'diff': diff}
 
+    async def compare_all(self, tokens, base_token):
+        symbols = [symbol for symbol, token in tokens.items() if token is not base_token]
+        results = await asyncio.gather(*[self.compare_for_token(tokens[symbol], base_token) for symbol in symbols])
+        return dict(zip(symbols, results))
+
     def node_failed(self):
         self._w3._network.next_node()
 
+    async def close(self):
+        await self._w3.close()
+
 
 def _load_config(deployment_file_path):
     with open(deployment_file_path) as config_file:
@@ -89,34 +97,36 @@ def main(deployment_file_path, main_contract_address=MAIN_CONTRACT_ADDRESS, main
     c = Compare(tokens, main_contract_address=main_contract_address, main_contract_abi=main_contract_abi,
                 sanity_address=sanity_address, sanity_abi=sanity_abi)
     diff_above_10_percent_counter = 0
-
-    while True:
-        try:
-            now = {
-                symbol: c.compare_for_token(token, base_token)
-                for symbol, token in tokens.items()
-                if token is not base_token
-            }
-
-            active_with_diff_above_10_percent = [
-                (token, now[token]['diff'])
-                for token in now
-                if now[token]['price'] > 0 and now[token]['diff'] > 0.1
-            ]
-
-            if active_with_diff_above_10_percent:
-                diff_above_10_percent_counter += 1
-
-            logger.info(f'values: {now}')
-            logger.info(
-                f'diff above 10%: {active_with_diff_above_10_percent}, number of such diffs is {diff_above_10_percent_counter}')
-
-            _log_zero_price_tokens(now)
-
-        except Exception:
-            logger.exception("Crashed with this exception:")
-            c.node_failed()
-            time.sleep(WAITING_TIME_IN_SECONDS_BEFORE_RESTARTING_AFTER_CRASH)
+    loop = asyncio.get_event_loop()
+
+    try:
+        while True:
+            try:
+                now = loop.run_until_complete(c.compare_all(tokens, base_token))
+
+                active_with_diff_above_10_percent = [
+                    (token, now[token]['diff'])
+                    for token in now
+                    if now[token]['price'] > 0 and now[token]['diff'] > 0.1
+                ]
+
+                if active_with_diff_above_10_percent:
+                    diff_above_10_percent_counter += 1
+
+                logger.info(f'values: {now}')
+                logger.info(
+                    f'diff above 10%: {active_with_diff_above_10_percent}, number of such diffs is {diff_above_10_percent_counter}')
+
+                _log_zero_price_tokens(now)
+
+            except Exception:
+                logger.exception("Crashed with this exception:")
+                c.node_failed()
+                time.sleep(WAITING_TIME_IN_SECONDS_BEFORE_RESTARTING_AFTER_CRASH)
+    finally:
+        # Closes the node connections and stops the background tasks of the interface
+        loop.run_until_complete(c.close())
+        loop.close()
 
 
 def _log_zero_price_tokens(now):
@@ -0,0 +1,21 @@
+from collections import deque
+from typing import Optional
+
+
+class LatencyTracker:
+    """Keeps the latencies of recent successful requests."""
+
+    def __init__(self, max_samples: int = 200, min_samples: int = 20) -> None:
+        self._latencies = deque(maxlen=max_samples)  # type: deque
+        self._min_samples = min_samples
+
+    def record(self, latency_in_seconds: float) -> None:
+        self._latencies.append(latency_in_seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Returns None until enough samples were recorded to be meaningful"""
+        if len(self._latencies) < self._min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * percent / 100))
+        return latencies[index]
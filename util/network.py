@@ -1,5 +1,6 @@
 from enum import Enum, auto, unique
 from json import dumps
+from typing import Optional
 from urllib.parse import urlencode, unquote, urlparse, parse_qsl, ParseResult
 
 import aiohttp
@@ -19,6 +20,79 @@ class NetworkError(Exception, PriceMonitorException):
     pass
 
 
+class NetworkClient:
+    """ Long lived HTTP client that keeps a pool of open connections.
+
+    Exposes the same request functions as this module, so it can be passed
+    wherever the module itself is used as a `network_access` object.
+    The underlying session is created lazily (it has to be created from
+    within a running event loop) and must be released with `close()`.
+    """
+    DEFAULT_CONNECTIONS_LIMIT = 100
+    DEFAULT_CONNECTIONS_LIMIT_PER_HOST = 10
+    DEFAULT_KEEPALIVE_TIMEOUT_IN_SECONDS = 60
+    DEFAULT_DNS_CACHE_TTL_IN_SECONDS = 5 * 60
+
+    def __init__(self, headers=None,
+                 limit=DEFAULT_CONNECTIONS_LIMIT,
+                 limit_per_host=DEFAULT_CONNECTIONS_LIMIT_PER_HOST,
+                 keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT_IN_SECONDS,
+                 dns_cache_ttl=DEFAULT_DNS_CACHE_TTL_IN_SECONDS):
+        self._headers = headers
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._dns_cache_ttl = dns_cache_ttl
+        self._session = None  # type: Optional[aiohttp.ClientSession]
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._limit,
+                limit_per_host=self._limit_per_host,
+                keepalive_timeout=self._keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self._dns_cache_ttl,
+            )
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  headers=self._headers)
+        return self._session
+
+    async def get_response_content_from_get_request(self, url, headers=None,
+                                                    params=None, timeout=30,
+                                                    format=DataFormat.TEXT):
+        try:
+            async with async_timeout.timeout(timeout):
+                async with self.session.get(url=url, params=params,
+                                            headers=headers) as response:
+                    return (await response.json()
+                            if format == DataFormat.JSON
+                            else await response.text())
+        except ClientError as e:
+            raise NetworkError from e
+
+    async def get_response_content_from_post_request(self, url, headers=None,
+                                                     payload=None, timeout=30,
+                                                     format=DataFormat.TEXT):
+        if payload is None:
+            payload = {}
+        try:
+            async with async_timeout.timeout(timeout):
+                async with self.session.post(url=url, data=payload,
+                                             headers=headers) as response:
+                    return (await response.json()
+                            if format == DataFormat.JSON
+                            else await response.text())
+        except ClientError as e:
+            raise NetworkError from e
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
 async def get_response_content_from_get_request(url, headers=None, params=None,
                                                 timeout=30,
                                                 format=DataFormat.TEXT):